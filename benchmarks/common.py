@@ -0,0 +1,144 @@
+# benchmarks/common.py
+
+import json
+import os
+import platform
+import random
+import statistics
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+# Settings the app needs at import time; real values come from .env when benchmarking a deployment
+BENCHMARK_ENV = {
+    "DB_USER": "bench",
+    "DB_PASSWORD": "bench",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "bench",
+    "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379",
+    "API_SECRET_KEY": "bench-key",
+    "OPEN_EXCHANGE_RATES_API_KEY": "bench",
+    "REVENUECAT_API_KEY": "bench",
+    "CACHE_TTL_SECONDS": "3600",
+}
+
+# A run regresses when a latency percentile grows, or throughput drops, by more than this share
+DEFAULT_TOLERANCE = 0.15
+
+
+def configure_environment() -> None:
+    for key, value in BENCHMARK_ENV.items():
+        os.environ.setdefault(key, value)
+
+
+def make_currency_codes(count: int = 170) -> List[str]:
+    codes = ["USD", "EUR", "TRY", "GBP", "JPY", "CHF", "KWD", "XAU"]
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    rng = random.Random(7)
+    while len(codes) < count:
+        code = "".join(rng.choice(letters) for _ in range(3))
+        if code not in codes:
+            codes.append(code)
+    return codes
+
+
+def make_usd_rates(codes: List[str]) -> Dict[str, float]:
+    rng = random.Random(11)
+    return {code: 1.0 if code == "USD" else round(rng.uniform(0.0005, 20000), 6) for code in codes}
+
+
+def make_snapshot_rows(frequency: str, count: int, codes: List[str], end: datetime | None = None) -> List[Dict]:
+    """Snapshot dicts (oldest first) with slightly drifting rates, like the real history."""
+    end = end or datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if frequency == "daily":
+        end = end.replace(hour=0)
+    step = timedelta(hours=1) if frequency == "hourly" else timedelta(days=1)
+    base_rates = make_usd_rates(codes)
+    rng = random.Random(13)
+    rows = []
+    for index in range(count):
+        drift = 1 + rng.uniform(-0.01, 0.01)
+        rows.append({
+            "frequency": frequency,
+            "effective_at": end - step * (count - 1 - index),
+            "base_currency": "USD",
+            "rates": {code: round(rate * drift, 6) for code, rate in base_rates.items()},
+        })
+    return rows
+
+
+def percentile(sorted_values: List[float], share: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(share * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Dict:
+    """Latency percentiles in milliseconds and throughput for one scenario."""
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4) if ordered else 0.0,
+        "throughput_per_s": round(len(ordered) / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+
+
+def print_results(title: str, results: Dict[str, Dict]) -> None:
+    print(f"\n{title}")
+    print(f"{'scenario':<32}{'count':>8}{'errors':>8}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'per s':>12}")
+    for name, result in results.items():
+        print(
+            f"{name:<32}{result['count']:>8}{result['errors']:>8}{result['p50_ms']:>11.3f}"
+            f"{result['p95_ms']:>11.3f}{result['p99_ms']:>11.3f}{result['throughput_per_s']:>12.1f}"
+        )
+
+
+def save_baseline(path: str, results: Dict[str, Dict]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    payload = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as baseline_file:
+        json.dump(payload, baseline_file, indent=2, sort_keys=True)
+    print(f"\nBaseline saved to {path}.")
+
+
+def compare_to_baseline(path: str, results: Dict[str, Dict], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    Compares a run with a stored baseline. Returns one message per regression:
+    p95/p99 more than `tolerance` slower, or throughput more than `tolerance` lower.
+    """
+    if not os.path.exists(path):
+        print(f"\nNo baseline at {path}; run with --save-baseline to create one.")
+        return []
+    with open(path, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)["results"]
+
+    regressions = []
+    print(f"\nCompared with {path} (tolerance {tolerance:.0%}):")
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            print(f"  {name}: not in baseline")
+            continue
+        changes = []
+        for metric in ("p95_ms", "p99_ms"):
+            if reference[metric] and result[metric] > reference[metric] * (1 + tolerance):
+                changes.append(f"{metric} {reference[metric]:.3f} -> {result[metric]:.3f}")
+        if reference["throughput_per_s"] and result["throughput_per_s"] < reference["throughput_per_s"] * (1 - tolerance):
+            changes.append(f"throughput {reference['throughput_per_s']:.1f} -> {result['throughput_per_s']:.1f}/s")
+        ratio = result["p50_ms"] / reference["p50_ms"] if reference["p50_ms"] else 1.0
+        status = "REGRESSION " + ", ".join(changes) if changes else "ok"
+        print(f"  {name}: p50 x{ratio:.2f} {status}")
+        if changes:
+            regressions.append(f"{name}: {', '.join(changes)}")
+    return regressions
@@ -0,0 +1,176 @@
+# benchmarks/load.py
+"""
+End-to-end load harness for the hot endpoints: /rates, /currencies,
+/history?range=5y and /savings.
+
+By default the app runs in-process against local stand-ins: SQLite for Postgres
+and fakeredis for Redis, seeded with ~170 currencies, five years of daily
+history and a user with savings entries. With --base-url it drives a running
+deployment instead (e.g. `docker compose up` with a seeded database).
+
+    python -m benchmarks.load [--requests 500] [--concurrency 16]
+                              [--base-url http://localhost:8000 --api-key KEY]
+                              [--baseline PATH] [--save-baseline]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmarks.common import (
+    compare_to_baseline,
+    configure_environment,
+    make_currency_codes,
+    make_snapshot_rows,
+    make_usd_rates,
+    print_results,
+    save_baseline,
+    summarize,
+)
+
+configure_environment()
+
+DEFAULT_BASELINE = "benchmarks/baselines/load.json"
+API_PREFIX = "/currency-converter/v1"
+BENCH_USER_ID = "bench-user"
+SAVINGS_ENTRIES = 50
+
+SCENARIOS: Dict[str, Tuple[str, Dict[str, str]]] = {
+    "GET /rates": (f"{API_PREFIX}/rates?from=EUR", {}),
+    "GET /currencies": (f"{API_PREFIX}/currencies", {"Accept-Language": "tr-TR,tr;q=0.9"}),
+    "GET /history?range=5y": (f"{API_PREFIX}/history?range=5y", {}),
+    "GET /savings": (f"{API_PREFIX}/savings", {"X-App-User-ID": BENCH_USER_ID}),
+}
+
+
+def build_local_app(workdir: str):
+    """The API wired to a seeded SQLite database and an in-memory fakeredis."""
+    import fakeredis
+    from sqlmodel import Session, SQLModel, create_engine
+
+    from src.core.database import get_session
+    from src.core.metrics import install_query_timer
+    from src.core.redis_client import HEALTHY, redis_manager
+    from src.currency.cache_warmer import warm_rate_caches
+    from src.currency.models import Currency, CurrencyLocalization
+    from src.main import app
+    from src.rate_history.models import CurrencyRateSnapshot
+    from src.savings.models import SavingsEntry
+
+    redis_manager._client = fakeredis.FakeRedis(decode_responses=True)
+    redis_manager.state = HEALTHY
+
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}", connect_args={"check_same_thread": False})
+    install_query_timer(engine)
+    SQLModel.metadata.create_all(engine)
+
+    codes = make_currency_codes()
+    usd_rates = make_usd_rates(codes)
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        for order, code in enumerate(codes):
+            session.add(Currency(code=code, symbol=code, decimal_places=2, quick_rates=order < 5, quick_rates_order=order if order < 5 else None))
+            session.add(CurrencyLocalization(language_code="en", name=f"{code} currency", currency_code=code))
+            session.add(CurrencyLocalization(language_code="tr", name=f"{code} para birimi", currency_code=code))
+        # SQLite cannot number the composite-key snapshot table itself
+        snapshot_rows = make_snapshot_rows("daily", 365 * 5, codes) + make_snapshot_rows("hourly", 24 * 7, codes)
+        for row_id, row in enumerate(snapshot_rows, start=1):
+            session.add(CurrencyRateSnapshot(id=row_id, **row))
+        for index in range(SAVINGS_ENTRIES):
+            session.add(SavingsEntry(
+                user_id=BENCH_USER_ID,
+                currency_code=codes[index % len(codes)],
+                amount=100.0 + index,
+                purchase_date=(now - timedelta(days=index * 7)).replace(hour=0, minute=0, second=0, microsecond=0),
+            ))
+        session.commit()
+
+    def get_local_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_local_session
+    warm_rate_caches(usd_rates, codes, now.replace(minute=0, second=0, microsecond=0), ttl_seconds=3600)
+    return app
+
+
+async def run_scenario(client: httpx.AsyncClient, path: str, headers: Dict[str, str], api_key: str, requests: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            # A fresh device id per request keeps the per-device rate limit out of the way
+            request_headers = {"X-API-KEY": api_key, "X-Device-ID": uuid.uuid4().hex, **headers}
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, headers=request_headers)
+                await response.aread()
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+async def run_load(args) -> Dict[str, Dict]:
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=30)
+        api_key = args.api_key or os.environ["API_SECRET_KEY"]
+    else:
+        workdir = tempfile.mkdtemp(prefix="currency-bench-")
+        app = build_local_app(workdir)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=30)
+        api_key = os.environ["API_SECRET_KEY"]
+    logging.getLogger().setLevel(args.log_level)
+
+    results = {}
+    async with client:
+        for name, (path, headers) in SCENARIOS.items():
+            # One untimed request per scenario fills connection pools and caches
+            await client.get(path, headers={"X-API-KEY": api_key, "X-Device-ID": "warm-up", **headers})
+            results[name] = await run_scenario(client, path, headers, api_key, args.requests, args.concurrency)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--base-url", default=None, help="drive a running deployment instead of the in-process app")
+    parser.add_argument("--api-key", default=None, help="X-API-KEY for --base-url (defaults to API_SECRET_KEY)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=None, help="allowed slowdown share, e.g. 0.15")
+    parser.add_argument("--log-level", default="WARNING", help="app log level during the run")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_load(args))
+    target = args.base_url or "in-process app (SQLite + fakeredis)"
+    print_results(f"Load test against {target}: {args.requests} requests x {args.concurrency} concurrent", results)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        return 0
+    tolerance = {} if args.tolerance is None else {"tolerance": args.tolerance}
+    regressions = compare_to_baseline(args.baseline, results, **tolerance)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
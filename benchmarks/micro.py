@@ -0,0 +1,124 @@
+# benchmarks/micro.py
+"""
+Micro-benchmarks of the hot in-process computations: cross rates, the history
+aggregators and JSON encoding of history responses.
+
+    python -m benchmarks.micro [--repeat 2000] [--baseline PATH] [--save-baseline]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+from unittest import mock
+
+from benchmarks.common import (
+    compare_to_baseline,
+    configure_environment,
+    make_currency_codes,
+    make_snapshot_rows,
+    make_usd_rates,
+    print_results,
+    save_baseline,
+    summarize,
+)
+
+configure_environment()
+
+from src.currency import service as currency_service  # noqa: E402
+from src.currency.rate_state import build_rate_state  # noqa: E402
+from src.rate_history import service as history_service  # noqa: E402
+from src.rate_history.aggregation import DAY_SECONDS, HOUR_SECONDS, MONTH, RateFrame, aggregate, last_per_bucket  # noqa: E402
+from src.rate_history.models import CurrencyRateSnapshot  # noqa: E402
+
+DEFAULT_BASELINE = "benchmarks/baselines/micro.json"
+WARMUP_RUNS = 20
+
+
+def _time_calls(func: Callable[[], object], repeat: int) -> Tuple[List[float], float]:
+    for _ in range(WARMUP_RUNS):
+        func()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call_start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - call_start)
+    return latencies, time.perf_counter() - start
+
+
+def _time_coroutine_calls(func: Callable[[], object], repeat: int) -> Tuple[List[float], float]:
+    async def run() -> Tuple[List[float], float]:
+        for _ in range(WARMUP_RUNS):
+            await func()
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(repeat):
+            call_start = time.perf_counter()
+            await func()
+            latencies.append(time.perf_counter() - call_start)
+        return latencies, time.perf_counter() - start
+
+    return asyncio.run(run())
+
+
+def run_benchmarks(repeat: int) -> Dict[str, Dict]:
+    codes = make_currency_codes()
+    usd_rates = make_usd_rates(codes)
+    hourly = [CurrencyRateSnapshot(**row) for row in make_snapshot_rows("hourly", 24 * 7, codes)]
+    daily = [CurrencyRateSnapshot(**row) for row in make_snapshot_rows("daily", 365 * 5, codes)]
+
+    async def load_rates():
+        return usd_rates
+
+    adapter = history_service._history_adapter
+    monthly_5y = last_per_bucket(daily, MONTH)
+    daily_1y = daily[-365:]
+    frame_5y = RateFrame.from_snapshots(daily)
+
+    results = {}
+    timed = {
+        "compute_cross_rates[170]": lambda: currency_service.compute_cross_rates(usd_rates, "EUR", codes),
+        "build_rate_state[170x170]": lambda: build_rate_state(usd_rates, codes, daily[-1].effective_at),
+        "aggregate_8hourly[1w]": lambda: last_per_bucket(hourly, 8 * HOUR_SECONDS),
+        "aggregate_every_3_days[6m]": lambda: last_per_bucket(daily[-182:], 3 * DAY_SECONDS),
+        "aggregate_every_7_days[1y]": lambda: last_per_bucket(daily_1y, 7 * DAY_SECONDS),
+        "aggregate_monthly[5y]": lambda: last_per_bucket(daily, MONTH),
+        "aggregate_mean_weekly[5y frame]": lambda: aggregate(frame_5y, 7 * DAY_SECONDS, how="mean"),
+        "aggregate_ohlc_monthly[5y frame]": lambda: aggregate(frame_5y, MONTH, how="ohlc"),
+        "encode_history[5y monthly]": lambda: adapter.dump_json(adapter.validate_python(monthly_5y, from_attributes=True)),
+        "encode_history[1y daily]": lambda: adapter.dump_json(adapter.validate_python(daily_1y, from_attributes=True)),
+    }
+    for name, func in timed.items():
+        latencies, elapsed = _time_calls(func, repeat)
+        results[name] = summarize(latencies, elapsed)
+
+    with mock.patch.object(currency_service, "_get_all_rates_from_usd", load_rates):
+        latencies, elapsed = _time_coroutine_calls(lambda: currency_service.get_conversion_rates("EUR", codes), repeat)
+        results["get_conversion_rates[170]"] = summarize(latencies, elapsed)
+
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="timed calls per benchmark")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=None, help="allowed slowdown share, e.g. 0.15")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.repeat)
+    print_results(f"Micro-benchmarks ({args.repeat} calls each)", results)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        return 0
+    tolerance = {} if args.tolerance is None else {"tolerance": args.tolerance}
+    regressions = compare_to_baseline(args.baseline, results, **tolerance)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
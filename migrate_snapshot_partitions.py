@@ -0,0 +1,117 @@
+# migrate_snapshot_partitions.py
+"""
+One-time migration of currency_rate_snapshots from a single table to the
+partitioned layout (LIST by frequency, RANGE by month/year; see
+src/rate_history/partitions.py).
+
+Runs in one transaction: the old table is renamed to currency_rate_snapshots_legacy
+(its indexes and constraints get a _legacy suffix), the partitioned table is created
+from the CurrencyRateSnapshot model, every row is copied over with its id, and the
+identity sequence continues after the highest id. Writers are blocked while it runs;
+for ~10k daily and ~720 hourly rows that is a few seconds.
+
+    python migrate_snapshot_partitions.py [--drop-legacy]
+
+Without --drop-legacy the old table is kept for comparison; drop it afterwards with
+DROP TABLE currency_rate_snapshots_legacy.
+"""
+
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, text
+
+from src.rate_history.models import CurrencyRateSnapshot
+from src.rate_history.partitions import SNAPSHOTS_TABLE, ensure_partitions, is_partitioned
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("partition_migration")
+
+# ENVIRONMENT VARIABLES
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT", "5432")
+DB_NAME = os.getenv("DB_NAME")
+
+if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_NAME]):
+    raise ValueError("Required environment variables (DB_*) are not set!")
+
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+LEGACY_TABLE = f"{SNAPSHOTS_TABLE}_legacy"
+HOURLY_RETENTION_DAYS = 30
+
+
+def rename_legacy_objects(connection) -> None:
+    """Moves the old table and its index/constraint names out of the way of the new ones."""
+    index_names = connection.execute(
+        text("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :table"),
+        {"table": SNAPSHOTS_TABLE},
+    ).scalars().all()
+    connection.execute(text(f"ALTER TABLE {SNAPSHOTS_TABLE} RENAME TO {LEGACY_TABLE}"))
+    connection.execute(text(f"ALTER SEQUENCE IF EXISTS {SNAPSHOTS_TABLE}_id_seq RENAME TO {LEGACY_TABLE}_id_seq"))
+    for index_name in index_names:
+        # Renaming a constraint's index renames the constraint too (uq_crs, the primary key)
+        connection.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_legacy"'))
+    logger.info(f"Renamed {SNAPSHOTS_TABLE} to {LEGACY_TABLE} along with {len(index_names)} indexes.")
+
+
+def migrate(drop_legacy: bool) -> None:
+    engine = create_engine(DATABASE_URL)
+    with engine.begin() as connection:
+        if is_partitioned(connection):
+            logger.info(f"{SNAPSHOTS_TABLE} is already partitioned. Nothing to do.")
+            return
+
+        connection.execute(text(f"LOCK TABLE {SNAPSHOTS_TABLE} IN ACCESS EXCLUSIVE MODE"))
+        old_count = connection.execute(text(f"SELECT count(*) FROM {SNAPSHOTS_TABLE}")).scalar()
+        oldest_hourly = connection.execute(
+            text(f"SELECT min(effective_at) FROM {SNAPSHOTS_TABLE} WHERE frequency = 'hourly'")
+        ).scalar()
+
+        rename_legacy_objects(connection)
+        CurrencyRateSnapshot.__table__.create(connection)
+
+        now = datetime.now(timezone.utc)
+        hourly_start = min(oldest_hourly or now, now - timedelta(days=HOURLY_RETENTION_DAYS))
+        ensure_partitions(connection, now=now, hourly_start=hourly_start)
+
+        # Whatever columns the old table has (payload_hash and provenance only after migrate_snapshot_payloads.py)
+        legacy_columns = set(connection.execute(
+            text("SELECT column_name FROM information_schema.columns WHERE table_schema = current_schema() AND table_name = :table"),
+            {"table": LEGACY_TABLE},
+        ).scalars())
+        columns = ", ".join(column.name for column in CurrencyRateSnapshot.__table__.c if column.name in legacy_columns)
+        connection.execute(text(f"""
+            INSERT INTO {SNAPSHOTS_TABLE} ({columns})
+            SELECT {columns} FROM {LEGACY_TABLE}
+            WHERE frequency IN ('hourly', 'daily')
+        """))
+        connection.execute(text(f"""
+            SELECT setval(pg_get_serial_sequence('{SNAPSHOTS_TABLE}', 'id'), COALESCE(max(id), 0) + 1, false)
+            FROM {SNAPSHOTS_TABLE}
+        """))
+
+        new_count = connection.execute(text(f"SELECT count(*) FROM {SNAPSHOTS_TABLE}")).scalar()
+        if new_count != old_count:
+            raise RuntimeError(f"Copied {new_count} of {old_count} rows; rolling back.")
+        logger.info(f"Copied {new_count} snapshots into the partitioned table.")
+
+        if drop_legacy:
+            connection.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+            logger.info(f"Dropped {LEGACY_TABLE}.")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drop-legacy", action="store_true", help="drop the old table after a successful copy")
+    args = parser.parse_args()
+    migrate(args.drop_legacy)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# migrate_snapshot_payloads.py
+"""
+One-time migration of currency_rate_snapshots to content-addressed payloads
+(see RatePayload in src/rate_history/models.py).
+
+Adds the payload_hash and provenance columns and the currency_rate_payloads table,
+then moves the inline rates of existing rows into payloads in batches: each distinct
+rates map is stored once and the rows reference it by hash, with their inline copy
+set to NULL. Each batch commits on its own, so the script can be stopped and re-run;
+reads keep working throughout because they fall back to the inline column.
+
+    python migrate_snapshot_payloads.py [--batch-size 2000]
+
+Existing rows keep the default provenance "real"; whether an old row was forward-filled
+cannot be told apart from rates that simply did not change.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.rate_history.models import CurrencyRateSnapshot, RatePayload
+from src.rate_history.repo import rates_hash
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("payload_migration")
+
+# ENVIRONMENT VARIABLES
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = os.getenv("DB_PORT", "5432")
+DB_NAME = os.getenv("DB_NAME")
+
+if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_NAME]):
+    raise ValueError("Required environment variables (DB_*) are not set!")
+
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+SNAPSHOTS_TABLE = CurrencyRateSnapshot.__tablename__
+
+
+def add_payload_schema(connection) -> None:
+    """Creates the payload table and the new snapshot columns (no-ops when they exist)."""
+    RatePayload.__table__.create(connection, checkfirst=True)
+    connection.execute(text(f"ALTER TABLE {SNAPSHOTS_TABLE} ADD COLUMN IF NOT EXISTS payload_hash VARCHAR(64)"))
+    connection.execute(text(
+        f"ALTER TABLE {SNAPSHOTS_TABLE} ADD COLUMN IF NOT EXISTS provenance VARCHAR NOT NULL DEFAULT 'real'"
+    ))
+    for index in CurrencyRateSnapshot.__table__.indexes:
+        if "payload_hash" in index.columns:
+            index.create(connection, checkfirst=True)
+
+
+def migrate_batch(connection, batch_size: int) -> int:
+    """Moves the inline rates of up to `batch_size` rows into payloads. Returns the rows moved."""
+    rows = connection.execute(text(f"""
+        SELECT id, frequency, effective_at, rates FROM {SNAPSHOTS_TABLE}
+        WHERE payload_hash IS NULL AND rates IS NOT NULL
+        ORDER BY id
+        LIMIT :batch_size
+    """), {"batch_size": batch_size}).all()
+    if not rows:
+        return 0
+
+    hashes = [rates_hash(row.rates) for row in rows]
+    payloads = {payload_hash: row.rates for payload_hash, row in zip(hashes, rows)}
+    connection.execute(
+        pg_insert(RatePayload.__table__)
+        .values([{"hash": payload_hash, "rates": rates} for payload_hash, rates in payloads.items()])
+        .on_conflict_do_nothing(index_elements=["hash"])
+    )
+    connection.execute(
+        text(f"""
+            UPDATE {SNAPSHOTS_TABLE} SET payload_hash = :payload_hash, rates = NULL
+            WHERE id = :id AND frequency = :frequency AND effective_at = :effective_at
+        """),
+        [
+            {"payload_hash": payload_hash, "id": row.id, "frequency": row.frequency, "effective_at": row.effective_at}
+            for payload_hash, row in zip(hashes, rows)
+        ],
+    )
+    return len(rows)
+
+
+def migrate(batch_size: int) -> None:
+    engine = create_engine(DATABASE_URL)
+    with engine.begin() as connection:
+        add_payload_schema(connection)
+
+    moved = 0
+    while True:
+        with engine.begin() as connection:
+            batch = migrate_batch(connection, batch_size)
+        if not batch:
+            break
+        moved += batch
+        logger.info(f"Moved the rates of {moved} snapshots into payloads so far.")
+
+    with engine.connect() as connection:
+        snapshots, payloads = connection.execute(text(
+            f"SELECT (SELECT count(*) FROM {SNAPSHOTS_TABLE}), (SELECT count(*) FROM {RatePayload.__tablename__})"
+        )).one()
+    logger.info(f"Done: {snapshots} snapshots now share {payloads} distinct rate payloads.")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=2000, help="rows moved per transaction")
+    args = parser.parse_args()
+    migrate(args.batch_size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
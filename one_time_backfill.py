@@ -1,18 +1,22 @@
 # one_time_backfill.py
 
 import os
-import time
-import requests
+import asyncio
 import logging
-from datetime import datetime, timedelta, timezone
-from typing import List, Set
+from datetime import datetime, timezone
+from typing import Dict, List
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.dialects.postgresql import insert as pg_insert
-from sqlalchemy import func
 
-from src.rate_history.models import CurrencyRateSnapshot
+from src.rate_history.backfill import (
+    DEFAULT_HISTORICAL_API_URL,
+    ApiKeyBudget,
+    ApiKeyPool,
+    BackfillCheckpoint,
+    BackfillEngine,
+)
+from src.rate_history.repo import get_missing_buckets, upsert_snapshots, copy_upsert_snapshots
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("backfill_script")
@@ -24,91 +28,73 @@ DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME")
 
-API_KEY_1 = os.getenv("OXR_API_KEY_1")
-API_KEY_2 = os.getenv("OXR_API_KEY_2")
-API_KEY_3 = os.getenv("OXR_API_KEY_3")
-API_KEY_4 = os.getenv("OXR_API_KEY_4")
-API_KEY_5 = os.getenv("OXR_API_KEY_5") 
+# Every OXR_API_KEY_<n> variable is picked up and rotated (OXR_API_KEY_1, OXR_API_KEY_2, ...).
+API_KEYS = [
+    os.environ[name]
+    for name in sorted(os.environ, key=lambda n: (len(n), n))
+    if name.startswith("OXR_API_KEY_") and os.environ[name]
+]
 
-if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_NAME, API_KEY_1, API_KEY_2, API_KEY_3, API_KEY_4, API_KEY_5]):
+if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_NAME]) or not API_KEYS:
     raise ValueError("Required environment variables (DB_*, OXR_API_KEY_*) are not set!")
-    
+
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-API_KEYS = [API_KEY_1, API_KEY_2, API_KEY_3, API_KEY_4, API_KEY_5]
 
-BASE_URL = "https://openexchangerates.org/api/historical/"
+# Point OXR_BASE_URL at a local fake server to test the backfill without spending quota.
+BASE_URL = os.getenv("OXR_BASE_URL", DEFAULT_HISTORICAL_API_URL)
 BASE_CURRENCY = "USD"
 START_DATE = datetime(1999, 1, 1, tzinfo=timezone.utc)
-END_DATE = datetime.now(timezone.utc)
-MAX_REQUESTS_PER_RUN = 8500
-BATCH_SIZE = 100
+END_DATE = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+MAX_REQUESTS_PER_KEY = int(os.getenv("MAX_REQUESTS_PER_KEY", "1700"))
+REQUESTS_PER_SECOND_PER_KEY = float(os.getenv("REQUESTS_PER_SECOND_PER_KEY", "2"))
+CONCURRENCY = int(os.getenv("BACKFILL_CONCURRENCY", "8"))
+BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "100"))
+CHECKPOINT_PATH = os.getenv("BACKFILL_CHECKPOINT_PATH", ".backfill_checkpoint.json")
+# COPY into a staging table instead of multi-row INSERTs; worth it for batch sizes in the thousands.
+USE_COPY = os.getenv("BACKFILL_USE_COPY", "false").lower() == "true"
+
+
+def write_batch(SessionLocal, rows: List[Dict]) -> None:
+    """Writes a batch of daily snapshots with multi-row upserts (or COPY for large batches)."""
+    with SessionLocal() as db_session:
+        if USE_COPY:
+            copy_upsert_snapshots(db_session, rows)
+        else:
+            upsert_snapshots(db_session, rows)
 
-def fetch_historical_data():
+
+async def fetch_historical_data():
     engine = create_engine(DATABASE_URL)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    db_session = SessionLocal()
 
-    logger.info("Checking for existing daily records in the database...")
-    existing_dates_query = db_session.query(
-        func.date(CurrencyRateSnapshot.effective_at)
-    ).filter(
-        CurrencyRateSnapshot.frequency == 'daily'
+    logger.info("Looking up missing daily records in the database...")
+    with SessionLocal() as db_session:
+        missing_buckets = get_missing_buckets(
+            db_session, frequency="daily", start=START_DATE, end=END_DATE, base_currency=BASE_CURRENCY
+        )
+    missing_days = [bucket.date() for bucket in missing_buckets]
+    logger.info(f"Starting historical data backfill from {START_DATE.date()} to {END_DATE.date()}: {len(missing_days)} missing dates.")
+
+    key_pool = ApiKeyPool([
+        ApiKeyBudget(key=key, max_requests=MAX_REQUESTS_PER_KEY, min_interval=1 / REQUESTS_PER_SECOND_PER_KEY)
+        for key in API_KEYS
+    ])
+    backfill = BackfillEngine(
+        key_pool=key_pool,
+        sink=lambda rows: write_batch(SessionLocal, rows),
+        base_url=BASE_URL,
+        base_currency=BASE_CURRENCY,
+        concurrency=CONCURRENCY,
+        batch_size=BATCH_SIZE,
+        checkpoint=BackfillCheckpoint(CHECKPOINT_PATH).load(),
     )
-    existing_dates: Set[datetime.date] = {d[0] for d in existing_dates_query.all()}
-    logger.info(f"Found {len(existing_dates)} existing daily records in the database.")
-    
-    current_date = START_DATE
-    request_count = 0
-    
-    logger.info(f"Starting historical data backfill from {START_DATE.date()} to {END_DATE.date()}.")
-
-    while current_date <= END_DATE and request_count < MAX_REQUESTS_PER_RUN:
-        date_str = current_date.strftime('%Y-%m-%d')
-        
-        if current_date.date() in existing_dates:
-            current_date += timedelta(days=1)
-            continue
-            
-        api_key_to_use = API_KEYS[request_count % len(API_KEYS)]
-        
-        url = f"{BASE_URL}{date_str}.json?app_id={api_key_to_use}&base={BASE_CURRENCY}"
-        
-        logger.info(f"Fetching data for missing date: {date_str} (Request: {request_count + 1})...")
-        
-        try:
-            response = requests.get(url, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-            
-            stmt = pg_insert(CurrencyRateSnapshot.__table__).values(
-                frequency="daily",
-                effective_at=current_date.replace(hour=0, minute=0, second=0, microsecond=0),
-                base_currency=data.get("base", BASE_CURRENCY),
-                rates=data.get("rates", {})
-            )
-            on_conflict_stmt = stmt.on_conflict_do_update(
-                constraint="uq_crs",
-                set_={"rates": stmt.excluded.rates}
-            )
-            db_session.execute(on_conflict_stmt)
-            db_session.commit()
-            logger.info(f"Successfully upserted data for {date_str}.")
-
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to fetch data for {date_str}. Error: {e}")
-            db_session.rollback()
-
-        current_date += timedelta(days=1)
-        request_count += 1
-        time.sleep(0.5)
-        
-    db_session.close()
-    
-    if request_count >= MAX_REQUESTS_PER_RUN:
-        logger.warning(f"Maximum requests per run ({MAX_REQUESTS_PER_RUN}) reached. Please run the script again later to continue backfill.")
+    stats = await backfill.run(missing_days)
+
+    if stats.stopped_by_budget:
+        logger.warning(f"All API key budgets ({MAX_REQUESTS_PER_KEY} requests per key) are used up. Run the script again later to continue; progress is saved in {CHECKPOINT_PATH}.")
     else:
         logger.info("Historical data backfill completed successfully!")
 
 
 if __name__ == "__main__":
-    fetch_historical_data()
\ No newline at end of file
+    asyncio.run(fetch_historical_data())
@@ -2,8 +2,16 @@
 
 import asyncio
 import os
+import signal
 import logging
-from src.rate_history.jobs import run_hourly_job, run_daily_job
+from sqlalchemy import text
+
+from src.core.config import settings
+from src.core.database import engine
+from src.core.redis_client import get_redis_client
+from src.core.scheduler import CronExpression, JobScheduler, ScheduledJob
+from src.core.tracing import context_from_environment, setup_tracing, start_span
+from src.rate_history.jobs import run_hourly_job, run_daily_job, run_gap_repair_job, run_cache_warm_job, run_rate_cube_job
 
 logging.basicConfig(
     level=logging.INFO,
@@ -11,10 +19,52 @@ logging.basicConfig(
 )
 logger = logging.getLogger("job_runner")
 
+
+def build_scheduler() -> JobScheduler:
+    jitter = settings.SCHEDULER_JITTER_SECONDS
+    return JobScheduler([
+        ScheduledJob(name="hourly", cron=CronExpression(settings.SCHEDULER_HOURLY_CRON), func=run_hourly_job, jitter_seconds=jitter),
+        ScheduledJob(name="daily", cron=CronExpression(settings.SCHEDULER_DAILY_CRON), func=run_daily_job, jitter_seconds=jitter),
+        ScheduledJob(name="gaps", cron=CronExpression(settings.SCHEDULER_GAP_REPAIR_CRON), func=run_gap_repair_job, jitter_seconds=jitter),
+        # No jitter: the warm-up has to land inside the window before the caches expire.
+        ScheduledJob(name="cache-warm", cron=CronExpression(settings.SCHEDULER_CACHE_WARM_CRON), func=run_cache_warm_job, catch_up=False),
+    ])
+
+
+async def run_scheduler():
+    """
+    Long-running alternative to one-shot JOB_TYPE runs: the process stays up and
+    runs the jobs on their cron schedules with warm DB and Redis connections.
+    """
+    # Open the pooled connections once up front; they are reused by every job run.
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    get_redis_client()
+
+    scheduler = build_scheduler()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, scheduler.stop)
+    await scheduler.run_forever()
+
+
 async def main():
     job_type = os.environ.get("JOB_TYPE")
     logger.info(f"Job runner started. JOB_TYPE is set to: {job_type}")
 
+    setup_tracing(f"{settings.TRACING_SERVICE_NAME}-jobs")
+    if job_type == "scheduler":
+        logger.info("--- Starting SCHEDULER ---")
+        # Every scheduled run gets its own trace
+        await run_scheduler()
+        return
+
+    # A one-shot run joins the trace passed in through TRACEPARENT, if any
+    with start_span(f"job {job_type}", context=context_from_environment()):
+        await run_job(job_type)
+
+
+async def run_job(job_type: str | None):
     if job_type == "hourly":
         logger.info("--- Running HOURLY job ---")
         await run_hourly_job()
@@ -23,11 +73,23 @@ async def main():
         logger.info("--- Running DAILY job ---")
         await run_daily_job()
         logger.info("--- DAILY job finished ---")
+    elif job_type == "gaps":
+        logger.info("--- Running GAP REPAIR job ---")
+        await run_gap_repair_job()
+        logger.info("--- GAP REPAIR job finished ---")
+    elif job_type == "warm":
+        logger.info("--- Running CACHE WARM job ---")
+        await run_cache_warm_job()
+        logger.info("--- CACHE WARM job finished ---")
+    elif job_type == "cube":
+        logger.info("--- Running RATE CUBE job ---")
+        run_rate_cube_job()
+        logger.info("--- RATE CUBE job finished ---")
     else:
         logger.warning(
             "No valid JOB_TYPE environment variable found. "
-            "Set JOB_TYPE to 'hourly' or 'daily'. Exiting."
+            "Set JOB_TYPE to 'hourly', 'daily', 'gaps', 'warm', 'cube' or 'scheduler'. Exiting."
         )
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,239 @@
+# src/core/compression.py
+
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+from src.core.config import settings
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Responses smaller than this go out as they are: the saving would not pay for the CPU
+DEFAULT_MIN_SIZE = 1024
+# Levels for compressing per request, tuned for speed
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Stored variants are compressed once per body version, so they get the best ratio
+PRECOMPRESSED_GZIP_LEVEL = 9
+PRECOMPRESSED_BROTLI_QUALITY = 11
+# Distinct cached bodies (per-base rates, per-language catalogue, per-range history) kept compressed
+PRECOMPRESSED_MAX_ENTRIES = 512
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+# Server-Sent Events must reach the client event by event, never held back by a compressor
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+def accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows `encoding` (a q=0 entry forbids it)."""
+    for item in accept_encoding.split(","):
+        token, _, params = item.strip().partition(";")
+        if token.strip().lower() not in (encoding, "*"):
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """The coding to answer with: brotli when installed and accepted, else gzip, else None."""
+    if BROTLI_AVAILABLE and accepts_encoding(accept_encoding, "br"):
+        return "br"
+    if accepts_encoding(accept_encoding, "gzip"):
+        return "gzip"
+    return None
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    return ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(UNCOMPRESSED_TYPES)
+
+
+def compress(body: bytes, encoding: str, best: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=PRECOMPRESSED_BROTLI_QUALITY if best else BROTLI_QUALITY)
+    return gzip.compress(body, PRECOMPRESSED_GZIP_LEVEL if best else GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    """Compresses a streamed body chunk by chunk, flushing after each so nothing is held back."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + (self._compressor.finish() if final else self._compressor.flush())
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class PrecompressedBodies:
+    """
+    Compressed variants of cacheable response bodies, keyed by the body's cache key.
+    Variants are built when the body is warmed (`add`), or else the first time a client
+    asks for that coding, and then served as stored bytes until the body under the key
+    changes (a new rates bucket, catalogue or history range), so compression costs CPU
+    once per body version and coding. The least recently used keys are dropped past
+    `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = PRECOMPRESSED_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[bytes, Dict[str, bytes]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, key: str, body: bytes) -> Tuple[bytes, Dict[str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != body:
+                entry = self._entries[key] = (body, {})
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            self._entries.move_to_end(key)
+            return entry
+
+    def cached(self, key: str, body: bytes, encoding: str) -> bytes | None:
+        """The stored variant of this body version, without compressing on a miss."""
+        return self._entry(key, body)[1].get(encoding)
+
+    def get(self, key: str, body: bytes, encoding: str) -> bytes:
+        """The stored variant, compressed first on a miss (blocking: keep it off the event loop)."""
+        variants = self._entry(key, body)[1]
+        compressed = variants.get(encoding)
+        if compressed is None:
+            compressed = variants[encoding] = compress(body, encoding, best=True)
+        return compressed
+
+    def add(self, key: str, body: str | bytes, min_size: int | None = None) -> None:
+        """Builds every supported variant of a body up front (as its cache is warmed)."""
+        if isinstance(body, str):
+            body = body.encode()
+        if len(body) < (settings.COMPRESSION_MIN_BYTES if min_size is None else min_size):
+            return
+        for encoding in supported_encodings():
+            self.get(key, body, encoding)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+precompressed_bodies = PrecompressedBodies()
+
+
+class PrecompressedResponse(Response):
+    """
+    A cached response body sent in the best coding the client accepts, from the variants
+    in `precompressed_bodies`. `cache_key` names the body (e.g. `rates_body:EUR`) and must
+    be the key its cache uses, so each version is compressed only once.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, content: str | bytes, cache_key: str, min_size: int | None = None, store: PrecompressedBodies = precompressed_bodies, **kwargs):
+        super().__init__(content=content, **kwargs)
+        self.cache_key = cache_key
+        self.min_size = settings.COMPRESSION_MIN_BYTES if min_size is None else min_size
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding and len(self.body) >= self.min_size:
+            compressed = self.store.cached(self.cache_key, self.body, encoding)
+            if compressed is None:
+                # Compressing at the best levels takes milliseconds: not on the event loop
+                compressed = await run_in_threadpool(self.store.get, self.cache_key, self.body, encoding)
+            self.body = compressed
+            self.headers["Content-Encoding"] = encoding
+            self.headers["Content-Length"] = str(len(self.body))
+        self.headers.add_vary_header("Accept-Encoding")
+        await super().__call__(scope, receive, send)
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI compression for clients that accept it: brotli when the optional `brotli`
+    package is installed and the client prefers it, gzip otherwise.
+
+    Single-message bodies (the usual JSON response) are compressed in one go when they
+    reach `min_size`. Streamed bodies are compressed chunk by chunk with a flush after
+    each, so nothing is buffered. Event streams and responses that already carry a
+    Content-Encoding (such as a PrecompressedResponse) pass through untouched.
+    """
+
+    def __init__(self, app, min_size: int = DEFAULT_MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", "")) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                passthrough = "content-encoding" in headers or not is_compressible(headers.get("content-type", ""))
+                if passthrough:
+                    await send(message)
+                else:
+                    # Held back until the first body chunk shows whether compression pays
+                    start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                headers = MutableHeaders(scope=start_message)
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < self.min_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                headers["Content-Encoding"] = encoding
+                if more_body:
+                    del headers["Content-Length"]
+                    compressor = StreamCompressor(encoding)
+                else:
+                    body = compress(body, encoding)
+                    headers["Content-Length"] = str(len(body))
+                await send(start_message)
+                start_message = None
+                if compressor is None:
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+            await send({"type": "http.response.body", "body": compressor.compress(body, final=not more_body), "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -37,6 +37,21 @@ class Settings(BaseSettings):
     # Open Exchange Rates API
     OPEN_EXCHANGE_RATES_API_KEY: str
     OPEN_EXCHANGE_RATES_API_URL: str = "https://openexchangerates.org/api/latest.json"
+    OPEN_EXCHANGE_RATES_HISTORICAL_API_URL: str = "https://openexchangerates.org/api/historical"
+    # Upper bound of OXR calls a single gap repair run may spend on missing daily snapshots
+    GAP_REPAIR_MAX_REQUESTS: int = 200
+
+    # Latest-rate providers in priority order: oxr | frankfurter | file (see src/currency/providers.py)
+    RATE_PROVIDERS: str = "oxr,frankfurter"
+    FRANKFURTER_API_URL: str = "https://api.frankfurter.app/latest"
+    # JSON rates file for the `file` provider, a local stand-in for tests and development
+    RATE_PROVIDER_FILE_PATH: str | None = None
+    RATE_PROVIDER_TIMEOUT_SECONDS: float = 10.0
+    # The next provider is asked in parallel when the current one is silent this long
+    RATE_PROVIDER_HEDGE_DELAY_SECONDS: float = 1.5
+    # Consecutive failures that open a provider's circuit, and how long it then fails fast
+    RATE_PROVIDER_FAILURE_THRESHOLD: int = 3
+    RATE_PROVIDER_OPEN_SECONDS: float = 60.0
 
     # RevenueCat API
     REVENUECAT_API_KEY: str
@@ -44,6 +59,45 @@ class Settings(BaseSettings):
     
     # Cache
     CACHE_TTL_SECONDS: int
+    # Serialized /currencies list per language; catalogue edits show up after at most this long
+    CATALOGUE_CACHE_TTL_SECONDS: int = 600
+
+    # In-process scheduler (JOB_TYPE=scheduler), cron expressions in UTC
+    SCHEDULER_HOURLY_CRON: str = "0 * * * *"
+    SCHEDULER_DAILY_CRON: str = "5 0 * * *"
+    SCHEDULER_GAP_REPAIR_CRON: str = "30 0 * * *"
+    SCHEDULER_CACHE_WARM_CRON: str = "*/5 * * * *"
+    SCHEDULER_JITTER_SECONDS: float = 20.0
+
+    # Memory-mapped daily rate cube shared by all workers (off when unset; see src/rate_history/rate_cube.py)
+    RATE_CUBE_PATH: str | None = None
+    # Shared-memory segment holding the rate state for all workers of a container: one worker
+    # refreshes the rates, the others read them (off when unset; see src/currency/shared_state.py)
+    RATE_STATE_SHM_NAME: str | None = None
+    RATE_STATE_SHM_SIZE_BYTES: int = 8 * 1024 * 1024
+    # Monthly archive files of hourly snapshots past retention (off when unset; see src/rate_history/archive.py)
+    HOURLY_ARCHIVE_DIR: str | None = None
+
+    # Access log (see src/core/middleware.py): the share of requests logged; server errors
+    # and requests slower than ACCESS_LOG_SLOW_SECONDS are always logged
+    ACCESS_LOG_SAMPLE_RATE: float = 0.1
+    ACCESS_LOG_SLOW_SECONDS: float = 1.0
+    # Responses at least this big are compressed for clients that accept it
+    COMPRESSION_MIN_BYTES: int = 1024
+
+    # Request profiling (off unless enabled; see src/core/profiling.py)
+    PROFILING_ENABLED: bool = False
+    PROFILING_ADMIN_KEY: str | None = None
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_MAX_PROFILES: int = 20
+    PROFILING_INTERVAL_SECONDS: float = 0.005
+
+    # Tracing (needs opentelemetry-sdk; see src/core/tracing.py)
+    TRACING_ENABLED: bool = False
+    TRACING_SERVICE_NAME: str = "currency-api"
+    TRACING_EXPORTER: str = "otlp"  # otlp | file | console
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_FILE_PATH: str = "traces.jsonl"
     
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding='utf-8')
 
@@ -2,8 +2,10 @@
 
 from sqlmodel import SQLModel, create_engine, Session
 from src.core.config import settings
+from src.core.metrics import install_query_timer
 
 engine = create_engine(settings.DATABASE_URL, echo=False)
+install_query_timer(engine)
 
 def get_session():
     with Session(engine) as session:
@@ -11,3 +13,7 @@ def get_session():
 
 def init_db():
     SQLModel.metadata.create_all(engine)
+    # create_all skips tables that already exist, so indexes added later are created here
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
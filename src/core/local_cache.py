@@ -0,0 +1,59 @@
+# src/core/local_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Tuple
+
+
+class LocalCache:
+    """
+    An in-process stand-in for the Redis string commands the hot path uses
+    (GET, SET with EX, TTL), serving while Redis is unreachable. Keys expire like
+    Redis keys; past `max_entries` the least recently used key is evicted.
+    Each worker process has its own copy.
+    """
+
+    def __init__(self, max_entries: int = 1024, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[str, float | None]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ex: int | None = None) -> bool:
+        with self._lock:
+            self._entries[key] = (value, self._clock() + ex if ex is not None else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def ttl(self, key: str) -> int:
+        """Seconds left, -1 for a key without expiry and -2 for a missing key (like Redis)."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return -2
+        if entry[1] is None:
+            return -1
+        remaining = entry[1] - self._clock()
+        return int(remaining) if remaining > 0 else -2
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LocalCache()
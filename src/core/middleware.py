@@ -0,0 +1,182 @@
+# src/core/middleware.py
+
+import logging
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import NamedTuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from src.core import metrics
+
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("access")
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Caller-supplied request IDs are kept only if they look like an ID (and cannot forge log lines)
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+# Access log lines waiting for the writer thread; beyond this they are dropped, not queued
+ACCESS_LOG_MAX_PENDING = 10000
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+
+def get_request_id() -> str | None:
+    """The ID of the request being served, for log lines and error reports."""
+    return request_id_var.get()
+
+
+class RequestIdMiddleware:
+    """
+    Gives every request an ID: the caller's `X-Request-ID` if it is a plausible ID,
+    otherwise a new one. It is available through get_request_id() while the request
+    is served and is echoed in the response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        if not request_id or not _VALID_REQUEST_ID.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
+
+
+class AccessLogEntry(NamedTuple):
+    method: str
+    path: str
+    status_code: int
+    duration: float
+    db_seconds: float
+    db_queries: int
+    request_id: str | None
+
+
+class AccessLog:
+    """
+    Sampled access logging off the request path. Requests only pick whether to log
+    and enqueue a tuple; a daemon thread formats and writes the lines. A `sample_rate`
+    share of requests is logged, plus every server error and every request slower
+    than `slow_seconds`. When the writer falls behind, lines are dropped and counted
+    instead of growing the queue.
+    """
+
+    def __init__(self, sample_rate: float, slow_seconds: float, max_pending: int = ACCESS_LOG_MAX_PENDING):
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.dropped = 0
+        self._queue: "queue.Queue[AccessLogEntry | None]" = queue.Queue(maxsize=max_pending)
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    def wants(self, status_code: int, duration: float) -> bool:
+        return status_code >= 500 or duration >= self.slow_seconds or random.random() < self.sample_rate
+
+    def submit(self, entry: AccessLogEntry) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="access-log", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        reported_drops = 0
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            access_logger.info(
+                f"{entry.method} {entry.path} - "
+                f"Status: {entry.status_code} - "
+                f"Duration: {entry.duration:.3f}s - "
+                f"DB: {entry.db_seconds:.3f}s ({entry.db_queries} queries) - "
+                f"Request ID: {entry.request_id}"
+            )
+            if self.dropped > reported_drops:
+                logger.warning(f"Dropped {self.dropped - reported_drops} access log lines: the log writer fell behind.")
+                reported_drops = self.dropped
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Writes out the queued lines (for up to `timeout` seconds) and stops the writer."""
+        thread = self._thread
+        if thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+        self._thread = None
+
+
+class RequestMetricsMiddleware:
+    """
+    Times every request and records it in the Prometheus metrics (labelled by route
+    template, e.g. /savings/{entry_id}, to keep the series count bounded), together with
+    the database time spent on it. Adds a Server-Timing header with the time to the
+    response headers and hands sampled requests to the access log.
+    """
+
+    def __init__(self, app, access_log: AccessLog):
+        self.app = app
+        self.access_log = access_log
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        db_timer = metrics.start_request_db_timer()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed_ms = (time.perf_counter() - start_time) * 1000
+                MutableHeaders(scope=message).append("Server-Timing", f"app;dur={elapsed_ms:.1f}, db;dur={db_timer.seconds * 1000:.1f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start_time
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            metrics.http_request_duration.observe(duration, method, route_path)
+            metrics.http_requests_total.inc(method, route_path, str(status_code))
+            metrics.http_request_db_duration.observe(db_timer.seconds, method, route_path)
+
+            if self.access_log.wants(status_code, duration):
+                self.access_log.submit(AccessLogEntry(
+                    method, scope["path"], status_code, duration, db_timer.seconds, db_timer.queries, get_request_id()
+                ))
@@ -0,0 +1,281 @@
+# src/core/profiling.py
+
+import itertools
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Security, status
+from fastapi.responses import PlainTextResponse
+from fastapi.security import APIKeyHeader
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+PROFILE_KEY_HEADER = "X-Profile-Key"
+# Frames from this directory mark a worker thread as busy with application code
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Tree nodes below this share of the samples are left out of the text report
+MIN_TREE_SHARE = 0.01
+# A profile stops sampling after this many samples (100s at the default 5ms interval)
+MAX_SAMPLES = 20000
+# Responses that can stay open indefinitely are not profiled
+STREAMING_TYPES = ("text/event-stream",)
+
+
+@dataclass
+class RequestProfile:
+    id: int
+    method: str
+    path: str
+    status_code: int
+    duration: float
+    created_at: datetime
+    samples: int
+    interval: float
+    stacks: Dict[Tuple[str, ...], int]
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "duration": round(self.duration, 6),
+            "samples": self.samples,
+            "created_at": self.created_at.isoformat(),
+        }
+
+    def folded(self) -> str:
+        """Collapsed stacks (`frame;frame;frame count`), the input format of flame graph tools."""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in sorted(self.stacks.items())) + "\n"
+
+    def call_tree(self) -> str:
+        """A call tree with the estimated time and share of samples spent under each frame."""
+        tree: Dict = {}
+        for stack, count in self.stacks.items():
+            node = tree
+            for frame in stack:
+                entry = node.setdefault(frame, [0, {}])
+                entry[0] += count
+                node = entry[1]
+
+        lines = [
+            f"{self.method} {self.path} -> {self.status_code} in {self.duration * 1000:.1f}ms "
+            f"({self.samples} samples every {self.interval * 1000:.1f}ms)",
+        ]
+        total = max(self.samples, 1)
+
+        def render(node: Dict, depth: int) -> None:
+            for frame, (count, children) in sorted(node.items(), key=lambda item: -item[1][0]):
+                if count / total < MIN_TREE_SHARE:
+                    continue
+                lines.append(f"{'  ' * depth}{count / total:6.1%} {count * self.interval * 1000:8.1f}ms  {frame}")
+                render(children, depth + 1)
+
+        render(tree, 0)
+        return "\n".join(lines) + "\n"
+
+
+class StackSampler:
+    """
+    A statistical profiler: a background thread records the call stacks of the
+    event loop thread and of every worker thread running application code at a
+    fixed interval. Unlike cProfile it also sees sync endpoints and repo calls that
+    FastAPI runs in its threadpool. Samples of other requests served at the same
+    time are included too, labelled by thread. Sampling ends after `max_samples`.
+    """
+
+    def __init__(self, loop_thread_id: int, interval: float, max_samples: int = MAX_SAMPLES):
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.max_samples = max_samples
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops sampling and waits for the sampler thread (blocking: keep it off the event loop)."""
+        self._stop_event.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while self.samples < self.max_samples and not self._stop_event.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = _extract_stack(frame)
+                if thread_id != self.loop_thread_id and not any(PROJECT_ROOT in filename for filename, _ in stack):
+                    continue
+                if thread_id not in thread_names:
+                    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                thread_label = f"[thread {thread_names.get(thread_id, thread_id)}]"
+                self.stacks[(thread_label,) + tuple(label for _, label in stack)] += 1
+
+
+def _extract_stack(frame) -> List[Tuple[str, str]]:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        short_name = os.path.relpath(filename, os.path.dirname(PROJECT_ROOT)) if filename.startswith(PROJECT_ROOT) else os.path.basename(filename)
+        stack.append((filename, f"{code.co_name} ({short_name}:{code.co_firstlineno})"))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class ProfileStore:
+    """Keeps the last `max_profiles` request profiles in memory."""
+
+    def __init__(self, max_profiles: int):
+        self._profiles: Deque[RequestProfile] = deque(maxlen=max_profiles)
+        self._ids = itertools.count(1)
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add(self, profile: RequestProfile) -> None:
+        self._profiles.append(profile)
+
+    def list(self) -> List[RequestProfile]:
+        return list(reversed(self._profiles))
+
+    def get(self, profile_id: int) -> RequestProfile | None:
+        return next((profile for profile in self._profiles if profile.id == profile_id), None)
+
+
+profile_store = ProfileStore(settings.PROFILING_MAX_PROFILES)
+
+
+class ProfilingMiddleware:
+    """
+    Samples the call stacks of selected requests: every request with an
+    `X-Profile: 1` header and a valid `X-Profile-Key`, plus a random `sample_rate`
+    share of all requests. One request is profiled at a time; others pass through.
+    Event streams are let go as soon as their response starts, so a long-lived
+    stream never holds the profiling slot.
+
+    The middleware is only installed when PROFILING_ENABLED is set, so it costs
+    nothing otherwise.
+    """
+
+    def __init__(self, app, *, admin_key: str | None, sample_rate: float, interval: float, store: ProfileStore = profile_store):
+        self.app = app
+        self.admin_key = admin_key
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.store = store
+        self._busy = threading.Lock()
+
+    def _wants_profile(self, scope) -> bool:
+        headers = dict(scope.get("headers") or [])
+        if headers.get(PROFILE_HEADER.encode()) == b"1":
+            profile_key = headers.get(PROFILE_KEY_HEADER.lower().encode())
+            return bool(self.admin_key) and profile_key == self.admin_key.encode()
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        streaming = False
+        sampler = StackSampler(threading.get_ident(), self.interval)
+
+        async def send_wrapper(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if Headers(raw=message.get("headers", [])).get("content-type", "").startswith(STREAMING_TYPES):
+                    streaming = True
+                    await run_in_threadpool(sampler.stop)
+                    self._busy.release()
+            await send(message)
+
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            try:
+                await run_in_threadpool(sampler.stop)
+            finally:
+                if not streaming:
+                    self._busy.release()
+            if not streaming:
+                profile = RequestProfile(
+                    id=self.store.next_id(),
+                    method=scope["method"],
+                    path=scope["path"],
+                    status_code=status_code,
+                    duration=duration,
+                    created_at=datetime.now(timezone.utc),
+                    samples=sampler.samples,
+                    interval=self.interval,
+                    stacks=dict(sampler.stacks),
+                )
+                self.store.add(profile)
+                logger.info(f"Profiled {profile.method} {profile.path} in {duration:.3f}s as profile {profile.id}.")
+
+
+profile_key_header = APIKeyHeader(name=PROFILE_KEY_HEADER, auto_error=False)
+
+
+async def verify_profile_key(profile_key: str = Security(profile_key_header)):
+    if not settings.PROFILING_ADMIN_KEY or profile_key != settings.PROFILING_ADMIN_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing profiling key"
+        )
+    return profile_key
+
+
+router = APIRouter(
+    prefix="/admin/profiles",
+    tags=["Admin"],
+    dependencies=[Depends(verify_profile_key)]
+)
+
+
+@router.get("")
+def list_profiles():
+    """Lists the stored request profiles, newest first."""
+    return [profile.summary() for profile in profile_store.list()]
+
+
+@router.get("/{profile_id}", response_class=PlainTextResponse)
+def download_profile(
+    profile_id: int,
+    format_: str = Query("tree", alias="format", description="tree (call tree) or folded (flame graph input)"),
+):
+    """Downloads a stored profile as a call tree or as collapsed stacks."""
+    profile = profile_store.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found.")
+    if format_ == "folded":
+        return PlainTextResponse(
+            profile.folded(),
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+        )
+    return PlainTextResponse(profile.call_tree())
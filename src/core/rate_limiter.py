@@ -1,23 +1,84 @@
 import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
 from fastapi import Request, HTTPException, status
 from src.core.redis_client import get_redis_client
 
 logger = logging.getLogger(__name__)
-REQUEST_LIMIT = 20 
-TIME_WINDOW_SECONDS = 60 
+REQUEST_LIMIT = 20
+TIME_WINDOW_SECONDS = 60
+
+
+class LocalTokenBuckets:
+    """
+    Per-client token buckets in process memory, the limiter while Redis is down.
+    A bucket holds up to `capacity` tokens and refills at `refill_per_second`;
+    the least recently seen clients are dropped past `max_clients`.
+    Limits apply per worker process, so the effective limit is looser than Redis's.
+    """
+
+    def __init__(
+        self,
+        capacity: float,
+        refill_per_second: float,
+        max_clients: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()  # client -> [tokens, updated_at]
+        self._lock = threading.Lock()
+
+    def allow(self, client_id: str) -> bool:
+        """Takes one token from the client's bucket; False when it is empty."""
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(client_id)
+            if bucket is None:
+                bucket = self._buckets[client_id] = [self.capacity, now]
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client_id)
+                bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.refill_per_second)
+                bucket[1] = now
+
+            if bucket[0] < 1:
+                return False
+            bucket[0] -= 1
+            return True
+
+
+local_limiter = LocalTokenBuckets(REQUEST_LIMIT, REQUEST_LIMIT / TIME_WINDOW_SECONDS)
+
+
+def _rate_limit_exceeded(client_id: str) -> HTTPException:
+    logger.warning(f"Rate limit exceeded for client: {client_id}")
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=f"Rate limit exceeded. Try again in {TIME_WINDOW_SECONDS} seconds."
+    )
+
 
 async def manual_rate_limiter(request: Request):
     """
-    A simple, manual rate limiter dependency using Redis.
+    A simple, manual rate limiter dependency using Redis, with process-local
+    token buckets while Redis is unavailable.
     """
+    # Use the device ID, fall back to IP address.
+    client_id = request.headers.get("x-device-id", request.client.host)
+
     redis_client = get_redis_client()
     if not redis_client:
-        logger.warning("Redis client not available, skipping rate limit check.")
+        if not local_limiter.allow(client_id):
+            raise _rate_limit_exceeded(client_id)
         return
 
-    # Use the device ID, fall back to IP address.
-    client_id = request.headers.get("x-device-id", request.client.host)
-    
     # Create a unique key for this client in Redis
     redis_key = f"rate_limit:{client_id}"
     current_requests = 0
@@ -27,17 +88,15 @@ async def manual_rate_limiter(request: Request):
         pipeline = redis_client.pipeline()
         pipeline.incr(redis_key, 1)
         pipeline.expire(redis_key, TIME_WINDOW_SECONDS, nx=True) # Set expiration only if the key is new
-        
+
         # Execute and get the current count
         results = pipeline.execute()
         current_requests = results[0]
-            
+
     except Exception as e:
         logger.error(f"Could not check rate limit in Redis: {e}")
+        if not local_limiter.allow(client_id):
+            raise _rate_limit_exceeded(client_id)
 
     if current_requests > REQUEST_LIMIT:
-            logger.warning(f"Rate limit exceeded for client: {client_id}")
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail=f"Rate limit exceeded. Try again in {TIME_WINDOW_SECONDS} seconds."
-            )
\ No newline at end of file
+        raise _rate_limit_exceeded(client_id)
@@ -1,47 +1,172 @@
 import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
 import redis
 from src.core.config import settings
+from src.core.tracing import TracedPipeline, TracedRedis, tracing_enabled
 
 logger = logging.getLogger(__name__)
+
+HEALTHY = "healthy"
+DEGRADED = "degraded"
+# Reconnect attempts while Redis is down back off exponentially between these bounds
+RECONNECT_INITIAL_SECONDS = 1.0
+RECONNECT_MAX_SECONDS = 60.0
+# Errors that mean the server is unreachable, as opposed to a failing command
+REDIS_DOWN_ERRORS = (redis.ConnectionError, redis.TimeoutError)
+
+
+def _with_failure_reporting(client_class, pipeline_class):
+    """A client class whose commands and pipelines report connection errors to the manager."""
+
+    class HealthReportingPipeline(pipeline_class):
+        def execute(self, raise_on_error: bool = True):
+            try:
+                return super().execute(raise_on_error)
+            except REDIS_DOWN_ERRORS as e:
+                redis_manager.report_failure(e)
+                raise
+
+    class HealthReportingRedis(client_class):
+        def execute_command(self, *args, **options):
+            try:
+                return super().execute_command(*args, **options)
+            except REDIS_DOWN_ERRORS as e:
+                redis_manager.report_failure(e)
+                raise
+
+        def pipeline(self, transaction: bool = True, shard_hint=None):
+            return HealthReportingPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+    return HealthReportingRedis
+
+
 class RedisManager:
+    """
+    Owns the process's Redis client and tracks whether Redis is reachable:
+
+        (first use) --connected--> healthy --connection error--> degraded
+        degraded --background reconnect succeeds--> healthy
+
+    While degraded, get_client() returns None immediately, so callers use their
+    process-local fallbacks instead of paying a connect timeout on every call.
+    Reconnects run in a daemon thread with exponential backoff and jitter.
+    """
     _instance = None
-    _client = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
+            cls._instance._reset()
         return cls._instance
-    
+
+    def _reset(self) -> None:
+        self._client = None
+        self._lock = threading.RLock()
+        self._reconnecting = False
+        self.state: str | None = None
+        self.since: datetime | None = None
+        self.last_error: str | None = None
+        self.reconnect_attempts = 0
+        self.next_retry_at: float | None = None
+
+    def _create_client(self):
+        if tracing_enabled():
+            client_class = _with_failure_reporting(TracedRedis, TracedPipeline)
+        else:
+            client_class = _with_failure_reporting(redis.Redis, redis.client.Pipeline)
+        return client_class(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=0,
+            decode_responses=True,
+            socket_connect_timeout=5,
+            socket_keepalive=True,
+            retry_on_timeout=False,
+            ssl=True,
+            ssl_cert_reqs=None
+        )
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        self.since = datetime.now(timezone.utc)
+
+    def _connect(self) -> bool:
+        """One connection attempt (an INFO round trip). Returns True once Redis answers."""
+        try:
+            logger.debug(f"Attempting to connect to Redis at {settings.REDIS_HOST}:{settings.REDIS_PORT}")
+            client = self._client or self._create_client()
+            info = client.info()
+        except Exception as e:
+            self.report_failure(e)
+            return False
+
+        with self._lock:
+            recovered = self.state == DEGRADED
+            self._client = client
+            self._reconnecting = False
+            self.reconnect_attempts = 0
+            self.next_retry_at = None
+            self._set_state(HEALTHY)
+        if recovered:
+            logger.info("Redis is reachable again; leaving degraded mode.")
+        else:
+            logger.info(f"Successfully connected to Redis. Server version: {info.get('redis_version', 'unknown')}")
+        return True
+
+    def _reconnect_loop(self) -> None:
+        delay = RECONNECT_INITIAL_SECONDS
+        while True:
+            # Jitter keeps the workers from reconnecting in lockstep
+            wait = delay * random.uniform(0.5, 1.0)
+            self.next_retry_at = time.time() + wait
+            time.sleep(wait)
+            self.reconnect_attempts += 1
+            if self._connect():
+                return
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+    def report_failure(self, error: Exception) -> None:
+        """Switches to degraded mode (and starts reconnecting) after a connection error."""
+        with self._lock:
+            self.last_error = f"{type(error).__name__}: {error}"
+            if self.state != DEGRADED:
+                logger.error(f"Redis is unreachable ({self.last_error}). Switching to process-local fallbacks.")
+                self._set_state(DEGRADED)
+            if not self._reconnecting:
+                self._reconnecting = True
+                threading.Thread(target=self._reconnect_loop, name="redis-reconnect", daemon=True).start()
+
     def get_client(self):
-        if self._client is None:
-            try:
-                logger.debug("--- REDIS CLIENT INITIALIZATION STARTED ---")
-                logger.debug(f"Attempting to connect to Redis at {settings.REDIS_HOST}:{settings.REDIS_PORT}")
-                
-                self._client = redis.Redis(
-                    host=settings.REDIS_HOST,
-                    port=settings.REDIS_PORT,
-                    db=0,
-                    decode_responses=True,
-                    socket_connect_timeout=5,
-                    socket_keepalive=True,
-                    retry_on_timeout=False,
-                    ssl=True,  
-                    ssl_cert_reqs=None
-                )
-
-                logger.debug("Testing connection with INFO command...")
-                info = self._client.info()
-                logger.info(f"Successfully connected to Redis. Server version: {info.get('redis_version', 'unknown')}")
-                
-            except Exception as e:
-                logger.error("--- FAILED TO INITIALIZE REDIS CLIENT ---")
-                logger.error(f"An unexpected error of type {type(e).__name__} occurred: {e}", exc_info=True)
-                self._client = None
-                
-        return self._client
+        if self.state == HEALTHY:
+            return self._client
+        if self.state == DEGRADED:
+            return None
+        with self._lock:
+            if self.state is None:
+                self._connect()
+        return self._client if self.state == HEALTHY else None
+
+    def status(self) -> dict:
+        """
+        The current mode for the (unauthenticated) health endpoint. The last error is
+        left out: it names the Redis host and port, and is in the logs already.
+        """
+        next_retry_in = None
+        if self.state == DEGRADED and self.next_retry_at is not None:
+            next_retry_in = round(max(0.0, self.next_retry_at - time.time()), 1)
+        return {
+            "mode": "redis" if self.state == HEALTHY else "local",
+            "state": self.state or "not_connected",
+            "since": self.since.isoformat() if self.since else None,
+            "reconnect_attempts": self.reconnect_attempts,
+            "next_retry_in_seconds": next_retry_in,
+        }
 
 redis_manager = RedisManager()
 
 def get_redis_client():
-    return redis_manager.get_client()
\ No newline at end of file
+    return redis_manager.get_client()
@@ -0,0 +1,269 @@
+# src/core/scheduler.py
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Set
+
+from src.core.redis_client import get_redis_client
+from src.core.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY_PREFIX = "scheduler:lock"
+LAST_RUN_KEY_PREFIX = "scheduler:last_run"
+
+
+class CronExpression:
+    """
+    A standard 5-field cron expression (minute hour day-of-month month day-of-week),
+    evaluated in UTC. Supports `*`, lists (`1,15`), ranges (`1-5`) and steps (`*/10`, `0-30/5`).
+    Day-of-week uses 0-6 with 0 = Sunday (7 is accepted as Sunday too).
+    """
+
+    _FIELD_BOUNDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Invalid cron expression '{expression}': expected 5 fields.")
+        self.expression = expression
+        fields = [self._parse_field(part, low, high) for part, (low, high) in zip(parts, self._FIELD_BOUNDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = fields
+        self.weekdays = {0 if day == 7 else day for day in weekdays}
+        self._day_restricted = parts[2] != "*"
+        self._weekday_restricted = parts[4] != "*"
+
+    @staticmethod
+    def _parse_field(part: str, low: int, high: int) -> Set[int]:
+        values: Set[int] = set()
+        for item in part.split(","):
+            value_range, _, step_str = item.partition("/")
+            step = int(step_str) if step_str else 1
+            if value_range == "*":
+                start, end = low, high
+            elif "-" in value_range:
+                start_str, end_str = value_range.split("-", 1)
+                start, end = int(start_str), int(end_str)
+            else:
+                start = int(value_range)
+                end = high if step_str else start
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"Invalid cron field '{part}'.")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.isoweekday() % 7) in self.weekdays
+        # Classic cron semantics: if both fields are restricted, either one may match.
+        if self._day_restricted and self._weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, dt: datetime) -> datetime:
+        """Returns the first fire time strictly after `dt`."""
+        candidate = dt.astimezone(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = (candidate.year + 1, 1) if candidate.month == 12 else (candidate.year, candidate.month + 1)
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression '{self.expression}' never fires.")
+
+    def previous_before(self, dt: datetime) -> datetime:
+        """Returns the latest fire time at or before `dt` (searching back up to 31 days)."""
+        dt = dt.astimezone(timezone.utc).replace(second=0, microsecond=0)
+        for lookback in (timedelta(hours=1), timedelta(days=1), timedelta(days=31)):
+            fire = self.next_after(dt - lookback - timedelta(minutes=1))
+            if fire > dt:
+                continue
+            while True:
+                following = self.next_after(fire)
+                if following > dt:
+                    return fire
+                fire = following
+        raise ValueError(f"Cron expression '{self.expression}' has no fire time in the last 31 days.")
+
+
+@dataclass
+class JobMetrics:
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    last_status: str | None = None
+    last_started_at: datetime | None = None
+    last_duration: float = 0.0
+    max_duration: float = 0.0
+    total_duration: float = 0.0
+
+    @property
+    def avg_duration(self) -> float:
+        return self.total_duration / self.runs if self.runs else 0.0
+
+
+@dataclass
+class ScheduledJob:
+    """
+    A coroutine function run on a cron schedule.
+
+    All jobs share one event loop, so a job must keep blocking work (database sessions,
+    file writes) off it with `asyncio.to_thread`: while the loop is blocked, no other
+    job can fire and the timeout cannot expire.
+
+    jitter_seconds: random delay added to each fire time to spread load across replicas.
+    timeout_seconds: the run is cancelled (and counted as failed) after this long. A
+        blocking section already running in a thread still finishes in the background.
+    catch_up: run once on start-up if the most recent fire time was missed.
+    """
+    name: str
+    cron: CronExpression
+    func: Callable[[], Awaitable[object]]
+    jitter_seconds: float = 0.0
+    timeout_seconds: float = 15 * 60
+    catch_up: bool = True
+    metrics: JobMetrics = field(default_factory=JobMetrics)
+
+
+class JobScheduler:
+    """
+    Runs jobs on cron schedules inside one long-lived process, so database pools,
+    the Redis connection and the interpreter stay warm between runs.
+
+    Several replicas can run the scheduler at once: before a fire time is executed,
+    a replica must win a Redis `SET NX` lock keyed by job name and fire time,
+    so each run happens on exactly one replica.
+    """
+
+    def __init__(self, jobs: List[ScheduledJob] | None = None):
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop_event = asyncio.Event()
+        for job in jobs or []:
+            self.add_job(job)
+
+    def add_job(self, job: ScheduledJob) -> None:
+        if job.name in self.jobs:
+            raise ValueError(f"Job '{job.name}' is already registered.")
+        self.jobs[job.name] = job
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    async def run_forever(self) -> None:
+        logger.info(f"Scheduler {self.instance_id} started with jobs: {', '.join(self.jobs)}.")
+        await asyncio.gather(*(self._job_loop(job) for job in self.jobs.values()))
+        logger.info("Scheduler stopped.")
+
+    async def _job_loop(self, job: ScheduledJob) -> None:
+        if job.catch_up:
+            missed_fire = self._missed_fire_time(job)
+            if missed_fire:
+                logger.warning(f"Job '{job.name}' missed its run at {missed_fire}. Catching up now.")
+                await self.execute(job, missed_fire)
+
+        while not self._stop_event.is_set():
+            fire_time = job.cron.next_after(datetime.now(timezone.utc))
+            delay = (fire_time - datetime.now(timezone.utc)).total_seconds()
+            delay += random.uniform(0, job.jitter_seconds)
+            if await self._sleep(delay):
+                return
+            await self.execute(job, fire_time)
+
+    async def _sleep(self, seconds: float) -> bool:
+        """Sleeps for the given time. Returns True if the scheduler was stopped meanwhile."""
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=max(0.0, seconds))
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _missed_fire_time(self, job: ScheduledJob) -> datetime | None:
+        redis_client = get_redis_client()
+        if not redis_client:
+            return None
+        try:
+            last_run = redis_client.get(f"{LAST_RUN_KEY_PREFIX}:{job.name}")
+        except Exception as e:
+            logger.error(f"Could not read last run of job '{job.name}' from Redis: {e}")
+            return None
+        if not last_run:
+            return None
+
+        previous_fire = job.cron.previous_before(datetime.now(timezone.utc))
+        if datetime.fromtimestamp(float(last_run), tz=timezone.utc) < previous_fire:
+            return previous_fire
+        return None
+
+    def _acquire_lock(self, job: ScheduledJob, fire_time: datetime) -> bool:
+        redis_client = get_redis_client()
+        if not redis_client:
+            logger.warning(f"Redis not available; running job '{job.name}' without leader election.")
+            return True
+        lock_key = f"{LOCK_KEY_PREFIX}:{job.name}:{int(fire_time.timestamp())}"
+        try:
+            # The lock outlives the run so a slow replica cannot pick the same fire time up later.
+            return bool(redis_client.set(lock_key, self.instance_id, nx=True, ex=int(job.timeout_seconds) + 3600))
+        except Exception as e:
+            logger.error(f"Could not acquire scheduler lock '{lock_key}': {e}. Running job anyway.")
+            return True
+
+    def _record_last_run(self, job: ScheduledJob, fire_time: datetime) -> None:
+        redis_client = get_redis_client()
+        if not redis_client:
+            return
+        try:
+            redis_client.set(f"{LAST_RUN_KEY_PREFIX}:{job.name}", fire_time.timestamp())
+        except Exception as e:
+            logger.error(f"Could not record last run of job '{job.name}' in Redis: {e}")
+
+    async def execute(self, job: ScheduledJob, fire_time: datetime) -> bool:
+        """Runs one fire time of a job if this replica wins the lock. Returns True if it ran."""
+        if not self._acquire_lock(job, fire_time):
+            job.metrics.skipped += 1
+            logger.info(f"Job '{job.name}' for {fire_time} is running on another replica. Skipping.")
+            return False
+
+        metrics = job.metrics
+        metrics.last_started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        try:
+            with start_span(f"job {job.name}", attributes={"job.fire_time": fire_time.isoformat()}):
+                await asyncio.wait_for(job.func(), timeout=job.timeout_seconds)
+            metrics.last_status = "success"
+        except asyncio.TimeoutError:
+            metrics.failures += 1
+            metrics.last_status = "timeout"
+            logger.error(f"Job '{job.name}' timed out after {job.timeout_seconds}s.")
+        except Exception as e:
+            metrics.failures += 1
+            metrics.last_status = "failed"
+            logger.error(f"Job '{job.name}' failed: {e}", exc_info=True)
+        finally:
+            duration = time.perf_counter() - start
+            metrics.runs += 1
+            metrics.last_duration = duration
+            metrics.max_duration = max(metrics.max_duration, duration)
+            metrics.total_duration += duration
+
+        if metrics.last_status == "success":
+            self._record_last_run(job, fire_time)
+        logger.info(
+            f"Job '{job.name}' {metrics.last_status} in {metrics.last_duration:.3f}s "
+            f"(runs={metrics.runs}, failures={metrics.failures}, skipped={metrics.skipped}, "
+            f"avg={metrics.avg_duration:.3f}s, max={metrics.max_duration:.3f}s)"
+        )
+        return True
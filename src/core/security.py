@@ -1,16 +1,43 @@
-from fastapi import Security, HTTPException, status
+import hmac
+import json
+from typing import Iterable
+
 from fastapi.security import APIKeyHeader
-from src.core.config import settings
+from starlette.datastructures import Headers
+
+API_KEY_HEADER = "X-API-KEY"
+
+# Declares the header for the OpenAPI docs; the key itself is checked by ApiKeyMiddleware
+api_key_header = APIKeyHeader(name=API_KEY_HEADER, auto_error=False)
+
+_UNAUTHORIZED_BODY = json.dumps({"detail": "Invalid or missing API Key"}).encode()
 
-api_key_header = APIKeyHeader(name="X-API-KEY", auto_error=False)
 
-async def verify_api_key(api_key: str = Security(api_key_header)):
+class ApiKeyMiddleware:
     """
-    Dependency function to verify the API key from the X-API-KEY header.
+    Rejects requests under the protected path prefixes that do not carry the
+    API key in the X-API-KEY header, before they are routed (so unauthenticated
+    traffic never reaches the rate limiter, the database or Redis).
     """
-    if not api_key or api_key != settings.API_SECRET_KEY:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or missing API Key"
-        )
-    return api_key
\ No newline at end of file
+
+    def __init__(self, app, api_key: str, protected_prefixes: Iterable[str]):
+        self.app = app
+        self.api_key = api_key.encode()
+        self.protected_prefixes = tuple(protected_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.protected_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        api_key = Headers(scope=scope).get(API_KEY_HEADER, "").encode()
+        if api_key and hmac.compare_digest(api_key, self.api_key):
+            await self.app(scope, receive, send)
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": 401,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(_UNAUTHORIZED_BODY)).encode())],
+        })
+        await send({"type": "http.response.body", "body": _UNAUTHORIZED_BODY})
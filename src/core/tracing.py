@@ -0,0 +1,254 @@
+# src/core/tracing.py
+
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Sequence
+
+import httpx
+import redis
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter, SpanExportResult
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+    OTEL_AVAILABLE = True
+except ImportError:
+    OTEL_AVAILABLE = False
+
+TRACER_NAME = "currency-api"
+# Environment variables a caller (e.g. a cron trigger or CI step) sets to make job runs part of its trace
+TRACEPARENT_ENV = "TRACEPARENT"
+TRACESTATE_ENV = "TRACESTATE"
+
+_setup_lock = threading.Lock()
+_configured = False
+
+
+def tracing_enabled() -> bool:
+    return settings.TRACING_ENABLED and OTEL_AVAILABLE
+
+
+if OTEL_AVAILABLE:
+    class JsonLinesSpanExporter(SpanExporter):
+        """Appends finished spans to a file, one OTLP-style JSON object per line."""
+
+        def __init__(self, path: str):
+            self.path = path
+            self._lock = threading.Lock()
+
+        def export(self, spans: Sequence[ReadableSpan]) -> "SpanExportResult":
+            lines = [json.dumps(json.loads(span.to_json()), separators=(",", ":")) for span in spans]
+            try:
+                with self._lock, open(self.path, "a", encoding="utf-8") as trace_file:
+                    trace_file.write("\n".join(lines) + "\n")
+            except OSError as e:
+                logger.error(f"Could not write spans to {self.path}: {e}")
+                return SpanExportResult.FAILURE
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self) -> None:
+            pass
+
+
+def _build_exporter() -> "SpanExporter":
+    exporter = settings.TRACING_EXPORTER
+    if exporter == "file":
+        return JsonLinesSpanExporter(settings.TRACING_FILE_PATH)
+    if exporter == "console":
+        return ConsoleSpanExporter()
+    # The OTLP exporter is a separate package; only needed when exporting to a collector.
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    return OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+
+
+def setup_tracing(service_name: str | None = None) -> bool:
+    """
+    Installs the tracer provider and exporter (TRACING_EXPORTER: otlp, file or console).
+    Returns False, leaving every tracing hook a no-op, when TRACING_ENABLED is off
+    or OpenTelemetry is not installed.
+    """
+    global _configured
+    if not settings.TRACING_ENABLED:
+        return False
+    if not OTEL_AVAILABLE:
+        logger.warning("TRACING_ENABLED is set but opentelemetry-sdk is not installed; tracing is off.")
+        return False
+
+    with _setup_lock:
+        if _configured:
+            return True
+        try:
+            exporter = _build_exporter()
+        except ImportError as e:
+            logger.error(f"Could not load the '{settings.TRACING_EXPORTER}' span exporter: {e}")
+            return False
+        provider = TracerProvider(resource=Resource.create({"service.name": service_name or settings.TRACING_SERVICE_NAME}))
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+        _configured = True
+
+    logger.info(f"Tracing enabled for '{service_name or settings.TRACING_SERVICE_NAME}' with the {settings.TRACING_EXPORTER} exporter.")
+    return True
+
+
+@contextmanager
+def start_span(name: str, *, kind=None, attributes: Dict | None = None, context=None) -> Iterator[object]:
+    """
+    Runs the block in a child span of the current one (or of `context`).
+    Yields None without creating anything when tracing is off.
+    """
+    if not tracing_enabled():
+        yield None
+        return
+    tracer = trace.get_tracer(TRACER_NAME)
+    with tracer.start_as_current_span(name, context=context, kind=kind or SpanKind.INTERNAL, attributes=attributes) as span:
+        yield span
+
+
+def traced(name: str | None = None) -> Callable:
+    """
+    Decorates a function to run in its own span (named `<module>.<function>` by default).
+    When tracing is off the function is returned unchanged, so it costs nothing.
+    """
+    def decorator(func: Callable) -> Callable:
+        if not tracing_enabled():
+            return func
+        module = func.__module__.removeprefix("src.")
+        span_name = name or f"{module}.{func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def context_from_environment():
+    """
+    The trace context passed in through TRACEPARENT/TRACESTATE, or None.
+    Lets a one-shot job run join the trace of whatever started it.
+    """
+    if not tracing_enabled() or not os.environ.get(TRACEPARENT_ENV):
+        return None
+    carrier = {"traceparent": os.environ[TRACEPARENT_ENV]}
+    if os.environ.get(TRACESTATE_ENV):
+        carrier["tracestate"] = os.environ[TRACESTATE_ENV]
+    return propagate.extract(carrier)
+
+
+# --- Redis ---
+
+class TracedPipeline(redis.client.Pipeline):
+    def execute(self, raise_on_error: bool = True):
+        commands = [str(args[0]) for args, _ in self.command_stack]
+        attributes = {"db.system": "redis", "db.operation": "PIPELINE", "db.redis.commands": ",".join(sorted(set(commands)))}
+        with start_span("redis PIPELINE", kind=SpanKind.CLIENT, attributes=attributes):
+            return super().execute(raise_on_error)
+
+
+class TracedRedis(redis.Redis):
+    """A Redis client that runs every command (and every pipeline flush) in a client span."""
+
+    def execute_command(self, *args, **options):
+        operation = str(args[0])
+        with start_span(f"redis {operation}", kind=SpanKind.CLIENT, attributes={"db.system": "redis", "db.operation": operation}):
+            return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> TracedPipeline:
+        return TracedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+# --- httpx ---
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps an httpx transport: every request runs in a client span and carries
+    a `traceparent` header. The query string (API keys) is left out of the span.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None):
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attributes = {
+            "http.request.method": request.method,
+            "server.address": request.url.host,
+            "url.full": str(request.url.copy_with(query=None)),
+        }
+        with start_span(f"HTTP {request.method} {request.url.host}", kind=SpanKind.CLIENT, attributes=attributes) as span:
+            propagate.inject(request.headers)
+            response = await self._transport.handle_async_request(request)
+            span.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.set_status(Status(StatusCode.ERROR))
+            return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def http_transport(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncBaseTransport | None:
+    """The transport to give an httpx.AsyncClient: `transport` itself, wrapped for tracing when enabled."""
+    if not tracing_enabled():
+        return transport
+    return TracingTransport(transport)
+
+
+# --- ASGI ---
+
+class TracingMiddleware:
+    """
+    Opens a server span per HTTP request, continuing the caller's trace when the
+    request carries a `traceparent` header. Spans are named by route template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracing_enabled():
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers") or []}
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        attributes = {"http.request.method": method, "url.path": scope["path"]}
+        with start_span(f"{method} {scope['path']}", kind=SpanKind.SERVER, attributes=attributes, context=propagate.extract(carrier)) as span:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    span.update_name(f"{method} {route.path}")
+                    span.set_attribute("http.route", route.path)
+                span.set_attribute("http.response.status_code", status_code)
+                if status_code >= 500:
+                    span.set_status(Status(StatusCode.ERROR))
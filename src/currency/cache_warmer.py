@@ -0,0 +1,109 @@
+# src/currency/cache_warmer.py
+
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+
+from src.core.compression import precompressed_bodies
+from src.core.metrics import record_cache
+from src.core.redis_client import get_redis_client
+from .rate_state import RateState, build_rate_state, get_fresh_rate_state, set_rate_state
+from .rate_updates import publish_rates_update
+
+logger = logging.getLogger(__name__)
+
+LATEST_RATES_KEY = "latest_usd_rates"
+RATES_BODY_KEY_PREFIX = "rates_body"
+
+# `/rates` bodies serialized from the current rate state, rebuilt whenever the state is swapped
+_state_bodies: Tuple[RateState | None, Dict[str, str]] = (None, {})
+
+
+def rates_body_key(base: str) -> str:
+    return f"{RATES_BODY_KEY_PREFIX}:{base}"
+
+
+def serialize_rates_body(base: str, cross_rates: Dict[str, float]) -> str:
+    """Serializes a `/rates` response body (same shape as BatchConversionResponse)."""
+    return json.dumps(
+        {"from": base, "rates": [{"to": to, "rate": rate} for to, rate in cross_rates.items()]},
+        separators=(",", ":"),
+    )
+
+
+def warm_rate_caches(
+    usd_rates: Dict[str, float],
+    codes: Iterable[str],
+    as_of: datetime,
+    ttl_seconds: int,
+    decimal_places: Dict[str, int] | None = None,
+) -> RateState:
+    """
+    Rebuilds everything derived from a new set of USD rates in one go:
+    the in-process rate state (with the cross-rate matrix), the `latest_usd_rates`
+    key and the pre-serialized `/rates` body of every active base currency.
+    All Redis keys share the same TTL so they expire together. Finally the new
+    state is published so every API worker swaps it in right away.
+    """
+    state = build_rate_state(usd_rates, codes, as_of, decimal_places)
+    set_rate_state(state)
+
+    redis_client = get_redis_client()
+    if redis_client:
+        try:
+            pipeline = redis_client.pipeline(transaction=False)
+            pipeline.set(LATEST_RATES_KEY, json.dumps(usd_rates), ex=ttl_seconds)
+            for base in state.codes:
+                pipeline.set(rates_body_key(base), serialize_rates_body(base, state.matrix[base]), ex=ttl_seconds)
+            pipeline.execute()
+            logger.info(f"CACHE WARM: Saved latest rates and {len(state.codes)} /rates bodies for {as_of} with TTL {ttl_seconds}s.")
+        except Exception as e:
+            logger.error(f"Could not warm rate caches in Redis: {e}")
+
+    publish_rates_update(state)
+    return state
+
+
+def _state_rates_body(state: RateState, base: str) -> str:
+    global _state_bodies
+    cached_state, bodies = _state_bodies
+    if cached_state is not state:
+        bodies = {}
+        _state_bodies = (state, bodies)
+    body = bodies.get(base)
+    if body is None:
+        body = bodies[base] = serialize_rates_body(base, state.matrix[base])
+    return body
+
+
+def precompress_rates_bodies(state: RateState) -> None:
+    """
+    Builds the compressed `/rates` bodies of a new rate state up front. Registered as a
+    state listener by the API workers, so it runs on the thread installing the state
+    and requests never compress a rates body on the event loop.
+    """
+    for base in state.codes:
+        precompressed_bodies.add(rates_body_key(base), _state_rates_body(state, base))
+
+
+def get_cached_rates_body(base: str) -> str | None:
+    """
+    Returns the pre-serialized `/rates` body for a base currency: from the pushed
+    in-process rate state while it is fresh, otherwise from Redis if it is cached there.
+    """
+    state = get_fresh_rate_state()
+    if state is not None and state.cross_rates(base) is not None:
+        record_cache(RATES_BODY_KEY_PREFIX, True)
+        return _state_rates_body(state, base)
+
+    redis_client = get_redis_client()
+    if not redis_client:
+        return None
+    try:
+        body = redis_client.get(rates_body_key(base))
+        record_cache(RATES_BODY_KEY_PREFIX, bool(body))
+        return body
+    except Exception as e:
+        logger.error(f"Could not read cached /rates body for {base}: {e}")
+        return None
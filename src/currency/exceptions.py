@@ -1,6 +1,10 @@
 # src/currency/exceptions.py
 
+import math
+
 from fastapi import Request, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
 class CurrencyAPIError(Exception):
@@ -13,4 +17,20 @@ async def currency_api_exception_handler(request: Request, exc: CurrencyAPIError
     return JSONResponse(
         status_code=502,
         content={"error_code": exc.code, "error_message": exc.message}
-    )
\ No newline at end of file
+    )
+
+def _finite_json(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: _finite_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_finite_json(item) for item in value]
+    return value
+
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    """
+    The usual 422 response, except that non-finite numbers in the echoed input (a JSON
+    body may carry `Infinity` or `NaN`) are sent as strings, since JSON cannot encode them.
+    """
+    return JSONResponse(status_code=422, content={"detail": _finite_json(jsonable_encoder(exc.errors()))})
@@ -0,0 +1,319 @@
+# src/currency/providers.py
+
+import asyncio
+import json
+import logging
+import time
+from typing import Callable, Dict, List, Sequence
+
+import httpx
+
+from src.core.config import settings
+from src.core.metrics import time_upstream
+from src.core.tracing import http_transport
+from .exceptions import CurrencyAPIError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class RateProvider:
+    """
+    A source of the latest USD-based rates. `fetch` raises CurrencyAPIError on any failure.
+    `complete` providers cover every supported currency; the others only a subset.
+    """
+    name = "provider"
+    complete = True
+
+    async def fetch(self) -> Dict[str, float]:
+        raise NotImplementedError
+
+
+class HttpRateProvider(RateProvider):
+    """A provider behind a JSON HTTP endpoint whose response has a `rates` map."""
+
+    def __init__(self, url: str, *, timeout: float, transport: httpx.AsyncBaseTransport | None = None):
+        self.url = url
+        self.timeout = timeout
+        self.transport = transport
+
+    def request_params(self) -> Dict[str, str]:
+        return {}
+
+    def parse(self, data: Dict) -> Dict[str, float]:
+        return data.get("rates") or {}
+
+    async def fetch(self) -> Dict[str, float]:
+        try:
+            async with httpx.AsyncClient(transport=http_transport(self.transport)) as client:
+                response = await client.get(self.url, params=self.request_params(), timeout=self.timeout)
+            data = response.json()
+        except httpx.RequestError as e:
+            raise CurrencyAPIError(code=502, message=f"{self.name} request failed: {e}")
+        except ValueError:
+            raise CurrencyAPIError(code=502, message=f"{self.name} returned invalid JSON.")
+
+        if response.is_error or "error" in data:
+            raise CurrencyAPIError(
+                code=data.get("status", response.status_code),
+                message=data.get("description") or data.get("message") or f"{self.name} returned HTTP {response.status_code}.",
+            )
+        rates = self.parse(data)
+        if not rates:
+            raise CurrencyAPIError(code=502, message=f"{self.name} returned no rates.")
+        return rates
+
+
+class OpenExchangeRatesProvider(HttpRateProvider):
+    """openexchangerates.org: ~170 currencies against USD, refreshed hourly."""
+    name = "oxr"
+
+    def __init__(self, api_key: str, url: str, *, timeout: float, transport: httpx.AsyncBaseTransport | None = None):
+        super().__init__(url, timeout=timeout, transport=transport)
+        self.api_key = api_key
+
+    def request_params(self) -> Dict[str, str]:
+        return {"app_id": self.api_key}
+
+
+class FrankfurterProvider(HttpRateProvider):
+    """Frankfurter (ECB reference rates): ~30 currencies, daily, no API key."""
+    name = "frankfurter"
+    complete = False
+
+    def request_params(self) -> Dict[str, str]:
+        return {"from": "USD"}
+
+    def parse(self, data: Dict) -> Dict[str, float]:
+        rates = data.get("rates") or {}
+        # The base currency is left out of the response
+        return {**rates, "USD": 1.0} if rates else {}
+
+
+class FileRateProvider(RateProvider):
+    """
+    Rates from a local JSON file (`{"rates": {...}}` or a bare code -> rate map).
+    A stand-in for the real providers in tests and offline development.
+    """
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _read(self) -> Dict[str, float]:
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        return data.get("rates", data)
+
+    async def fetch(self) -> Dict[str, float]:
+        try:
+            rates = await asyncio.to_thread(self._read)
+        except (OSError, ValueError) as e:
+            raise CurrencyAPIError(code=502, message=f"Could not read rates from {self.path}: {e}")
+        if not rates:
+            raise CurrencyAPIError(code=502, message=f"No rates in {self.path}.")
+        return rates
+
+
+class CircuitBreaker:
+    """
+    Fails fast while a provider is down: after `failure_threshold` consecutive
+    failures the circuit opens and calls are refused for `reset_timeout` seconds.
+    Then a single trial call is let through (half-open); its outcome closes or
+    re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return CLOSED
+        if self._trial_in_flight or self._clock() - self.opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return OPEN
+
+    def allow_request(self) -> bool:
+        """Whether a call may go out now; in half-open state only the first caller gets through."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            self.opened_at = self._clock()
+        self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Gives up a call without an outcome (e.g. a cancelled hedge), freeing the trial slot."""
+        self._trial_in_flight = False
+
+
+def merge_rates(results: Sequence[Dict[str, float]], fallback: Dict[str, float] | None = None) -> Dict[str, float]:
+    """
+    Merge policy: `results` are in provider priority order, and every currency takes
+    its rate from the first result that has it. Currencies no fresh result has keep
+    their `fallback` (last known) rate, so a smaller backup provider never makes
+    currencies disappear.
+    """
+    merged: Dict[str, float] = {}
+    for rates in reversed(results):
+        merged.update(rates)
+    if fallback:
+        merged = {**fallback, **merged}
+    return merged
+
+
+class RateProviderChain:
+    """
+    Asks the providers in priority order and returns on the first successful answer.
+    A provider that fails hands over to the next one at once; one that is still
+    silent after `hedge_delay` seconds gets a hedged request to the next one in
+    parallel, and whichever answers first wins (the rest are cancelled).
+    Providers with an open circuit are skipped without a call.
+    """
+
+    def __init__(
+        self,
+        providers: Sequence[RateProvider],
+        *,
+        hedge_delay: float,
+        failure_threshold: int,
+        reset_timeout: float
+    ):
+        self.providers = list(providers)
+        self.hedge_delay = hedge_delay
+        self.breakers = {
+            provider.name: CircuitBreaker(failure_threshold, reset_timeout) for provider in self.providers
+        }
+
+    def _record_failure(self, provider: RateProvider, reason: str) -> None:
+        breaker = self.breakers[provider.name]
+        breaker.record_failure()
+        logger.warning(f"Rate provider '{provider.name}' failed (circuit {breaker.state}): {reason}")
+
+    async def _call(self, provider: RateProvider) -> Dict[str, float]:
+        breaker = self.breakers[provider.name]
+        try:
+            with time_upstream(provider.name):
+                rates = await provider.fetch()
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except CurrencyAPIError as e:
+            self._record_failure(provider, e.message)
+            raise
+        except Exception as e:
+            self._record_failure(provider, repr(e))
+            raise CurrencyAPIError(code=502, message=f"{provider.name} failed: {e!r}") from e
+        breaker.record_success()
+        return rates
+
+    async def fetch_latest(self, fallback: Dict[str, float] | None = None, complete_only: bool = False) -> Dict[str, float]:
+        """
+        The latest USD-based rates, merged with `fallback` by merge_rates.
+        With complete_only=True only providers covering every currency are asked, so
+        the result never mixes in fallback rates (for snapshots recorded as `real`).
+        """
+        if not self.providers:
+            raise CurrencyAPIError(code=500, message="Server configuration error: no rate providers configured.")
+        waiting = [(index, provider) for index, provider in enumerate(self.providers) if provider.complete or not complete_only]
+        if not waiting:
+            raise CurrencyAPIError(code=503, message="No rate provider covering every currency is configured.")
+        pending: Dict[asyncio.Task, int] = {}
+        results: Dict[int, Dict[str, float]] = {}
+        errors: List[str] = []
+
+        def launch() -> RateProvider | None:
+            """Starts a call to the next provider whose circuit lets it through."""
+            while waiting:
+                index, provider = waiting.pop(0)
+                if self.breakers[provider.name].allow_request():
+                    pending[asyncio.create_task(self._call(provider))] = index
+                    return provider
+                errors.append(f"{provider.name}: circuit open")
+            return None
+
+        if launch() is None:
+            raise CurrencyAPIError(code=503, message="All rate providers are unavailable (circuits open).")
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, timeout=self.hedge_delay if waiting else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    provider = launch()
+                    if provider:
+                        logger.info(f"No rates within {self.hedge_delay}s; hedging with '{provider.name}'.")
+                    continue
+                for task in done:
+                    index = pending.pop(task)
+                    try:
+                        results[index] = task.result()
+                    except CurrencyAPIError as e:
+                        errors.append(f"{self.providers[index].name}: {e.message}")
+                if results:
+                    break
+                if not pending:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+            # Cancelled calls release their half-open trial slot
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if not results:
+            raise CurrencyAPIError(code=502, message=f"All rate providers failed: {'; '.join(errors)}")
+        winners = [self.providers[index].name for index in sorted(results)]
+        logger.info(f"Fetched latest rates from {', '.join(winners)}.")
+        return merge_rates([results[index] for index in sorted(results)], fallback)
+
+
+def build_rate_providers() -> List[RateProvider]:
+    """The providers named in RATE_PROVIDERS, in that (priority) order."""
+    providers: List[RateProvider] = []
+    timeout = settings.RATE_PROVIDER_TIMEOUT_SECONDS
+    for name in (name.strip() for name in settings.RATE_PROVIDERS.split(",")):
+        if name == "oxr":
+            if not settings.OPEN_EXCHANGE_RATES_API_KEY:
+                logger.warning("Skipping the 'oxr' rate provider: missing OPEN_EXCHANGE_RATES_API_KEY.")
+                continue
+            providers.append(OpenExchangeRatesProvider(
+                settings.OPEN_EXCHANGE_RATES_API_KEY, settings.OPEN_EXCHANGE_RATES_API_URL, timeout=timeout
+            ))
+        elif name == "frankfurter":
+            providers.append(FrankfurterProvider(settings.FRANKFURTER_API_URL, timeout=timeout))
+        elif name == "file":
+            if not settings.RATE_PROVIDER_FILE_PATH:
+                raise ValueError("The 'file' rate provider needs RATE_PROVIDER_FILE_PATH.")
+            providers.append(FileRateProvider(settings.RATE_PROVIDER_FILE_PATH))
+        elif name:
+            raise ValueError(f"Unknown rate provider '{name}'. Use oxr, frankfurter or file.")
+    return providers
+
+
+rate_providers = RateProviderChain(
+    build_rate_providers(),
+    hedge_delay=settings.RATE_PROVIDER_HEDGE_DELAY_SECONDS,
+    failure_threshold=settings.RATE_PROVIDER_FAILURE_THRESHOLD,
+    reset_timeout=settings.RATE_PROVIDER_OPEN_SECONDS,
+)
@@ -0,0 +1,89 @@
+# src/currency/rate_state.py
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Past this age the in-process rates are not served any more: the updates have stalled
+RATE_STATE_MAX_AGE = timedelta(hours=2)
+
+
+@dataclass(frozen=True)
+class RateState:
+    """
+    An immutable snapshot of the latest USD-based rates and everything derived from them.
+    A new state is built whenever rates change and swapped in as a whole, so readers
+    never see a half-updated matrix.
+    """
+    version: int                                  # epoch seconds of `as_of`
+    as_of: datetime                               # bucket time of the underlying rates
+    usd_rates: Dict[str, float]                   # {"EUR": 0.92, "TRY": 32.2, ...}
+    codes: Tuple[str, ...]                        # active currency codes, in catalogue order
+    matrix: Dict[str, Dict[str, float]]           # cross rates: matrix[base][to]
+    decimal_places: Dict[str, int] = field(default_factory=dict)  # {"JPY": 0, "KWD": 3, ...}
+
+    def cross_rates(self, base: str) -> Dict[str, float] | None:
+        """Rates from `base` to every other active currency, or None if `base` is unknown."""
+        return self.matrix.get(base)
+
+
+def build_rate_state(
+    usd_rates: Dict[str, float],
+    codes: Iterable[str],
+    as_of: datetime,
+    decimal_places: Dict[str, int] | None = None,
+) -> RateState:
+    """
+    Builds the cross-rate matrix for the active currencies that have a USD rate.
+    EUR -> TRY = (USD -> TRY) / (USD -> EUR)
+    """
+    active = tuple(code for code in codes if usd_rates.get(code))
+    matrix = {
+        base: {to: usd_rates[to] / usd_rates[base] for to in active if to != base}
+        for base in active
+    }
+    return RateState(
+        version=int(as_of.timestamp()),
+        as_of=as_of,
+        usd_rates=dict(usd_rates),
+        codes=active,
+        matrix=matrix,
+        decimal_places={code: places for code, places in (decimal_places or {}).items() if code in matrix},
+    )
+
+
+_current_state: RateState | None = None
+_listeners: List[Callable[[RateState], None]] = []
+
+
+def get_rate_state() -> RateState | None:
+    return _current_state
+
+
+def get_fresh_rate_state() -> RateState | None:
+    """The current state, or None when there is none or it is older than RATE_STATE_MAX_AGE."""
+    state = _current_state
+    if state is None or datetime.now(timezone.utc) - state.as_of >= RATE_STATE_MAX_AGE:
+        return None
+    return state
+
+
+def add_state_listener(listener: Callable[[RateState], None]) -> None:
+    """Registers a callback run (on the installing thread) after each new state is installed."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def set_rate_state(state: RateState) -> bool:
+    """
+    Swaps in a new state unless it is older than the current one.
+    Returns True if the state was installed.
+    """
+    global _current_state
+    current = _current_state
+    if current is not None and state.version < current.version:
+        return False
+    _current_state = state
+    for listener in _listeners:
+        listener(state)
+    return True
@@ -0,0 +1,144 @@
+# src/currency/rate_updates.py
+
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict
+
+from src.core.redis_client import get_redis_client
+from .rate_state import RateState, build_rate_state, get_rate_state, set_rate_state
+
+logger = logging.getLogger(__name__)
+
+RATES_UPDATED_CHANNEL = "rates_updated"
+RECONNECT_MIN_SECONDS = 1.0
+RECONNECT_MAX_SECONDS = 30.0
+
+
+def publish_rates_update(state: RateState) -> None:
+    """
+    Announces a new rate state to every API worker. The payload is self-contained
+    (version, bucket time, active codes, decimal places and USD rates), so subscribers rebuild
+    their state without touching Redis keys or the database.
+    """
+    redis_client = get_redis_client()
+    if not redis_client:
+        return
+    payload = json.dumps({
+        "version": state.version,
+        "as_of": state.as_of.isoformat(),
+        "codes": state.codes,
+        "decimal_places": state.decimal_places,
+        "rates": state.usd_rates,
+    }, separators=(",", ":"))
+    try:
+        receivers = redis_client.publish(RATES_UPDATED_CHANNEL, payload)
+        logger.info(f"Published rates update v{state.version} to {receivers} subscribers.")
+    except Exception as e:
+        logger.error(f"Could not publish rates update: {e}")
+
+
+def apply_rates_update(message: str) -> bool:
+    """
+    Rebuilds the rate state from a published payload and swaps it in.
+    Returns False for payloads older than the current state and for repeats of it
+    (a re-run of the same hour bucket with new rates is applied).
+    """
+    payload = json.loads(message)
+    current = get_rate_state()
+    if current is not None and payload["version"] < current.version:
+        return False
+    if current is not None and payload["version"] == current.version and payload["rates"] == current.usd_rates and tuple(payload["codes"]) == current.codes:
+        return False
+
+    state = build_rate_state(
+        payload["rates"],
+        payload["codes"],
+        datetime.fromisoformat(payload["as_of"]),
+        payload.get("decimal_places"),
+    )
+    installed = set_rate_state(state)
+    if installed:
+        logger.info(f"Applied rates update v{state.version} ({len(state.codes)} currencies).")
+    return installed
+
+
+class RateUpdateSubscriber:
+    """
+    Listens on the rates_updated channel in a daemon thread (the Redis client is
+    synchronous) and applies each update to this worker's rate state. Other modules
+    can follow further channels on the same connection with add_handler.
+    Reconnects with exponential backoff if the connection drops.
+    """
+
+    def __init__(self):
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pubsub = None
+        self._handlers: Dict[str, Callable[[str], object]] = {RATES_UPDATED_CHANNEL: apply_rates_update}
+
+    def add_handler(self, channel: str, handler: Callable[[str], object]) -> None:
+        """Calls `handler` with the data of every message on `channel` (register before start)."""
+        self._handlers[channel] = handler
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="rate-update-subscriber", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        pubsub = self._pubsub
+        if pubsub is not None:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
+
+    def _run(self) -> None:
+        backoff = RECONNECT_MIN_SECONDS
+        while not self._stop_event.is_set():
+            redis_client = get_redis_client()
+            if not redis_client:
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, RECONNECT_MAX_SECONDS)
+                continue
+
+            try:
+                self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                self._pubsub.subscribe(*self._handlers)
+                logger.info(f"Subscribed to {', '.join(self._handlers)}.")
+                backoff = RECONNECT_MIN_SECONDS
+                for message in self._pubsub.listen():
+                    if self._stop_event.is_set():
+                        break
+                    if message.get("type") != "message":
+                        continue
+                    handler = self._handlers.get(message.get("channel"))
+                    if handler is None:
+                        continue
+                    try:
+                        handler(message["data"])
+                    except Exception as e:
+                        logger.error(f"Could not handle message on '{message.get('channel')}': {e}")
+            except Exception as e:
+                if self._stop_event.is_set():
+                    break
+                logger.warning(f"Rates update subscription lost: {e}. Reconnecting in {backoff:.0f}s.")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, RECONNECT_MAX_SECONDS)
+            finally:
+                pubsub, self._pubsub = self._pubsub, None
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+        logger.info("Rates update subscriber stopped.")
+
+
+rate_update_subscriber = RateUpdateSubscriber()
@@ -1,6 +1,6 @@
 # src/currency/repository.py
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sqlmodel import Session, select
 from sqlalchemy.orm import aliased
 from sqlalchemy.sql.expression import and_
@@ -8,7 +8,9 @@ from sqlalchemy.sql.functions import coalesce
 
 from .models import Currency, CurrencyLocalization
 from .schemas import CurrencyRead
+from src.core.tracing import traced
 
+@traced()
 def get_active_currencies_with_localization(session: Session, lang: str) -> List[CurrencyRead]:
     """
     Retrieves all active currencies from the database with names localized 
@@ -49,6 +51,7 @@ def get_active_currencies_with_localization(session: Session, lang: str) -> List
     return [CurrencyRead.model_validate(row) for row in results]
 
 
+@traced()
 def get_currency_by_code(session: Session, code: str) -> Optional[Currency]:
     """
     Retrieves a single currency by its code from the database.
@@ -56,6 +59,7 @@ def get_currency_by_code(session: Session, code: str) -> Optional[Currency]:
     return session.get(Currency, code)
 
 
+@traced()
 def get_all_active_currency_codes(session: Session) -> List[str]:
     """
     Retrieves a list of all active currency codes from the database.
@@ -68,4 +72,21 @@ def get_all_active_currency_codes(session: Session) -> List[str]:
             Currency.code.asc()
         )
     )
-    return session.exec(statement).all()
\ No newline at end of file
+    return session.exec(statement).all()
+
+
+@traced()
+def get_active_currency_decimal_places(session: Session) -> Dict[str, int]:
+    """
+    Retrieves the decimal places of all active currencies, keyed by code
+    (in the same order as get_all_active_currency_codes).
+    """
+    statement = (
+        select(Currency.code, Currency.decimal_places)
+        .where(Currency.active == True)
+        .order_by(
+            Currency.quick_rates_order.asc().nullslast(),
+            Currency.code.asc()
+        )
+    )
+    return {code: decimal_places for code, decimal_places in session.exec(statement).all()}
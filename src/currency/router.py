@@ -1,26 +1,46 @@
-from fastapi import APIRouter, HTTPException, Query, Depends, Header
+from fastapi import APIRouter, HTTPException, Query, Depends, Header, Security
+from fastapi.responses import StreamingResponse
 from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
 from typing import List, Optional
+from decimal import InvalidOperation
 
 from sqlalchemy.orm import aliased
 from sqlalchemy.sql.expression import and_
 from sqlalchemy.sql.functions import coalesce
 
 from .models import Currency, CurrencyLocalization
-from .schemas import BatchConversionResponse, CurrencyRead, RateItem
-from .service import get_conversion_rates
+from .schemas import (
+    BatchConversionRequest,
+    BatchConversionResponse,
+    BatchConversionResult,
+    ConversionRequest,
+    ConversionResponse,
+    ConvertedAmount,
+    CurrencyRead,
+    MAX_CONVERSION_AMOUNT,
+    MultiBaseRatesResponse,
+    RateItem,
+)
+from .service import catalogue_body_key, convert_amount, get_catalogue_body, get_conversion_rates, get_conversion_rates_for_bases
+from .cache_warmer import get_cached_rates_body, rates_body_key
+from .rate_state import RateState, get_fresh_rate_state, get_rate_state
+from .stream import stream_rate_updates
 from .exceptions import CurrencyAPIError
 from . import repo
+from src.core.compression import PrecompressedResponse
 from src.core.database import get_session
-from src.core.security import verify_api_key
+from src.core.security import api_key_header
 from src.core.rate_limiter import manual_rate_limiter
 from src.core.schemas import ErrorDetail
 
 
+# Upper bound of base currencies per /rates/batch request
+MAX_BATCH_BASES = 20
+
 router = APIRouter(
     tags=["Currency"],
-    dependencies=[Depends(verify_api_key), Depends(manual_rate_limiter)] 
+    dependencies=[Security(api_key_header), Depends(manual_rate_limiter)] 
 )
 
 # --- A helper dependency to get the language ---
@@ -52,6 +72,14 @@ def get_language(accept_language: Optional[str] = Header(None)) -> str:
     return first_preference.split('-')[0]
 
 
+def parse_symbols(symbols: Optional[str]) -> Optional[List[str]]:
+    """'eur, try' -> ['EUR', 'TRY']; None or empty means all currencies."""
+    if not symbols:
+        return None
+    parsed = [symbol.strip().upper() for symbol in symbols.split(",") if symbol.strip()]
+    return list(dict.fromkeys(parsed)) or None
+
+
 # --- Endpoint for Currencies Resource ---
 @router.get(
     "/currencies", 
@@ -69,10 +97,8 @@ async def get_all_active_currencies(
     Returns a list of all active currencies with names localized based on the 'Accept-Language' header.
     Defaults to English if the header is not provided or the language is not supported.
     """
-    currencies = await run_in_threadpool(
-        repo.get_active_currencies_with_localization, session, lang
-    )    
-    return currencies
+    body = await run_in_threadpool(get_catalogue_body, session, lang)
+    return PrecompressedResponse(body, cache_key=catalogue_body_key(lang))
 
 
 # --- Endpoint for Rates Resource ---
@@ -101,6 +127,11 @@ async def get_rates(
     """
     base_sym = from_symbol.upper()
 
+    # Bodies are pre-built for every active base whenever the rates change.
+    cached_body = await run_in_threadpool(get_cached_rates_body, base_sym)
+    if cached_body:
+        return PrecompressedResponse(cached_body, cache_key=rates_body_key(base_sym))
+
     currency_obj = await run_in_threadpool(repo.get_currency_by_code, session, base_sym)
     if not currency_obj or not currency_obj.active:
             raise HTTPException(status_code=400, detail=f"Unsupported or inactive base currency: {base_sym}")
@@ -128,4 +159,184 @@ async def get_rates(
     response = BatchConversionResponse(
         **{"from": base_sym, "rates": rates_list}
     )
-    return response
\ No newline at end of file
+    return response
+
+
+# --- Endpoint for Multi-Base Rates ---
+@router.get(
+        "/rates/batch",
+        response_model=MultiBaseRatesResponse,
+        summary="Get Latest Exchange Rates for Several Bases",
+        responses={
+            400: {"model": ErrorDetail, "description": "Unsupported, inactive, or too many base currencies"},
+            401: {"model": ErrorDetail, "description": "Invalid or missing API Key"},
+            429: {"model": ErrorDetail, "description": "Rate limit exceeded"},
+            502: {"model": ErrorDetail, "description": "External currency API is unavailable or returned an error"},
+        }
+)
+async def get_rates_batch(
+    bases: str = Query(
+        ...,
+        description="Comma-separated base currency codes, e.g. USD,EUR,TRY"
+    ),
+    symbols: Optional[str] = Query(
+        None,
+        description="Optional comma-separated target currencies, e.g. GBP,JPY. Defaults to all active currencies."
+    ),
+    session: Session = Depends(get_session)
+):
+    """
+    Returns the current exchange rates for several base currencies at once (e.g. for
+    quick-rates widgets), computed from a single rate load and catalogue lookup.
+    """
+    base_syms = parse_symbols(bases) or []
+    if len(base_syms) > MAX_BATCH_BASES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_BASES} base currencies can be requested at once.")
+
+    all_codes = await run_in_threadpool(repo.get_all_active_currency_codes, session)
+    active_codes = set(all_codes)
+
+    unsupported = [base for base in base_syms if base not in active_codes]
+    if not base_syms or unsupported:
+        raise HTTPException(status_code=400, detail=f"Unsupported or inactive base currency: {', '.join(unsupported) or bases}")
+
+    requested = parse_symbols(symbols)
+    to_symbols = [code for code in requested if code in active_codes] if requested else all_codes
+
+    try:
+        rates_by_base = await get_conversion_rates_for_bases(base_syms, to_symbols)
+    except CurrencyAPIError as e:
+        raise HTTPException(
+            status_code=e.code if e.code < 500 else 502,
+            detail=e.message
+        )
+
+    return MultiBaseRatesResponse(results=[
+        BatchConversionResponse(**{
+            "from": base,
+            "rates": [RateItem(to=to_sym, rate=rate) for to_sym, rate in rates_by_base[base].items()],
+        })
+        for base in base_syms
+    ])
+
+
+# --- Endpoints for Amount Conversion ---
+def _require_rate_state() -> RateState:
+    """The live rates, or a 503 while none are loaded or they are older than RATE_STATE_MAX_AGE."""
+    state = get_fresh_rate_state()
+    if state is None:
+        if get_rate_state() is not None:
+            raise HTTPException(status_code=503, detail="Live rates are out of date. Try again shortly.")
+        raise HTTPException(status_code=503, detail="Live rates are not available yet. Try again shortly.")
+    return state
+
+
+def _convert(state: RateState, conversion: ConversionRequest) -> ConversionResponse:
+    try:
+        results = convert_amount(state, conversion.amount, conversion.from_symbol, conversion.to)
+    except CurrencyAPIError as e:
+        raise HTTPException(status_code=e.code, detail=e.message)
+    except InvalidOperation:
+        # A converted amount with more digits than Decimal can round
+        raise HTTPException(status_code=400, detail="The converted amount is too large")
+
+    return ConversionResponse(
+        **{
+            "from": conversion.from_symbol.upper(),
+            "amount": conversion.amount,
+            "as_of": state.as_of,
+            "results": [ConvertedAmount(to=to_sym, rate=rate, amount=amount) for to_sym, rate, amount in results],
+        }
+    )
+
+
+@router.get(
+        "/convert",
+        response_model=ConversionResponse,
+        summary="Convert an Amount",
+        responses={
+            400: {"model": ErrorDetail, "description": "Unsupported, inactive, or invalid base currency, or a converted amount too large to round"},
+            401: {"model": ErrorDetail, "description": "Invalid or missing API Key"},
+            429: {"model": ErrorDetail, "description": "Rate limit exceeded"},
+            503: {"model": ErrorDetail, "description": "Live rates are not loaded yet or out of date"},
+        }
+)
+async def convert(
+    from_symbol: str = Query(
+        ...,
+        alias="from",
+        description="The source currency code, e.g. USD"
+    ),
+    to: Optional[str] = Query(
+        None,
+        description="Optional comma-separated target currencies, e.g. EUR,TRY. Defaults to all active currencies."
+    ),
+    amount: float = Query(..., ge=0, le=MAX_CONVERSION_AMOUNT, allow_inf_nan=False, description="The amount to convert, e.g. 100"),
+):
+    """
+    Converts an amount to one or more currencies, rounded to each target currency's
+    decimal places. Served from the in-memory rates without touching Redis or the database.
+    """
+    conversion = ConversionRequest(**{"from": from_symbol, "to": parse_symbols(to), "amount": amount})
+    return _convert(_require_rate_state(), conversion)
+
+
+@router.post(
+        "/convert/batch",
+        response_model=BatchConversionResult,
+        summary="Convert Several Amounts",
+        responses={
+            400: {"model": ErrorDetail, "description": "Unsupported, inactive, or invalid base currency, or a converted amount too large to round"},
+            401: {"model": ErrorDetail, "description": "Invalid or missing API Key"},
+            429: {"model": ErrorDetail, "description": "Rate limit exceeded"},
+            503: {"model": ErrorDetail, "description": "Live rates are not loaded yet or out of date"},
+        }
+)
+async def convert_batch(request: BatchConversionRequest):
+    """
+    Runs up to 50 conversions in one request. All of them use the same rates.
+    """
+    state = _require_rate_state()
+    return BatchConversionResult(results=[_convert(state, conversion) for conversion in request.conversions])
+
+
+# --- Endpoint for Live Rates Stream ---
+@router.get(
+        "/rates/stream",
+        summary="Stream Live Exchange Rates",
+        response_class=StreamingResponse,
+        responses={
+            200: {"content": {"text/event-stream": {}}, "description": "Server-Sent Events stream of rate updates"},
+            400: {"model": ErrorDetail, "description": "Unsupported, inactive, or invalid base currency"},
+            401: {"model": ErrorDetail, "description": "Invalid or missing API Key"},
+            429: {"model": ErrorDetail, "description": "Rate limit exceeded"},
+            503: {"model": ErrorDetail, "description": "Live rates are not loaded yet or out of date"},
+        }
+)
+async def stream_rates(
+    from_symbol: str = Query(
+        ...,
+        alias="from",
+        description="The base currency code to stream rates for, e.g. USD"
+    ),
+    symbols: Optional[str] = Query(
+        None,
+        description="Optional comma-separated target currencies, e.g. EUR,TRY. Defaults to all active currencies."
+    ),
+):
+    """
+    Streams rates from a base currency as Server-Sent Events. The first `snapshot`
+    event carries all requested pairs; afterwards a `rates` event with only the
+    changed pairs is pushed whenever the hourly job lands new rates.
+    """
+    base_sym = from_symbol.upper()
+
+    state = _require_rate_state()
+    if state.cross_rates(base_sym) is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported or inactive base currency: {base_sym}")
+
+    return StreamingResponse(
+        stream_rate_updates(base_sym, parse_symbols(symbols)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,6 +1,10 @@
+from datetime import datetime
 from typing import List
 from pydantic import BaseModel, Field, ConfigDict
 
+# Largest amount accepted for conversion: converted and rounded, it still fits Decimal's precision
+MAX_CONVERSION_AMOUNT = 1e15
+
 class RateItem(BaseModel):
     to: str = Field(..., description="Target currency code (to), e.g.: EUR")
     rate: float = Field(..., description="Cross rate from `from` → `to`")
@@ -17,6 +21,43 @@ class BatchConversionResponse(BaseModel):
         from_attributes=True
     )
 
+class MultiBaseRatesResponse(BaseModel):
+    results: List[BatchConversionResponse] = Field(..., description="One rate list per requested base currency, in request order")
+
+
+class ConvertedAmount(BaseModel):
+    to: str = Field(..., description="Target currency code, e.g.: EUR")
+    rate: float = Field(..., description="Cross rate from `from` → `to`")
+    amount: float = Field(..., description="Converted amount, rounded to the target currency's decimal places")
+
+class ConversionResponse(BaseModel):
+    from_symbol: str = Field(..., alias="from", description="Source currency code, e.g.: USD")
+    amount: float = Field(..., description="The amount that was converted")
+    as_of: datetime = Field(..., description="Time of the rates used for the conversion")
+    results: List[ConvertedAmount]
+
+    model_config = ConfigDict(
+        validate_by_name=True,
+        populate_by_name=True,
+    )
+
+class ConversionRequest(BaseModel):
+    from_symbol: str = Field(..., alias="from", description="Source currency code, e.g.: USD")
+    to: List[str] | None = Field(None, description="Target currency codes. Defaults to all active currencies.")
+    amount: float = Field(..., ge=0, le=MAX_CONVERSION_AMOUNT, allow_inf_nan=False, description="Amount to convert")
+
+    model_config = ConfigDict(
+        validate_by_name=True,
+        populate_by_name=True,
+    )
+
+class BatchConversionRequest(BaseModel):
+    conversions: List[ConversionRequest] = Field(..., min_length=1, max_length=50)
+
+class BatchConversionResult(BaseModel):
+    results: List[ConversionResponse] = Field(..., description="One result per requested conversion, in request order")
+
+
 class CurrencyRead(BaseModel):
     code: str
     name: str
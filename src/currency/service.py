@@ -3,73 +3,122 @@
 import time
 import json
 import logging
-from typing import List, Dict
+from decimal import ROUND_HALF_UP, Decimal
+from typing import List, Dict, Mapping, Tuple
+
+from pydantic import TypeAdapter
+from redis import RedisError
+from sqlmodel import Session
 
 from src.core.config import settings
-from src.core.redis_client import get_redis_client 
+from src.core.local_cache import local_cache
+from src.core.redis_client import get_redis_client
+from src.core.metrics import record_cache
+from . import repo
 from .exceptions import CurrencyAPIError
-import httpx 
+from .providers import rate_providers
+from .rate_state import RateState, get_fresh_rate_state, get_rate_state
+from .schemas import CurrencyRead
+from .shared_state import shared_rate_state
 
 logger = logging.getLogger(__name__)
 
-async def _get_all_rates_from_usd() -> Dict[str, float]:
+# Used for currencies whose decimal places are unknown to the rate state
+DEFAULT_DECIMAL_PLACES = 2
+CATALOGUE_BODY_KEY_PREFIX = "catalogue_body"
+
+_catalogue_adapter = TypeAdapter(List[CurrencyRead])
+
+async def _get_all_rates_from_usd(force_refresh: bool = False, complete_only: bool = False) -> Mapping[str, float]:
     """
     Fetches all available currency rates against the base currency (USD)
-    from the external API and caches the result in Redis.
-    This function is the single point of contact with the external API.
+    from the rate providers and caches the result in Redis.
+    This function is the single point of contact with the external APIs.
+    With force_refresh=True the caches are skipped and the providers are always called.
+    With complete_only=True only providers covering every currency are asked and no
+    last known rates are merged in, so the result is fit for a `real` snapshot.
     """
     
-    # 1. Cache Check: All exchange rates will be stored under a single key.
+    # 0. The in-process rate state is kept current by the pushed updates (rate_updates.py) or,
+    #    with the shared-memory rate state (shared_state.py), by the owner worker, so it is
+    #    served first while it is fresh.
+    fresh_state = get_fresh_rate_state()
+    if fresh_state is not None and not force_refresh:
+        record_cache("shared_rate_state" if shared_rate_state.enabled else "rate_state", True)
+        return fresh_state.usd_rates
+
+    # 1. Cache Check: All exchange rates will be stored under a single key
+    #    (in the process-local cache while Redis is unavailable).
     cache_key = "latest_usd_rates"
-    redis_client = get_redis_client()
-    if redis_client:
-        cached_data = redis_client.get(cache_key)
-        if cached_data:
-            remaining_ttl = redis_client.ttl(cache_key)
-            logger.info(f"CACHE HIT: Found all rates under key '{cache_key}',remaining TTL={remaining_ttl}s")
-            return json.loads(cached_data)
-
-    # 2. Cache miss, pull it from API.
-    logger.info(f"CACHE MISS: Key '{cache_key}' not found. Fetching from OpenExchangeRates API.")
-    
-
-    if not settings.OPEN_EXCHANGE_RATES_API_KEY:
-        raise CurrencyAPIError(code=500, message="Server configuration error: missing OPEN_EXCHANGE_RATES_API_KEY.")
+    cache = get_redis_client() or local_cache
+    if not force_refresh:
+        try:
+            cached_data = cache.get(cache_key)
+            record_cache("latest_usd_rates", bool(cached_data))
+            if cached_data:
+                remaining_ttl = cache.ttl(cache_key)
+                logger.info(f"CACHE HIT: Found all rates under key '{cache_key}',remaining TTL={remaining_ttl}s")
+                return json.loads(cached_data)
+        except RedisError as e:
+            logger.error(f"Could not read '{cache_key}' from Redis: {e}")
+            cache = local_cache
+
+    # 2. Cache miss, pull it from the providers (see providers.py). Currencies the answering
+    #    provider does not cover keep their last known rate from the in-process state.
+    logger.info(f"CACHE MISS: Key '{cache_key}' not found. Fetching from the rate providers.")
+    state = get_rate_state()
+    fallback = state.usd_rates if state and not complete_only else None
+    rates = await rate_providers.fetch_latest(fallback=fallback, complete_only=complete_only)
 
-    api_url = f"{settings.OPEN_EXCHANGE_RATES_API_URL}?app_id={settings.OPEN_EXCHANGE_RATES_API_KEY}"
+    # 3. Save the new result to redis
+    if rates:
+        try:
+            cache.set(cache_key, json.dumps(rates), ex=settings.CACHE_TTL_SECONDS)
+            set_ttl = cache.ttl(cache_key)
+            logger.info(f"CACHE SET: Saved all rates to key '{cache_key}', ttl after set={set_ttl}s (expected={settings.CACHE_TTL_SECONDS}s)")
+        except RedisError as e:
+            logger.error(f"Could not save '{cache_key}' to Redis: {e}")
+            local_cache.set(cache_key, json.dumps(rates), ex=settings.CACHE_TTL_SECONDS)
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(api_url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-    except httpx.RequestError as e:
-        raise CurrencyAPIError(code=502, message=f"External API request failed: {e}")
-    except ValueError:
-        raise CurrencyAPIError(code=502, message="External API returned invalid JSON.")
+    return rates
 
-    if "error" in data:
-        raise CurrencyAPIError(code=data.get("status"), message=data.get("description"))
 
-    rates = data.get("rates", {}) # {"AED": 3.67, "AFN": 71.8,... "USD": 1.0, ...}
+def catalogue_body_key(lang: str) -> str:
+    return f"{CATALOGUE_BODY_KEY_PREFIX}:{lang}"
 
-    # 3. Save the new result to redis
-    if redis_client and rates:
-        redis_client.set(cache_key, json.dumps(rates), ex=settings.CACHE_TTL_SECONDS)
-        set_ttl = redis_client.ttl(cache_key)
-        logger.info(f"CACHE SET: Saved all rates to key '{cache_key}', ttl after set={set_ttl}s (expected={settings.CACHE_TTL_SECONDS}s)")
-        
-    return rates
 
-
-async def get_conversion_rates(from_sym: str, to_syms: List[str]) -> Dict[str, float]:
+def get_catalogue_body(session: Session, lang: str) -> str:
     """
-    Calculates conversion rates using a cached master list of USD-based rates.
-    It does NOT make an external API call directly.
+    Returns the serialized `/currencies` list for a language from the Redis body cache
+    (the process-local cache while Redis is unavailable), building it from the database
+    on a miss. Cached lists expire after CATALOGUE_CACHE_TTL_SECONDS.
     """
+    key = catalogue_body_key(lang)
+    cache = get_redis_client() or local_cache
+    try:
+        cached_body = cache.get(key)
+    except RedisError as e:
+        logger.error(f"Could not read {key} from Redis: {e}")
+        cache = local_cache
+        cached_body = cache.get(key)
+    record_cache(CATALOGUE_BODY_KEY_PREFIX, bool(cached_body))
+    if cached_body:
+        return cached_body
+
+    currencies = repo.get_active_currencies_with_localization(session, lang)
+    body = _catalogue_adapter.dump_json(currencies).decode()
+    try:
+        cache.set(key, body, ex=settings.CATALOGUE_CACHE_TTL_SECONDS)
+    except RedisError as e:
+        logger.error(f"Could not cache {key} in Redis: {e}")
+        local_cache.set(key, body, ex=settings.CATALOGUE_CACHE_TTL_SECONDS)
+    return body
 
-    all_rates_vs_usd = await _get_all_rates_from_usd()
 
+def compute_cross_rates(all_rates_vs_usd: Mapping[str, float], from_sym: str, to_syms: List[str]) -> Dict[str, float]:
+    """
+    Calculates cross rates from one base currency using a master list of USD-based rates.
+    """
     from_sym_upper = from_sym.upper()
 
     # the exchange rate of the desired 'from' currency against USD
@@ -94,4 +143,58 @@ async def get_conversion_rates(from_sym: str, to_syms: List[str]) -> Dict[str, f
         cross_rate = usd_to_to_rate / usd_to_from_rate
         cross_rates[to_sym_upper] = cross_rate
         
-    return cross_rates
\ No newline at end of file
+    return cross_rates
+
+
+async def get_conversion_rates(from_sym: str, to_syms: List[str]) -> Dict[str, float]:
+    """
+    Calculates conversion rates using a cached master list of USD-based rates.
+    It does NOT make an external API call directly.
+    """
+    all_rates_vs_usd = await _get_all_rates_from_usd()
+    return compute_cross_rates(all_rates_vs_usd, from_sym, to_syms)
+
+
+async def get_conversion_rates_for_bases(from_syms: List[str], to_syms: List[str]) -> Dict[str, Dict[str, float]]:
+    """
+    Calculates conversion rates for several base currencies from a single load
+    of the USD-based master list.
+    """
+    all_rates_vs_usd = await _get_all_rates_from_usd()
+    return {
+        from_sym.upper(): compute_cross_rates(all_rates_vs_usd, from_sym, to_syms)
+        for from_sym in from_syms
+    }
+
+
+def round_amount(amount: float, decimal_places: int) -> float:
+    """Rounds a monetary amount half-up to the given number of decimal places."""
+    quantum = Decimal(1).scaleb(-decimal_places)
+    return float(Decimal(str(amount)).quantize(quantum, rounding=ROUND_HALF_UP))
+
+
+def convert_amount(
+    state: RateState,
+    amount: float,
+    from_sym: str,
+    to_syms: List[str] | None = None,
+) -> List[Tuple[str, float, float]]:
+    """
+    Converts an amount from one currency to the given targets (all active currencies
+    if None) using the in-process rate state only. Each converted amount is rounded
+    to the target currency's decimal places. Returns (to, rate, converted amount) tuples.
+    """
+    from_sym_upper = from_sym.upper()
+    cross_rates = state.cross_rates(from_sym_upper)
+    if cross_rates is None:
+        raise CurrencyAPIError(code=400, message=f"Unsupported or inactive base currency: {from_sym_upper}")
+
+    targets = to_syms if to_syms else cross_rates.keys()
+    conversions = []
+    for to_sym in targets:
+        rate = cross_rates.get(to_sym.upper())
+        if rate is None:
+            continue
+        decimal_places = state.decimal_places.get(to_sym.upper(), DEFAULT_DECIMAL_PLACES)
+        conversions.append((to_sym.upper(), rate, round_amount(amount * rate, decimal_places)))
+    return conversions
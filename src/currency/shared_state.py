@@ -0,0 +1,299 @@
+# src/currency/shared_state.py
+
+import fcntl
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Dict, Iterator, Mapping, Sequence
+
+import numpy as np
+
+from src.core.config import settings
+from .rate_state import RateState, add_state_listener, set_rate_state
+
+logger = logging.getLogger(__name__)
+
+# Segment layout: a HEADER_SIZE-byte header, then SLOT_COUNT equally sized slots.
+# Write number k goes into slot k % SLOT_COUNT; the sequence counter is odd while
+# a write is in progress and 2k once write k is complete (a seqlock). Because the
+# writer never touches the slot readers are using, a state read from a slot stays
+# intact for the next SLOT_COUNT - 1 writes.
+SEGMENT_MAGIC = b"RATESHM1"
+HEADER_SIZE = 64
+SEQUENCE_OFFSET = 8
+SLOT_COUNT = 4
+# Slot: version, as_of (epoch microseconds), currency count, catalogue length; then the
+# float64 USD rates, the count x count cross-rate matrix and the catalogue JSON
+_SLOT_HEADER = struct.Struct("<qqii")
+SLOT_HEADER_SIZE = 32
+RATE_DTYPE = np.dtype("<f8")
+# How often readers look for a new state (and for a vacant owner role)
+POLL_SECONDS = 1.0
+READ_ATTEMPTS = 3
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class SharedRates(Mapping):
+    """A read-only {code: rate} view over one row of the segment, leaving out `skip`."""
+
+    def __init__(self, codes: Sequence[str], index: Dict[str, int], values: np.ndarray, skip: str | None = None):
+        self._codes = codes
+        self._index = index
+        self._values = values
+        self._skip = skip
+
+    def __getitem__(self, code: str) -> float:
+        if code == self._skip:
+            raise KeyError(code)
+        return float(self._values[self._index[code]])
+
+    def __iter__(self) -> Iterator[str]:
+        return (code for code in self._codes if code != self._skip)
+
+    def __len__(self) -> int:
+        return len(self._codes) - (self._skip in self._index)
+
+
+class SharedCrossRates(Mapping):
+    """A read-only view of the cross-rate matrix in the segment: matrix[base][to]."""
+
+    def __init__(self, codes: Sequence[str], index: Dict[str, int], matrix: np.ndarray):
+        self._codes = codes
+        self._index = index
+        self._matrix = matrix
+
+    def __getitem__(self, base: str) -> SharedRates:
+        return SharedRates(self._codes, self._index, self._matrix[self._index[base]], skip=base)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._codes)
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+
+class SharedRateState:
+    """
+    Shares one process's rate state with the other workers of a container through a
+    `multiprocessing.shared_memory` segment, so rates are refreshed once per container
+    instead of once per worker.
+
+    The first worker to lock `<name>.lock` becomes the owner: it warms and follows the
+    rates as usual and writes every installed state into the segment. The other workers
+    skip that and install the states they find in the segment; their rates and cross-rate
+    matrix are numpy views into shared memory, not copies. When the owner exits, the
+    lock is released and a reader takes over.
+    """
+
+    def __init__(
+        self,
+        name: str | None,
+        size: int,
+        poll_seconds: float = POLL_SECONDS,
+        lock_dir: str | None = None,
+    ):
+        self.name = name
+        self.size = size
+        self.poll_seconds = poll_seconds
+        self.lock_path = os.path.join(lock_dir or tempfile.gettempdir(), f"{name}.lock") if name else None
+        self.is_owner = False
+        self._segment: shared_memory.SharedMemory | None = None
+        self._sequence: np.ndarray | None = None
+        self._slot_size = 0
+        self._lock_file = None
+        self._installed_write: int | None = None
+        self._on_promoted: Callable[[], None] | None = None
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.name)
+
+    def start(self, on_promoted: Callable[[], None]) -> bool:
+        """
+        Takes the owner role if it is free, otherwise starts following the segment.
+        `on_promoted` runs on the watcher thread if this worker takes over later.
+        Returns True if this worker is the owner.
+        """
+        self._stop_event.clear()
+        self._lock_file = open(self.lock_path, "a+")
+        if self._try_lock():
+            self._become_owner()
+            return True
+
+        self._on_promoted = on_promoted
+        self.install_latest()
+        self._thread = threading.Thread(target=self._watch, name="shared-rate-state", daemon=True)
+        self._thread.start()
+        logger.info(f"Reading the rate state from shared memory segment '{self.name}'.")
+        return False
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _try_lock(self) -> bool:
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _attach(self, create: bool = False) -> bool:
+        if self._segment is not None:
+            return True
+        try:
+            segment = shared_memory.SharedMemory(name=self.name, create=create, size=self.size if create else 0)
+        except FileExistsError:
+            segment = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            return False
+        # The segment outlives any single worker, so no worker's resource tracker may unlink it
+        resource_tracker.unregister(segment._name, "shared_memory")
+
+        self._segment = segment
+        self._sequence = np.ndarray((1,), dtype="<u8", buffer=segment.buf, offset=SEQUENCE_OFFSET)
+        self._slot_size = (segment.size - HEADER_SIZE) // SLOT_COUNT // RATE_DTYPE.itemsize * RATE_DTYPE.itemsize
+        return True
+
+    def _become_owner(self) -> None:
+        self._attach(create=True)
+        buf = self._segment.buf
+        if bytes(buf[:len(SEGMENT_MAGIC)]) != SEGMENT_MAGIC:
+            buf[:len(SEGMENT_MAGIC)] = SEGMENT_MAGIC
+            self._sequence[0] = 0
+        elif self._sequence[0] % 2:
+            # The previous owner died mid-write: roll back to its last complete state
+            self._sequence[0] -= 1
+        self.is_owner = True
+        add_state_listener(self._write_installed)
+        logger.info(f"Owning shared memory segment '{self.name}' ({self._segment.size} bytes): this worker refreshes the rates.")
+
+    def _watch(self) -> None:
+        while not self._stop_event.wait(self.poll_seconds):
+            if self._try_lock():
+                logger.info(f"The owner of '{self.name}' is gone. Taking over the rate refresh.")
+                self._become_owner()
+                try:
+                    self._on_promoted()
+                except Exception as e:
+                    logger.error(f"Could not start refreshing rates after taking over '{self.name}': {e}")
+                return
+            try:
+                self.install_latest()
+            except Exception as e:
+                logger.error(f"Could not read the rate state from '{self.name}': {e}")
+
+    def _slot_offset(self, slot: int) -> int:
+        return HEADER_SIZE + slot * self._slot_size
+
+    def _write_installed(self, state: RateState) -> None:
+        try:
+            self.write(state)
+        except Exception as e:
+            logger.error(f"Could not write rate state v{state.version} to '{self.name}': {e}")
+
+    def write(self, state: RateState) -> bool:
+        """Writes a state into the next slot and publishes it. Only the owner may call this."""
+        codes = list(state.codes)
+        count = len(codes)
+        usd_rates = np.array([state.usd_rates[code] for code in codes], dtype=RATE_DTYPE)
+        catalogue = json.dumps({"codes": codes, "decimal_places": dict(state.decimal_places)}, separators=(",", ":")).encode()
+        rates_size = (count + count * count) * RATE_DTYPE.itemsize
+        if SLOT_HEADER_SIZE + rates_size + len(catalogue) > self._slot_size:
+            logger.error(
+                f"Rate state v{state.version} ({count} currencies) does not fit a {self._slot_size}-byte slot of "
+                f"'{self.name}'. Raise RATE_STATE_SHM_SIZE_BYTES."
+            )
+            return False
+
+        sequence = int(self._sequence[0])
+        offset = self._slot_offset((sequence // 2 + 1) % SLOT_COUNT)
+        buf = self._segment.buf
+        self._sequence[0] = sequence + 1
+        try:
+            as_of_us = round((state.as_of - EPOCH).total_seconds() * 1_000_000)
+            _SLOT_HEADER.pack_into(buf, offset, state.version, as_of_us, count, len(catalogue))
+            rates_offset = offset + SLOT_HEADER_SIZE
+            np.ndarray((count,), dtype=RATE_DTYPE, buffer=buf, offset=rates_offset)[:] = usd_rates
+            matrix = np.ndarray((count, count), dtype=RATE_DTYPE, buffer=buf, offset=rates_offset + count * RATE_DTYPE.itemsize)
+            # EUR -> TRY = (USD -> TRY) / (USD -> EUR), like build_rate_state
+            np.divide(usd_rates[np.newaxis, :], usd_rates[:, np.newaxis], out=matrix)
+            catalogue_offset = rates_offset + rates_size
+            buf[catalogue_offset:catalogue_offset + len(catalogue)] = catalogue
+        except Exception:
+            self._sequence[0] = sequence
+            raise
+        self._sequence[0] = sequence + 2
+        logger.info(f"Wrote rate state v{state.version} ({count} currencies) to '{self.name}'.")
+        return True
+
+    def _read_slot(self, slot: int) -> RateState:
+        buf = self._segment.buf
+        offset = self._slot_offset(slot)
+        version, as_of_us, count, catalogue_length = _SLOT_HEADER.unpack_from(buf, offset)
+        rates_size = (count + count * count) * RATE_DTYPE.itemsize
+        if count < 0 or catalogue_length < 0 or SLOT_HEADER_SIZE + rates_size + catalogue_length > self._slot_size:
+            raise ValueError(f"Slot {slot} holds an invalid header.")
+
+        rates_offset = offset + SLOT_HEADER_SIZE
+        usd_rates = np.ndarray((count,), dtype=RATE_DTYPE, buffer=buf, offset=rates_offset)
+        matrix = np.ndarray((count, count), dtype=RATE_DTYPE, buffer=buf, offset=rates_offset + count * RATE_DTYPE.itemsize)
+        usd_rates.flags.writeable = False
+        matrix.flags.writeable = False
+        catalogue_offset = rates_offset + rates_size
+        catalogue = json.loads(bytes(buf[catalogue_offset:catalogue_offset + catalogue_length]))
+
+        codes = tuple(catalogue["codes"])
+        index = {code: position for position, code in enumerate(codes)}
+        return RateState(
+            version=version,
+            as_of=EPOCH + timedelta(microseconds=as_of_us),
+            usd_rates=SharedRates(codes, index, usd_rates),
+            codes=codes,
+            matrix=SharedCrossRates(codes, index, matrix),
+            decimal_places=catalogue["decimal_places"],
+        )
+
+    def _read_latest(self) -> tuple[int, RateState | None]:
+        completed = 0
+        for _ in range(READ_ATTEMPTS):
+            completed = int(self._sequence[0]) // 2
+            if completed == 0:
+                return completed, None
+            try:
+                state = self._read_slot(completed % SLOT_COUNT)
+            except (ValueError, KeyError, UnicodeDecodeError):
+                state = None
+            # The slot was intact unless the writer has since started reusing it
+            if int(self._sequence[0]) <= 2 * (completed + SLOT_COUNT) - 2 and state is not None:
+                return completed, state
+        logger.warning(f"Could not get a consistent rate state from '{self.name}' after {READ_ATTEMPTS} attempts.")
+        return completed, None
+
+    def read_state(self) -> RateState | None:
+        """The latest complete state in the segment, or None if there is none (yet)."""
+        if not self._attach():
+            return None
+        return self._read_latest()[1]
+
+    def install_latest(self) -> bool:
+        """
+        Installs the segment's latest state in this worker unless it was installed already
+        (checking costs one read of the sequence counter). Returns True if installed.
+        """
+        if not self._attach() or int(self._sequence[0]) // 2 == self._installed_write:
+            return False
+        completed, state = self._read_latest()
+        if state is None:
+            return False
+        self._installed_write = completed
+        return set_rate_state(state)
+
+shared_rate_state = SharedRateState(settings.RATE_STATE_SHM_NAME, settings.RATE_STATE_SHM_SIZE_BYTES)
@@ -0,0 +1,133 @@
+# src/currency/stream.py
+
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Dict, List
+
+from .rate_state import RateState, add_state_listener, get_rate_state
+
+logger = logging.getLogger(__name__)
+
+# Idle connections get an SSE comment this often so proxies and load balancers keep them open
+KEEPALIVE_SECONDS = 15.0
+
+
+def format_sse(event: str, data: Dict, event_id: int | None = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+class RateStreamHub:
+    """
+    Wakes up every live-rates stream of this worker when a new rate state is installed.
+
+    Idle streams all await one shared future that is resolved (and replaced) on each
+    update, so an idle connection costs no task, queue or timer of its own beyond
+    its keep-alive wait. Changed pairs are computed once per base and version pair
+    and shared by every stream on that base.
+    """
+
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._update: asyncio.Future | None = None
+        self._diff_cache: Dict[tuple, Dict[str, float]] = {}
+        self._diff_cache_state: RateState | None = None
+        self.listeners = 0
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Binds the hub to the worker's event loop and starts following rate state changes."""
+        self._loop = loop
+        self._update = loop.create_future()
+        add_state_listener(self._on_state_installed)
+
+    def _on_state_installed(self, state: RateState) -> None:
+        # Rate updates arrive on the pub/sub thread; hand them over to the event loop.
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.publish, state)
+
+    def publish(self, state: RateState) -> None:
+        if self._loop is None:
+            self.attach(asyncio.get_running_loop())
+        update, self._update = self._update, self._loop.create_future()
+        if not update.done():
+            update.set_result(state)
+
+    async def wait_for_update(self, timeout: float) -> RateState | None:
+        """Waits for the next rate state. Returns None if nothing changed within `timeout`."""
+        if self._update is None:
+            self.attach(asyncio.get_running_loop())
+        update = self._update
+        done, _ = await asyncio.wait({update}, timeout=timeout)
+        return update.result() if done else None
+
+    def changed_rates(self, base: str, previous: RateState, current: RateState) -> Dict[str, float]:
+        """Cross rates from `base` that differ between two states (memoized until the next state)."""
+        if self._diff_cache_state is not current:
+            self._diff_cache = {}
+            self._diff_cache_state = current
+
+        key = (base, previous.version)
+        if key not in self._diff_cache:
+            old_rates = previous.cross_rates(base) or {}
+            new_rates = current.cross_rates(base) or {}
+            self._diff_cache[key] = {to: rate for to, rate in new_rates.items() if old_rates.get(to) != rate}
+        return self._diff_cache[key]
+
+
+rate_stream_hub = RateStreamHub()
+
+
+def _select(rates: Dict[str, float], symbols: List[str] | None) -> Dict[str, float]:
+    if not symbols:
+        return rates
+    return {to: rates[to] for to in symbols if to in rates}
+
+
+async def stream_rate_updates(
+    base: str,
+    symbols: List[str] | None = None,
+    *,
+    hub: RateStreamHub = rate_stream_hub,
+    keepalive_seconds: float = KEEPALIVE_SECONDS,
+) -> AsyncIterator[str]:
+    """
+    Yields Server-Sent Events for one client: a `snapshot` with the requested pairs,
+    then a `rates` event with only the changed pairs whenever new rates land.
+    """
+    state = get_rate_state()
+    sent = _select(state.cross_rates(base) or {}, symbols)
+    yield format_sse("snapshot", _event_body(base, state, sent), event_id=state.version)
+
+    hub.listeners += 1
+    try:
+        while True:
+            # A state installed while this generator was suspended at `yield` has already
+            # resolved the hub's future, so it is picked up here instead of waited for.
+            new_state = get_rate_state()
+            if new_state is None or new_state is state:
+                new_state = await hub.wait_for_update(keepalive_seconds)
+                if new_state is None:
+                    yield ": keep-alive\n\n"
+                    continue
+            if new_state is state or new_state.version < state.version:
+                continue
+
+            changed = _select(hub.changed_rates(base, state, new_state), symbols)
+            state = new_state
+            if changed:
+                yield format_sse("rates", _event_body(base, state, changed), event_id=state.version)
+    finally:
+        hub.listeners -= 1
+
+
+def _event_body(base: str, state: RateState, rates: Dict[str, float]) -> Dict:
+    return {
+        "from": base,
+        "version": state.version,
+        "as_of": state.as_of.isoformat(),
+        "rates": [{"to": to, "rate": rate} for to, rate in rates.items()],
+    }
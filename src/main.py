@@ -1,20 +1,48 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response, Security
+from fastapi.exceptions import RequestValidationError
 import logging
-from datetime import datetime
 
 from src.currency.router import router as currency_router
 from src.rate_history.router import router as history_router
 from src.savings.router import router as savings_router
+from src.core import metrics
+from src.core.config import settings
 from src.core.database import init_db
-from src.core.redis_client import get_redis_client
+from src.core.compression import CompressionMiddleware
+from src.core.middleware import AccessLog, RequestIdMiddleware, RequestMetricsMiddleware
+from src.core.security import ApiKeyMiddleware, api_key_header
+from src.core.tracing import TracingMiddleware, setup_tracing
+from src.core.redis_client import get_redis_client, redis_manager
+from src.rate_history.date_index import SNAPSHOT_DATES_CHANNEL, daily_date_index
+from src.rate_history.jobs import ensure_snapshot_partitions, warm_caches_from_database
+from src.currency.cache_warmer import precompress_rates_bodies
+from src.currency.exceptions import validation_exception_handler
+from src.currency.rate_state import add_state_listener, get_rate_state
+from src.currency.rate_updates import rate_update_subscriber
+from src.currency.shared_state import shared_rate_state
+from src.currency.stream import rate_stream_hub
 
+import asyncio
 from contextlib import asynccontextmanager
 
+def start_rate_refresh():
+    # Pre-warm the rate state and caches from Postgres before accepting traffic
+    try:
+        warm_caches_from_database()
+    except Exception as e:
+        logger.error(f"Could not warm caches on startup: {e}")
+
+    # Receive new rates pushed by the jobs instead of polling Redis, and reload the
+    # daily snapshot date index when the jobs write daily snapshots
+    rate_update_subscriber.add_handler(SNAPSHOT_DATES_CHANNEL, lambda _: daily_date_index.invalidate())
+    rate_update_subscriber.start()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up Currency Converter API...")
 
     init_db()
+    ensure_snapshot_partitions()
     logger.info("Database initialized successfully")
 
     # Check Redis connection
@@ -28,9 +56,23 @@ async def lifespan(app: FastAPI):
     else:
         logger.warning("Redis client is not available.")
 
+    # Forward new rate states to the open live-rates streams of this worker
+    rate_stream_hub.attach(asyncio.get_running_loop())
+
+    # Compress the /rates bodies of every new rate state off the request path
+    add_state_listener(precompress_rates_bodies)
+
+    # With a shared rate state segment only its owner keeps the rates current;
+    # the other workers of the container read them from shared memory.
+    if not shared_rate_state.enabled or shared_rate_state.start(on_promoted=start_rate_refresh):
+        start_rate_refresh()
+
     yield
 
     logger.info("Shutting down Currency Converter API...")
+    rate_update_subscriber.stop()
+    shared_rate_state.stop()
+    access_log.stop()
 
 logging.basicConfig(
     level=logging.INFO,
@@ -45,9 +87,34 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-app.include_router(currency_router, prefix="/currency-converter/v1")
-app.include_router(history_router, prefix="/currency-converter/v1")
-app.include_router(savings_router, prefix="/currency-converter/v1")
+API_PREFIX = "/currency-converter/v1"
+
+app.add_exception_handler(RequestValidationError, validation_exception_handler)
+app.include_router(currency_router, prefix=API_PREFIX)
+app.include_router(history_router, prefix=API_PREFIX)
+app.include_router(savings_router, prefix=API_PREFIX)
+
+if settings.PROFILING_ENABLED:
+    from src.core.profiling import ProfilingMiddleware, router as profiling_router
+
+    app.add_middleware(
+        ProfilingMiddleware,
+        admin_key=settings.PROFILING_ADMIN_KEY,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        interval=settings.PROFILING_INTERVAL_SECONDS,
+    )
+    app.include_router(profiling_router)
+
+if setup_tracing():
+    app.add_middleware(TracingMiddleware)
+
+# Cross-cutting request handling as pure ASGI middleware (outermost last): request IDs,
+# then timing, metrics and the sampled access log, then compression and the API key check.
+access_log = AccessLog(sample_rate=settings.ACCESS_LOG_SAMPLE_RATE, slow_seconds=settings.ACCESS_LOG_SLOW_SECONDS)
+app.add_middleware(ApiKeyMiddleware, api_key=settings.API_SECRET_KEY, protected_prefixes=(API_PREFIX, "/metrics"))
+app.add_middleware(CompressionMiddleware, min_size=settings.COMPRESSION_MIN_BYTES)
+app.add_middleware(RequestMetricsMiddleware, access_log=access_log)
+app.add_middleware(RequestIdMiddleware)
 
 @app.get("/", tags=["health"])
 def read_root():
@@ -56,17 +123,25 @@ def read_root():
     """
     return {"message": "Currency Converter API is up and running!"}
 
-# Request logging middleware
-@app.middleware("http")
-async def log_requests(request, call_next):
-    start_time = datetime.utcnow()
-    response = await call_next(request)
-    duration = (datetime.utcnow() - start_time).total_seconds()
-    
-    logger.info(
-        f"{request.method} {request.url.path} - "
-        f"Status: {response.status_code} - "
-        f"Duration: {duration:.3f}s"
-    )
-    
-    return response
\ No newline at end of file
+@app.get("/health", tags=["health"])
+def read_health():
+    """
+    Health and cache mode: "redis", or "local" while Redis is unreachable and the hot path
+    runs on process-local fallbacks (rate table, token-bucket limiter, history caches).
+    Always 200, so a Redis outage does not take workers out of the load balancer.
+    """
+    redis_status = redis_manager.status()
+    state = get_rate_state()
+    return {
+        "status": "ok" if redis_status["mode"] == "redis" else "degraded",
+        "redis": redis_status,
+        "rates_as_of": state.as_of.isoformat() if state else None,
+    }
+
+@app.get("/metrics", tags=["health"], dependencies=[Security(api_key_header)])
+def read_metrics():
+    """
+    Prometheus metrics: per-route latency and DB time histograms, status counters,
+    cache hit/miss counters per key family and upstream API latency.
+    """
+    return Response(content=metrics.registry.render(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,153 @@
+# src/rate_history/aggregation.py
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from .models import CurrencyRateSnapshot
+
+HOUR_SECONDS = 3600
+DAY_SECONDS = 86400
+# Bucket width of calendar months; every other width is a fixed number of seconds
+MONTH = "month"
+AGGREGATIONS = ("last", "mean", "ohlc")
+OHLC_FIELDS = ("open", "high", "low", "close")
+
+
+def epoch_seconds(value: datetime) -> int:
+    """Epoch seconds of a datetime; naive datetimes are taken as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def snapshot_timestamps(snapshots: Sequence[CurrencyRateSnapshot]) -> np.ndarray:
+    """Epoch seconds (int64) of each snapshot's effective_at."""
+    return np.fromiter((epoch_seconds(snapshot.effective_at) for snapshot in snapshots), dtype=np.int64, count=len(snapshots))
+
+
+def bucket_ids(timestamps: np.ndarray, width: int | str) -> np.ndarray:
+    """
+    The bucket number of every timestamp: epoch seconds floor-divided by `width`
+    (buckets aligned to the Unix epoch in UTC), or the calendar month for MONTH.
+    """
+    if width == MONTH:
+        return timestamps.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+    if width <= 0:
+        raise ValueError(f"Bucket width must be positive, got {width}.")
+    return timestamps // width
+
+
+def _bucket_starts(ids: np.ndarray) -> np.ndarray:
+    """Index of the first element of every bucket in a non-decreasing id array."""
+    if ids.size == 0:
+        return np.empty(0, dtype=np.intp)
+    return np.flatnonzero(np.concatenate(([True], ids[1:] != ids[:-1])))
+
+
+def _sort_order(timestamps: np.ndarray) -> np.ndarray | None:
+    """A stable sort order for the timestamps, or None when they are already ascending."""
+    if timestamps.size < 2 or np.all(timestamps[1:] >= timestamps[:-1]):
+        return None
+    return np.argsort(timestamps, kind="stable")
+
+
+def last_in_bucket(timestamps: np.ndarray, width: int | str) -> np.ndarray:
+    """Indices (ascending by time) of the latest timestamp in each bucket."""
+    order = _sort_order(timestamps)
+    ordered = timestamps if order is None else timestamps[order]
+    starts = _bucket_starts(bucket_ids(ordered, width))
+    last = np.append(starts[1:], ordered.size) - 1
+    return last if order is None else order[last]
+
+
+def last_per_bucket(snapshots: Sequence[CurrencyRateSnapshot], width: int | str) -> List[CurrencyRateSnapshot]:
+    """Downsamples snapshots to the last one of each bucket, keeping the original rows."""
+    if not snapshots:
+        return []
+    return [snapshots[index] for index in last_in_bucket(snapshot_timestamps(snapshots), width)]
+
+
+@dataclass
+class RateFrame:
+    """Snapshots in columnar form: ascending timestamps and a (snapshots x currencies) rate matrix."""
+    timestamps: np.ndarray
+    codes: List[str]
+    rates: np.ndarray
+
+    @classmethod
+    def from_snapshots(cls, snapshots: Sequence[CurrencyRateSnapshot], codes: List[str] | None = None) -> "RateFrame":
+        """Builds a frame; a currency missing from a snapshot is NaN in that row."""
+        timestamps = snapshot_timestamps(snapshots)
+        if codes is None:
+            codes = list(dict.fromkeys(code for snapshot in snapshots for code in snapshot.rates))
+        rates = np.array(
+            [[snapshot.rates.get(code, np.nan) for code in codes] for snapshot in snapshots], dtype=np.float64
+        ).reshape(len(snapshots), len(codes))
+
+        order = _sort_order(timestamps)
+        if order is not None:
+            timestamps, rates = timestamps[order], rates[order]
+        return cls(timestamps=timestamps, codes=codes, rates=rates)
+
+
+@dataclass
+class AggregatedRates:
+    """
+    One row per bucket, stamped with the time of the bucket's last snapshot.
+    `fields` holds a "rate" matrix for last/mean, or open/high/low/close matrices for OHLC.
+    """
+    timestamps: np.ndarray
+    codes: List[str]
+    fields: Dict[str, np.ndarray]
+
+    def records(self) -> List[Dict]:
+        """Rows as dicts with `effective_at` and a code -> value dict per field, NaNs left out."""
+        effective_at = self.timestamps.astype("datetime64[s]").tolist()
+        records = []
+        for row, timestamp in enumerate(effective_at):
+            record = {"effective_at": timestamp.replace(tzinfo=timezone.utc)}
+            for field, matrix in self.fields.items():
+                values = matrix[row].tolist()
+                record["rates" if field == "rate" else field] = {
+                    code: value for code, value in zip(self.codes, values) if value == value
+                }
+            records.append(record)
+        return records
+
+
+def aggregate(frame: RateFrame, width: int | str, how: str = "last") -> AggregatedRates:
+    """
+    Aggregates a frame into buckets of `width` (seconds, or MONTH) with one vectorized
+    pass per statistic. `how` is "last", "mean" (NaN-aware) or "ohlc".
+    """
+    if how not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation '{how}'. Use one of: {', '.join(AGGREGATIONS)}.")
+
+    starts = _bucket_starts(bucket_ids(frame.timestamps, width))
+    last = np.append(starts[1:], frame.timestamps.size) - 1
+    timestamps = frame.timestamps[last]
+    if starts.size == 0:
+        empty = np.empty((0, len(frame.codes)))
+        fields = {field: empty for field in OHLC_FIELDS} if how == "ohlc" else {"rate": empty}
+        return AggregatedRates(timestamps=timestamps, codes=frame.codes, fields=fields)
+
+    rates = frame.rates
+    if how == "last":
+        fields = {"rate": rates[last]}
+    elif how == "mean":
+        missing = np.isnan(rates)
+        sums = np.add.reduceat(np.where(missing, 0.0, rates), starts, axis=0)
+        counts = np.add.reduceat(~missing, starts, axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fields = {"rate": np.where(counts > 0, sums / counts, np.nan)}
+    else:
+        fields = {
+            "open": rates[starts],
+            "high": np.fmax.reduceat(rates, starts, axis=0),
+            "low": np.fmin.reduceat(rates, starts, axis=0),
+            "close": rates[last],
+        }
+    return AggregatedRates(timestamps=timestamps, codes=frame.codes, fields=fields)
@@ -0,0 +1,183 @@
+# src/rate_history/archive.py
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from src.core.config import settings
+from .aggregation import epoch_seconds, snapshot_timestamps
+from .models import CurrencyRateSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Parsed months kept in memory; a month of hourly rows for ~170 currencies is about 1 MB
+MAX_CACHED_MONTHS = 6
+
+
+def month_start(moment: datetime) -> datetime:
+    moment = moment.astimezone(timezone.utc) if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def next_month(start: datetime) -> datetime:
+    return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+
+
+def months_between(start: datetime, end: datetime) -> List[datetime]:
+    """First days of every month overlapping [start, end]."""
+    months, month = [], month_start(start)
+    while month <= end:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+@dataclass
+class ArchivedMonth:
+    """One month of hourly snapshots in columnar form, sorted by time."""
+    timestamps: np.ndarray       # int64 epoch seconds
+    base_currencies: np.ndarray  # one base currency per row
+    codes: np.ndarray            # column order of `rates`
+    rates: np.ndarray            # float64 (rows, codes), NaN where a currency is missing
+
+    @classmethod
+    def from_snapshots(cls, snapshots: Sequence[CurrencyRateSnapshot]) -> "ArchivedMonth":
+        codes = list(dict.fromkeys(code for snapshot in snapshots for code in snapshot.rates))
+        timestamps = snapshot_timestamps(snapshots)
+        order = np.argsort(timestamps, kind="stable")
+        rates = np.array(
+            [[snapshot.rates.get(code, np.nan) for code in codes] for snapshot in snapshots], dtype=np.float64
+        ).reshape(len(snapshots), len(codes))
+        return cls(
+            timestamps=timestamps[order],
+            base_currencies=np.array([snapshot.base_currency for snapshot in snapshots], dtype=str)[order],
+            codes=np.array(codes, dtype=str),
+            rates=rates[order],
+        )
+
+    def snapshots(self, start: datetime | None = None, end: datetime | None = None, base_currency: str | None = None) -> List[CurrencyRateSnapshot]:
+        """The rows in [start, end] (inclusive, like repo.get_range), optionally for one base currency."""
+        mask = np.ones(self.timestamps.size, dtype=bool)
+        if start is not None:
+            mask &= self.timestamps >= epoch_seconds(start)
+        if end is not None:
+            mask &= self.timestamps <= epoch_seconds(end)
+        if base_currency is not None:
+            mask &= self.base_currencies == base_currency
+
+        codes = self.codes.tolist()
+        rows = np.flatnonzero(mask)
+        return [
+            CurrencyRateSnapshot(
+                frequency="hourly",
+                effective_at=datetime.fromtimestamp(int(self.timestamps[row]), tz=timezone.utc),
+                base_currency=str(self.base_currencies[row]),
+                rates={code: value for code, value in zip(codes, self.rates[row].tolist()) if value == value},
+            )
+            for row in rows.tolist()
+        ]
+
+
+class HourlyArchive:
+    """
+    Compressed, columnar monthly files (`hourly-YYYY-MM.npz`) holding hourly snapshots
+    past the retention window. Written by the hourly job before rows leave Postgres;
+    read back by repo.get_range for ranges reaching beyond the hot window.
+    """
+
+    def __init__(self, directory: str | None):
+        self.directory = directory
+        self._cache: "OrderedDict[datetime, Tuple[int, ArchivedMonth]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def path_for(self, month: datetime) -> str:
+        return os.path.join(self.directory, f"hourly-{month:%Y-%m}.npz")
+
+    def load(self, month: datetime) -> ArchivedMonth | None:
+        path = self.path_for(month)
+        try:
+            modified = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            cached = self._cache.get(month)
+            if cached and cached[0] == modified:
+                self._cache.move_to_end(month)
+                return cached[1]
+
+        with np.load(path, allow_pickle=False) as archive_file:
+            archived = ArchivedMonth(
+                timestamps=archive_file["timestamps"],
+                base_currencies=archive_file["base_currencies"],
+                codes=archive_file["codes"],
+                rates=archive_file["rates"],
+            )
+        with self._lock:
+            self._cache[month] = (modified, archived)
+            while len(self._cache) > MAX_CACHED_MONTHS:
+                self._cache.popitem(last=False)
+        return archived
+
+    def write(self, snapshots: Sequence[CurrencyRateSnapshot]) -> int:
+        """
+        Adds hourly snapshots to their monthly files, merging with what is already
+        archived (the same bucket and base is replaced). Returns the rows written.
+        """
+        by_month: Dict[datetime, List[CurrencyRateSnapshot]] = {}
+        for snapshot in snapshots:
+            by_month.setdefault(month_start(snapshot.effective_at), []).append(snapshot)
+
+        os.makedirs(self.directory, exist_ok=True)
+        for month, month_snapshots in by_month.items():
+            existing = self.load(month)
+            candidates = (existing.snapshots() if existing else []) + month_snapshots
+            merged: Dict[Tuple[int, str], CurrencyRateSnapshot] = {
+                (timestamp, snapshot.base_currency): snapshot
+                for timestamp, snapshot in zip(snapshot_timestamps(candidates).tolist(), candidates)
+            }
+            archived = ArchivedMonth.from_snapshots(list(merged.values()))
+
+            path = self.path_for(month)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, "wb") as archive_file:
+                np.savez_compressed(
+                    archive_file,
+                    timestamps=archived.timestamps,
+                    base_currencies=archived.base_currencies,
+                    codes=archived.codes,
+                    rates=archived.rates,
+                )
+            os.replace(temp_path, path)
+            logger.info(f"Archived {len(month_snapshots)} hourly snapshots to {path} ({archived.timestamps.size} rows in total).")
+        return sum(len(month_snapshots) for month_snapshots in by_month.values())
+
+    def read_range(self, start: datetime, end: datetime, base_currency: str) -> List[CurrencyRateSnapshot]:
+        snapshots = []
+        for month in months_between(start, end):
+            archived = self.load(month)
+            if archived is not None:
+                snapshots.extend(archived.snapshots(start, end, base_currency))
+        return snapshots
+
+    def merge_range(self, rows: List[CurrencyRateSnapshot], start: datetime, end: datetime, base_currency: str) -> List[CurrencyRateSnapshot]:
+        """Database rows plus archived rows of the same range; the database wins for a bucket in both."""
+        archived = self.read_range(start, end, base_currency)
+        if not archived:
+            return rows
+        in_database = set(snapshot_timestamps(rows).tolist())
+        combined = [snapshot for snapshot in archived if epoch_seconds(snapshot.effective_at) not in in_database] + rows
+        return sorted(combined, key=lambda snapshot: epoch_seconds(snapshot.effective_at))
+
+
+hourly_archive = HourlyArchive(settings.HOURLY_ARCHIVE_DIR)
@@ -0,0 +1,279 @@
+# src/rate_history/backfill.py
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Sequence
+
+import httpx
+
+from src.core.metrics import time_upstream
+from src.core.tracing import http_transport
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORICAL_API_URL = "https://openexchangerates.org/api/historical"
+
+# Status codes OXR uses when a key is over quota, suspended or not allowed to call the endpoint.
+KEY_REJECTED_STATUSES = {401, 403, 429}
+
+
+@dataclass
+class ApiKeyBudget:
+    """
+    The request budget of a single OpenExchangeRates API key:
+    at most `max_requests` calls per run, spaced at least `min_interval` seconds apart.
+    """
+    key: str
+    max_requests: int
+    min_interval: float = 0.0
+    used: int = 0
+    next_slot: float = 0.0
+
+    @property
+    def exhausted(self) -> bool:
+        return self.used >= self.max_requests
+
+    def revoke(self) -> None:
+        """Marks the key as unusable for the rest of the run (e.g. quota exceeded)."""
+        self.used = self.max_requests
+
+
+class ApiKeyPool:
+    """
+    Rotates requests across several API keys. Each call to `acquire` picks the
+    key that is free the soonest, so keys are used round-robin while every key
+    stays within its own rate budget.
+    """
+
+    def __init__(self, budgets: Sequence[ApiKeyBudget]):
+        if not budgets:
+            raise ValueError("At least one API key is required.")
+        self._budgets = list(budgets)
+        self._lock = asyncio.Lock()
+
+    @property
+    def exhausted(self) -> bool:
+        return all(budget.exhausted for budget in self._budgets)
+
+    @property
+    def requests_made(self) -> int:
+        return sum(budget.used for budget in self._budgets)
+
+    async def acquire(self) -> ApiKeyBudget | None:
+        """Reserves one request slot. Returns None once every key is exhausted."""
+        async with self._lock:
+            available = [budget for budget in self._budgets if not budget.exhausted]
+            if not available:
+                return None
+            budget = min(available, key=lambda b: b.next_slot)
+            now = time.monotonic()
+            slot = max(now, budget.next_slot)
+            budget.next_slot = slot + budget.min_interval
+            budget.used += 1
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+        return budget
+
+
+class BackfillCheckpoint:
+    """
+    Persists the dates that have been written to the database in a small JSON
+    file (as [start, end] ranges) so an interrupted backfill resumes where it stopped.
+    """
+
+    def __init__(self, path: str | None):
+        self.path = path
+        self.completed: set[date] = set()
+
+    def load(self) -> "BackfillCheckpoint":
+        if not self.path or not os.path.exists(self.path):
+            return self
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        for start_str, end_str in data.get("completed", []):
+            day = date.fromisoformat(start_str)
+            end = date.fromisoformat(end_str)
+            while day <= end:
+                self.completed.add(day)
+                day += timedelta(days=1)
+        logger.info(f"Loaded backfill checkpoint from {self.path}: {len(self.completed)} completed dates.")
+        return self
+
+    def is_done(self, day: date) -> bool:
+        return day in self.completed
+
+    def mark_done(self, days: Iterable[date]) -> None:
+        self.completed.update(days)
+        self.save()
+
+    def _ranges(self) -> List[List[str]]:
+        ranges: List[List[date]] = []
+        for day in sorted(self.completed):
+            if ranges and ranges[-1][1] + timedelta(days=1) == day:
+                ranges[-1][1] = day
+            else:
+                ranges.append([day, day])
+        return [[start.isoformat(), end.isoformat()] for start, end in ranges]
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"completed": self._ranges()}, f)
+        os.replace(tmp_path, self.path)
+
+
+@dataclass
+class BackfillStats:
+    queued: int = 0
+    fetched: int = 0
+    failed: int = 0
+    written: int = 0
+    stopped_by_budget: bool = False
+
+
+class BackfillEngine:
+    """
+    Fetches daily historical rates from OpenExchangeRates with a bounded pool of
+    concurrent workers and hands them to `sink` in batches.
+
+    `sink` receives a list of snapshot dicts (frequency, effective_at, base_currency, rates)
+    and is run in a worker thread, so it may use a blocking database session.
+    Dates are only checkpointed after the sink has written them.
+    """
+
+    def __init__(
+        self,
+        *,
+        key_pool: ApiKeyPool,
+        sink: Callable[[List[Dict]], None],
+        base_url: str = DEFAULT_HISTORICAL_API_URL,
+        base_currency: str = "USD",
+        concurrency: int = 8,
+        batch_size: int = 100,
+        max_retries: int = 3,
+        timeout: float = 15.0,
+        checkpoint: BackfillCheckpoint | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.key_pool = key_pool
+        self.sink = sink
+        self.base_url = base_url.rstrip("/")
+        self.base_currency = base_currency
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.checkpoint = checkpoint or BackfillCheckpoint(None)
+        self.transport = transport
+
+        self.stats = BackfillStats()
+        self._buffer: List[Dict] = []
+        self._flush_lock = asyncio.Lock()
+
+    async def run(self, days: Iterable[date]) -> BackfillStats:
+        queue: asyncio.Queue[date] = asyncio.Queue()
+        for day in days:
+            if not self.checkpoint.is_done(day):
+                queue.put_nowait(day)
+        self.stats.queued = queue.qsize()
+        logger.info(f"Backfill started: {self.stats.queued} dates queued, {self.concurrency} workers.")
+
+        async with httpx.AsyncClient(timeout=self.timeout, transport=http_transport(self.transport)) as client:
+            workers = [asyncio.create_task(self._worker(client, queue)) for _ in range(self.concurrency)]
+            await asyncio.gather(*workers)
+        await self._flush(force=True)
+
+        self.stats.stopped_by_budget = not queue.empty()
+        logger.info(
+            f"Backfill finished: fetched={self.stats.fetched}, written={self.stats.written}, "
+            f"failed={self.stats.failed}, requests={self.key_pool.requests_made}, "
+            f"remaining={queue.qsize()}."
+        )
+        return self.stats
+
+    async def _worker(self, client: httpx.AsyncClient, queue: "asyncio.Queue[date]") -> None:
+        while not queue.empty():
+            day = queue.get_nowait()
+            row = await self._fetch_day(client, day)
+            if row is None:
+                if self.key_pool.exhausted:
+                    # Put the day back so it is reported as remaining and retried on the next run.
+                    queue.put_nowait(day)
+                    return
+                self.stats.failed += 1
+                continue
+
+            self.stats.fetched += 1
+            self._buffer.append(row)
+            if len(self._buffer) >= self.batch_size:
+                await self._flush()
+
+    async def _fetch_day(self, client: httpx.AsyncClient, day: date) -> Dict | None:
+        date_str = day.isoformat()
+        for attempt in range(1, self.max_retries + 1):
+            budget = await self.key_pool.acquire()
+            if budget is None:
+                return None
+
+            url = f"{self.base_url}/{date_str}.json"
+            params = {"app_id": budget.key, "base": self.base_currency}
+            try:
+                with time_upstream("oxr_historical"):
+                    response = await client.get(url, params=params)
+            except httpx.RequestError as e:
+                logger.warning(f"Request for {date_str} failed (attempt {attempt}/{self.max_retries}): {e}")
+                await asyncio.sleep(0.5 * attempt)
+                continue
+
+            if response.status_code in KEY_REJECTED_STATUSES:
+                logger.warning(f"API key ...{budget.key[-4:]} rejected with {response.status_code}; rotating it out.")
+                budget.revoke()
+                continue
+            if response.status_code >= 500:
+                logger.warning(f"Upstream error {response.status_code} for {date_str} (attempt {attempt}/{self.max_retries}).")
+                await asyncio.sleep(0.5 * attempt)
+                continue
+
+            try:
+                response.raise_for_status()
+                data = response.json()
+            except (httpx.HTTPStatusError, ValueError) as e:
+                logger.error(f"Failed to fetch data for {date_str}. Error: {e}")
+                return None
+
+            return {
+                "frequency": "daily",
+                "effective_at": datetime(day.year, day.month, day.day, tzinfo=timezone.utc),
+                "base_currency": data.get("base", self.base_currency),
+                "rates": data.get("rates", {}),
+            }
+
+        logger.error(f"Giving up on {date_str} after {self.max_retries} attempts.")
+        return None
+
+    async def _flush(self, force: bool = False) -> None:
+        async with self._flush_lock:
+            # Workers keep appending while a batch is being written, so drain in batch-sized slices.
+            while self._buffer and (force or len(self._buffer) >= self.batch_size):
+                rows = self._buffer[:self.batch_size]
+                del self._buffer[:self.batch_size]
+                await asyncio.to_thread(self.sink, rows)
+                self.stats.written += len(rows)
+                self.checkpoint.mark_done(row["effective_at"].date() for row in rows)
+                logger.info(f"Wrote batch of {len(rows)} daily snapshots ({self.stats.written} total).")
+
+
+def iter_days(start: date, end: date) -> Iterable[date]:
+    """Yields every calendar day from start to end (inclusive)."""
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
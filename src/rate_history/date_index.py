@@ -0,0 +1,95 @@
+# src/rate_history/date_index.py
+
+import logging
+import threading
+import time
+from bisect import bisect_right
+from datetime import date, datetime, time as dt_time, timezone
+from typing import List
+
+from sqlmodel import Session
+
+from src.core.redis_client import get_redis_client
+from . import repo
+
+logger = logging.getLogger(__name__)
+
+# How long a loaded index is trusted before it is reloaded (gap repair may add older dates)
+DATE_INDEX_MAX_AGE_SECONDS = 60 * 60
+# The jobs announce written daily snapshots here, so the API workers reload their index
+SNAPSHOT_DATES_CHANNEL = "snapshot_dates_updated"
+
+
+class SnapshotDateIndex:
+    """
+    A sorted in-memory list of the dates that have a snapshot, so an "on or before"
+    lookup resolves to an exact bucket with a bisect instead of a database search.
+
+    The index only answers for dates up to the newest date it holds: anything later
+    may have been written by another process since the index was loaded, so those
+    lookups (and lookups before the first date) are left to the database.
+    """
+
+    def __init__(self, frequency: str = "daily", base_currency: str = "USD", max_age_seconds: float = DATE_INDEX_MAX_AGE_SECONDS):
+        self.frequency = frequency
+        self.base_currency = base_currency
+        self.max_age_seconds = max_age_seconds
+        self._dates: List[date] = []
+        self._loaded_at: float | None = None
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self, session: Session) -> None:
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.max_age_seconds:
+            return
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.max_age_seconds:
+                return
+            effective_ats = repo.get_snapshot_dates(session, frequency=self.frequency, base_currency=self.base_currency)
+            self._dates = sorted({effective_at.date() for effective_at in effective_ats})
+            self._loaded_at = time.monotonic()
+            logger.info(f"Loaded {len(self._dates)} {self.frequency} snapshot dates into the date index.")
+
+    def add(self, day: date) -> None:
+        """Records a newly written snapshot date (keeps the index sorted)."""
+        with self._lock:
+            dates = list(self._dates)
+            position = bisect_right(dates, day)
+            if position and dates[position - 1] == day:
+                return
+            dates.insert(position, day)
+            self._dates = dates
+
+    def latest(self, session: Session) -> date | None:
+        """The newest indexed snapshot date."""
+        self._ensure_loaded(session)
+        return self._dates[-1] if self._dates else None
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    def resolve(self, session: Session, target: datetime) -> datetime | None:
+        """
+        Returns the bucket time of the latest snapshot on or before `target`'s date,
+        or None if the index cannot answer (the caller then asks the database).
+        """
+        self._ensure_loaded(session)
+        dates = self._dates
+        target_day = target.date()
+        if not dates or target_day < dates[0] or target_day > dates[-1]:
+            return None
+        resolved = dates[bisect_right(dates, target_day) - 1]
+        return datetime.combine(resolved, dt_time(), tzinfo=timezone.utc)
+
+
+daily_date_index = SnapshotDateIndex()
+
+
+def publish_snapshot_dates_update() -> None:
+    """Tells the API workers that daily snapshots were written (their indexes are loaded per process)."""
+    redis_client = get_redis_client()
+    if not redis_client:
+        return
+    try:
+        redis_client.publish(SNAPSHOT_DATES_CHANNEL, "daily")
+    except Exception as e:
+        logger.error(f"Could not publish snapshot dates update: {e}")
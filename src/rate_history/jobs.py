@@ -1,20 +1,75 @@
 # src/rate_history/jobs.py
 
-import json
+import asyncio
 import logging
+import os
+from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
-from sqlmodel import select
+from typing import Dict, List, Tuple
+from sqlmodel import Session
 from sqlalchemy import text
 
+from src.core.config import settings
 from src.core.database import get_session
 from src.core.redis_client import get_redis_client
 from src.currency.service import _get_all_rates_from_usd
 from src.currency.exceptions import CurrencyAPIError
+from src.currency.cache_warmer import LATEST_RATES_KEY, warm_rate_caches
+from src.currency.rate_state import build_rate_state, set_rate_state
+from src.currency import repo as currency_repo
+from .archive import hourly_archive
+from .backfill import ApiKeyBudget, ApiKeyPool, BackfillEngine
+from .date_index import daily_date_index, publish_snapshot_dates_update
 from .models import CurrencyRateSnapshot
-from .repo import upsert_snapshot, get_latest
+from .partitions import ensure_partitions, is_partitioned, maintain_partitions
+from .rate_cube import DailyRates, append_to_rate_cube, write_rate_cube
+from .repo import (
+    delete_orphan_payloads,
+    get_latest,
+    get_latest_before,
+    get_latest_hourly_for_date,
+    get_missing_buckets,
+    get_range,
+    upsert_snapshot,
+    upsert_snapshots,
+)
+from .service import HistoricalDataService, HOURLY_RANGES, DAILY_RANGES
 
 logger = logging.getLogger(__name__)
 
+HOURLY_RETENTION_DAYS = 30
+DAILY_HISTORY_START = datetime(1999, 1, 1, tzinfo=timezone.utc)
+
+# TTL of the rate caches written by the hourly job; they expire before the next run
+LATEST_RATES_TTL_SECONDS = 55 * 60
+# The cache warm job refreshes the rate caches once they have less than this left
+CACHE_WARM_LEAD_SECONDS = 10 * 60
+# Refreshed caches live until this long after the next hourly boundary
+CACHE_WARM_GRACE_SECONDS = 10 * 60
+
+
+@dataclass
+class GapReport:
+    """Coverage of one frequency's buckets before and after a gap repair run."""
+    frequency: str
+    expected: int
+    missing: int
+    filled: int = 0
+
+    @property
+    def coverage_before(self) -> float:
+        return (self.expected - self.missing) / self.expected if self.expected else 1.0
+
+    @property
+    def coverage_after(self) -> float:
+        return (self.expected - self.missing + self.filled) / self.expected if self.expected else 1.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.frequency}: {self.missing}/{self.expected} buckets missing, {self.filled} filled, "
+            f"coverage {self.coverage_before:.2%} -> {self.coverage_after:.2%}"
+        )
+
 def floor_to_hour(dt: datetime) -> datetime:
     """Floors a datetime object to the beginning of the hour in UTC."""
     dt_utc = dt.astimezone(timezone.utc)
@@ -27,90 +82,373 @@ async def run_hourly_job():
     """
     bucket = floor_to_hour(datetime.now(timezone.utc))
     rates = None
+    provenance = "real"
 
-    # 1) Fetch from external API
+    # 1) Fetch from external API (never from the cache, which may still hold last hour's rates).
+    #    Partial backup providers are left out: a snapshot patched with stale rates is not `real`,
+    #    so when no full-coverage provider answers the forward-fill below runs instead.
     try:
-        rates = await _get_all_rates_from_usd()
+        rates = await _get_all_rates_from_usd(force_refresh=True, complete_only=True)
         logger.info(f"Successfully fetched rates from external API for hourly job at {bucket}.")
     except CurrencyAPIError as e:
         logger.warning(f"External API failed for hourly job: {e}. Attempting to forward-fill.")
-        with next(get_session()) as session:
-            latest_snapshot = get_latest(session, frequency="hourly", base_currency="USD")
-            if latest_snapshot:
-                rates = latest_snapshot.rates
-                logger.info("Successfully forward-filled rates from the last hourly snapshot.")
-            else:
-                logger.error("External API failed AND no previous snapshot found. Cannot proceed.")
-                return
+        # The database work runs in a thread so the scheduler's other jobs keep running
+        latest_snapshot = await asyncio.to_thread(_get_latest_hourly)
+        if latest_snapshot:
+            rates = latest_snapshot.rates
+            provenance = "forward_filled"
+            logger.info("Successfully forward-filled rates from the last hourly snapshot.")
+        else:
+            logger.error("External API failed AND no previous snapshot found. Cannot proceed.")
+            return
 
     if not rates:
         logger.error("No rates could be determined for the hourly job. Aborting.")
         return
 
+    await asyncio.to_thread(_store_hourly_snapshot, bucket, rates, provenance)
+
+
+def _get_latest_hourly() -> CurrencyRateSnapshot | None:
+    with next(get_session()) as session:
+        return get_latest(session, frequency="hourly", base_currency="USD")
+
+
+def _store_hourly_snapshot(bucket: datetime, rates: Dict[str, float], provenance: str) -> None:
+    """Steps 2 and 3 of run_hourly_job: DB upsert, retention and cache warming (blocking)."""
     # 2) DB upsert and retention
     with next(get_session()) as session:
+        # On the partitioned table: create upcoming partitions, archive and drop expired hourly months
+        partitioned = maintain_partitions(
+            session.connection(),
+            retention=timedelta(days=HOURLY_RETENTION_DAYS),
+            before_drop=lambda start, end: _archive_hourly(session, start, end),
+        )
+        session.commit()
+
         upsert_snapshot(
             session=session,
             frequency="hourly",
             effective_at=bucket,
             base_currency="USD",
             rates=rates,
+            provenance=provenance,
         )
-        logger.info(f"Upserted hourly snapshot for {bucket}.")
+        logger.info(f"Upserted {provenance} hourly snapshot for {bucket}.")
         
-        # Retention: Delete hourly data older than 30 days
-        thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-        stmt = text("DELETE FROM currency_rate_snapshots WHERE frequency='hourly' AND effective_at < :cutoff")
-        result = session.exec(stmt, params={"cutoff": thirty_days_ago})
-        session.commit()
-        if result.rowcount > 0:
-            logger.info(f"Deleted {result.rowcount} old hourly snapshots.")
+        # Retention on the unpartitioned table: Delete hourly data older than 30 days
+        if not partitioned:
+            thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=HOURLY_RETENTION_DAYS)
+            try:
+                _archive_hourly(session, DAILY_HISTORY_START, thirty_days_ago)
+            except OSError as e:
+                logger.error(f"Archiving expired hourly snapshots failed, keeping them for the next run: {e}")
+            else:
+                stmt = text("DELETE FROM currency_rate_snapshots WHERE frequency='hourly' AND effective_at < :cutoff")
+                result = session.exec(stmt, params={"cutoff": thirty_days_ago})
+                session.commit()
+                if result.rowcount > 0:
+                    logger.info(f"Deleted {result.rowcount} old hourly snapshots.")
 
-    # 3) Update live cache in Redis (TTL should be less than an hour)
-    redis_client = get_redis_client()
-    if redis_client:
-        # TTL is 55 mins to ensure it expires before the next job, forcing a refresh
-        redis_client.set("latest_usd_rates", json.dumps(rates), ex=55 * 60)
-        logger.info("Updated 'latest_usd_rates' cache in Redis with TTL 55 minutes.")
+        # Rate maps only the expired rows had are not needed any more
+        deleted_payloads = delete_orphan_payloads(session)
+        if deleted_payloads:
+            logger.info(f"Deleted {deleted_payloads} unreferenced rate payloads.")
+
+        # 3) Update the live caches: latest rates, derived /rates bodies and history tails
+        _warm_caches(session, rates, bucket, ttl_seconds=LATEST_RATES_TTL_SECONDS, history_ranges=HOURLY_RANGES)
 
 async def run_daily_job():
     """
     Creates a daily snapshot using the last hourly snapshot of the previous day.
+    If the previous day has no hourly data, its rates are fetched from the historical API.
     """
     utc_now = datetime.now(timezone.utc)
     # Target yesterday's data
     yesterday_start_utc = (utc_now - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-    yesterday_end_utc = yesterday_start_utc + timedelta(days=1) - timedelta(microseconds=1)
 
-    with next(get_session()) as session:
-        # Find the last hourly record from yesterday
-        last_hour_of_yesterday = session.exec(
-            select(CurrencyRateSnapshot)
-            .where(
-                CurrencyRateSnapshot.frequency == "hourly",
-                CurrencyRateSnapshot.base_currency == "USD",
-                CurrencyRateSnapshot.effective_at >= yesterday_start_utc,
-                CurrencyRateSnapshot.effective_at <= yesterday_end_utc,
-            )
-            .order_by(CurrencyRateSnapshot.effective_at.desc())
-            .limit(1)
-        ).first()
+    # Find the last hourly record from yesterday (in a thread, like all the job's database work)
+    last_hour_of_yesterday = await asyncio.to_thread(_get_last_hour_of_day, yesterday_start_utc)
 
-        # If yesterday had no data, fall back to the absolute latest hourly data we have
-        if not last_hour_of_yesterday:
-            last_hour_of_yesterday = get_latest(session, frequency="hourly", base_currency="USD")
-            logger.warning(f"No hourly data for {yesterday_start_utc.date()}. Using latest available snapshot for daily job.")
+    # If yesterday had no hourly data, fetch the real end-of-day rates for it instead of
+    # copying an unrelated snapshot. A failed fetch leaves the gap for run_gap_repair_job.
+    if not last_hour_of_yesterday:
+        logger.warning(f"No hourly data for {yesterday_start_utc.date()}. Fetching the daily snapshot from the historical API.")
+        filled = await _fill_daily_buckets([yesterday_start_utc])
+        if not filled:
+            logger.error(f"Could not create a daily record for {yesterday_start_utc.date()}. It will be retried by the gap repair job.")
+        return
+
+    await asyncio.to_thread(_store_daily_snapshot, yesterday_start_utc, last_hour_of_yesterday.rates)
 
-        if not last_hour_of_yesterday:
-            logger.error("Could not find any hourly snapshot to create a daily record. Aborting daily job.")
-            return
 
+def _get_last_hour_of_day(day_start: datetime) -> CurrencyRateSnapshot | None:
+    with next(get_session()) as session:
+        return get_latest_hourly_for_date(session, day_start, base_currency="USD")
+
+
+def _store_daily_snapshot(yesterday_start_utc: datetime, rates: Dict[str, float]) -> None:
+    with next(get_session()) as session:
         # Create the daily snapshot for yesterday
         upsert_snapshot(
             session=session,
             frequency="daily",
             effective_at=yesterday_start_utc, # The timestamp represents the beginning of the day
             base_currency="USD",
-            rates=last_hour_of_yesterday.rates,
+            rates=rates,
+            # Same rate map as the hourly row, so it references the same payload
+            provenance="derived",
+        )
+        logger.info(f"Upserted daily snapshot for {yesterday_start_utc.date()}.")
+        daily_date_index.add(yesterday_start_utc.date())
+        publish_snapshot_dates_update()
+        _update_rate_cube([(yesterday_start_utc.date(), rates)])
+
+        HistoricalDataService(session).warm_history_caches(DAILY_RANGES)
+
+
+def _warm_caches(
+    session: Session,
+    rates: Dict[str, float],
+    as_of: datetime,
+    *,
+    ttl_seconds: int,
+    history_ranges=(),
+) -> None:
+    decimal_places = currency_repo.get_active_currency_decimal_places(session)
+    # Keyed by the active codes in catalogue order
+    codes = list(decimal_places)
+    warm_rate_caches(rates, codes, as_of, ttl_seconds, decimal_places)
+    HistoricalDataService(session).warm_history_caches(history_ranges)
+
+
+def _archive_hourly(session: Session, start: datetime, end: datetime) -> None:
+    """
+    Copies the hourly snapshots of every base in [start, end) to the monthly archive
+    files (no-op when disabled), since the partition drop and the retention DELETE
+    remove every base.
+    """
+    if not hourly_archive.enabled:
+        return
+    rows = get_range(
+        session, frequency="hourly", start=start, end=end - timedelta(microseconds=1),
+        base_currency=None, include_archive=False,
+    )
+    if rows:
+        hourly_archive.write(rows)
+
+
+def ensure_snapshot_partitions() -> None:
+    """Creates any missing snapshot partitions (on start-up, so writes never hit a missing range)."""
+    with next(get_session()) as session:
+        connection = session.connection()
+        if is_partitioned(connection):
+            ensure_partitions(connection, hourly_start=datetime.now(timezone.utc) - timedelta(days=HOURLY_RETENTION_DAYS))
+            session.commit()
+
+
+def _seconds_until_after_next_hour() -> int:
+    utc_now = datetime.now(timezone.utc)
+    next_hour = floor_to_hour(utc_now) + timedelta(hours=1)
+    return int((next_hour - utc_now).total_seconds()) + CACHE_WARM_GRACE_SECONDS
+
+
+def warm_caches_from_database(refresh_redis: bool | None = None) -> bool:
+    """
+    Builds the in-process rate state from the latest hourly snapshot in Postgres
+    (used on API start-up, so a cold worker never has to call the external API).
+    With refresh_redis=True the Redis rate caches and history tails are rebuilt as well;
+    with None (the default) only when the latest rates are missing from Redis.
+    Returns False if there is no snapshot to warm from.
+    """
+    if refresh_redis is None:
+        redis_client = get_redis_client()
+        refresh_redis = bool(redis_client) and not redis_client.exists(LATEST_RATES_KEY)
+
+    with next(get_session()) as session:
+        latest_snapshot = get_latest(session, frequency="hourly", base_currency="USD")
+        if not latest_snapshot:
+            logger.warning("No hourly snapshot found; nothing to warm the caches from.")
+            return False
+
+        if refresh_redis:
+            _warm_caches(
+                session,
+                latest_snapshot.rates,
+                latest_snapshot.effective_at,
+                ttl_seconds=_seconds_until_after_next_hour(),
+                history_ranges=HOURLY_RANGES + DAILY_RANGES,
+            )
+        else:
+            decimal_places = currency_repo.get_active_currency_decimal_places(session)
+            set_rate_state(build_rate_state(
+                latest_snapshot.rates, list(decimal_places), latest_snapshot.effective_at, decimal_places
+            ))
+
+    logger.info(f"Caches warmed from the snapshot at {latest_snapshot.effective_at}.")
+    return True
+
+
+async def run_cache_warm_job():
+    """
+    Refreshes the rate caches from Postgres shortly before they expire, so live traffic
+    never falls through to the external API between two hourly jobs.
+    """
+    redis_client = get_redis_client()
+    remaining_ttl = redis_client.ttl(LATEST_RATES_KEY) if redis_client else -2
+
+    if remaining_ttl > CACHE_WARM_LEAD_SECONDS:
+        logger.info(f"'{LATEST_RATES_KEY}' still has {remaining_ttl}s left. No warm-up needed.")
+        return
+
+    logger.info(f"'{LATEST_RATES_KEY}' expires in {remaining_ttl}s. Refreshing rate caches from the database.")
+    await asyncio.to_thread(warm_caches_from_database, refresh_redis=True)
+
+
+def _write_snapshots(rows: List[Dict]) -> None:
+    with next(get_session()) as session:
+        upsert_snapshots(session, rows)
+    daily_rows = [(row["effective_at"].date(), row["rates"]) for row in rows if row["frequency"] == "daily"]
+    for day, _ in daily_rows:
+        daily_date_index.add(day)
+    if daily_rows:
+        publish_snapshot_dates_update()
+    _update_rate_cube(daily_rows)
+
+
+def _update_rate_cube(rows: List[DailyRates]) -> None:
+    """Writes new daily snapshots into the rate cube; the first write builds it from Postgres."""
+    if not settings.RATE_CUBE_PATH or not rows:
+        return
+    if not os.path.exists(settings.RATE_CUBE_PATH):
+        run_rate_cube_job()
+        return
+    try:
+        append_to_rate_cube(settings.RATE_CUBE_PATH, rows)
+    except ValueError as e:
+        # A cube from an older file format version: rebuild it from Postgres
+        logger.warning(f"Rebuilding rate cube {settings.RATE_CUBE_PATH}: {e}")
+        run_rate_cube_job()
+
+
+def _iter_daily_rates(session: Session, start: datetime, end: datetime):
+    """Daily USD rates from Postgres, one year per query to bound memory."""
+    year_start = start
+    while year_start <= end:
+        year_end = min(year_start.replace(year=year_start.year + 1) - timedelta(microseconds=1), end)
+        for snapshot in get_range(session, frequency="daily", start=year_start, end=year_end, base_currency="USD"):
+            yield snapshot.effective_at.date(), snapshot.rates
+        year_start = year_end + timedelta(microseconds=1)
+
+
+def run_rate_cube_job() -> int:
+    """
+    Rebuilds the memory-mapped rate cube from every daily snapshot since
+    DAILY_HISTORY_START. API workers pick up the new file on their next read.
+    """
+    if not settings.RATE_CUBE_PATH:
+        logger.warning("RATE_CUBE_PATH is not set. Nothing to build.")
+        return 0
+    with next(get_session()) as session:
+        return write_rate_cube(
+            settings.RATE_CUBE_PATH, _iter_daily_rates(session, DAILY_HISTORY_START, datetime.now(timezone.utc))
         )
-        logger.info(f"Upserted daily snapshot for {yesterday_start_utc.date()}.")
\ No newline at end of file
+
+
+async def _fill_daily_buckets(buckets: List[datetime]) -> int:
+    """
+    Fetches the given missing days from the OXR historical endpoint concurrently
+    and stores them as daily snapshots. Returns the number of days written.
+    """
+    if not buckets:
+        return 0
+    if not settings.OPEN_EXCHANGE_RATES_API_KEY:
+        logger.error("Cannot fill daily gaps: missing OPEN_EXCHANGE_RATES_API_KEY.")
+        return 0
+
+    key_pool = ApiKeyPool([
+        ApiKeyBudget(key=settings.OPEN_EXCHANGE_RATES_API_KEY, max_requests=settings.GAP_REPAIR_MAX_REQUESTS)
+    ])
+    engine = BackfillEngine(
+        key_pool=key_pool,
+        sink=_write_snapshots,
+        base_url=settings.OPEN_EXCHANGE_RATES_HISTORICAL_API_URL,
+        concurrency=4,
+        batch_size=50,
+    )
+    stats = await engine.run(bucket.date() for bucket in buckets)
+    return stats.written
+
+
+def _fill_hourly_buckets(session: Session, buckets: List[datetime]) -> int:
+    """
+    Forward-fills missing hours from the snapshot right before each gap, the same way
+    run_hourly_job does when the external API is down (OXR has no intraday history).
+    """
+    rows = []
+    previous_bucket, previous_rates = None, None
+    for bucket in buckets:
+        if previous_bucket is None or bucket - previous_bucket != timedelta(hours=1):
+            source = get_latest_before(session, frequency="hourly", before=bucket, base_currency="USD")
+            previous_rates = source.rates if source else None
+        previous_bucket = bucket
+
+        if previous_rates:
+            rows.append({
+                "frequency": "hourly",
+                "effective_at": bucket,
+                "base_currency": "USD",
+                "rates": previous_rates,
+                "provenance": "forward_filled",
+            })
+
+    if rows:
+        upsert_snapshots(session, rows)
+    return len(rows)
+
+
+async def run_gap_repair_job() -> List[GapReport]:
+    """
+    Finds missing hourly buckets in the retention window and missing daily buckets since
+    DAILY_HISTORY_START with a generate_series anti-join, fills exactly those buckets
+    and reports coverage metrics.
+    """
+    utc_now = datetime.now(timezone.utc)
+    # The current hour and today are still being written by the regular jobs.
+    hourly_end = floor_to_hour(utc_now) - timedelta(hours=1)
+    hourly_start = floor_to_hour(utc_now - timedelta(days=HOURLY_RETENTION_DAYS)) + timedelta(hours=1)
+    daily_end = (utc_now - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    hourly_report, daily_report, missing_days = await asyncio.to_thread(
+        _repair_hourly_gaps, hourly_start, hourly_end, daily_end
+    )
+    daily_report.filled = await _fill_daily_buckets(missing_days)
+
+    reports = [hourly_report, daily_report]
+    for report in reports:
+        logger.info(f"Gap repair {report.summary()}")
+    return reports
+
+
+def _repair_hourly_gaps(
+    hourly_start: datetime, hourly_end: datetime, daily_end: datetime
+) -> Tuple[GapReport, GapReport, List[datetime]]:
+    """Scans both frequencies for gaps and forward-fills the hourly ones (blocking)."""
+    with next(get_session()) as session:
+        missing_hours = get_missing_buckets(session, frequency="hourly", start=hourly_start, end=hourly_end)
+        missing_days = get_missing_buckets(session, frequency="daily", start=DAILY_HISTORY_START, end=daily_end)
+
+        hourly_report = GapReport(
+            frequency="hourly",
+            expected=int((hourly_end - hourly_start) / timedelta(hours=1)) + 1,
+            missing=len(missing_hours),
+        )
+        daily_report = GapReport(
+            frequency="daily",
+            expected=(daily_end - DAILY_HISTORY_START).days + 1,
+            missing=len(missing_days),
+        )
+        logger.info(f"Gap scan found {len(missing_hours)} missing hourly and {len(missing_days)} missing daily buckets.")
+
+        hourly_report.filled = _fill_hourly_buckets(session, missing_hours)
+    return hourly_report, daily_report, missing_days
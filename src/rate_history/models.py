@@ -2,16 +2,37 @@ from __future__ import annotations
 from typing import Dict
 from datetime import datetime
 from sqlmodel import SQLModel, Field, Column, JSON
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Identity, Index, Integer, UniqueConstraint, text
+
+class RatePayload(SQLModel, table=True):
+    """A distinct rates map, stored once and referenced by every snapshot that has it."""
+    __tablename__ = "currency_rate_payloads"
+
+    hash: str = Field(primary_key=True, max_length=64, description="sha256 of the canonical rates JSON")
+    rates: Dict[str, float] = Field(sa_column=Column(JSON, nullable=False), description="USD->X map")
+
 
 class CurrencyRateSnapshot(SQLModel, table=True):
     __tablename__ = "currency_rate_snapshots"
     __table_args__ = (
         UniqueConstraint("frequency", "effective_at", "base_currency", name="uq_crs"),
+        # Serves "latest snapshot on or before X" lookups as a single index probe
+        Index("ix_crs_frequency_base_effective_at_desc", "frequency", "base_currency", text("effective_at DESC")),
+        # Partitioned by frequency, then by time (see partitions.py); keys of a partitioned
+        # table must contain the partition columns, hence the composite primary key
+        {"postgresql_partition_by": "LIST (frequency)"},
     )
 
-    id: int | None = Field(default=None, primary_key=True)
-    frequency: str = Field(index=True, description="hourly | daily")
-    effective_at: datetime = Field(index=True, description="UTC bucket time")
+    id: int | None = Field(default=None, sa_column=Column(Integer, Identity(), primary_key=True))
+    frequency: str = Field(primary_key=True, index=True, description="hourly | daily")
+    effective_at: datetime = Field(primary_key=True, index=True, description="UTC bucket time")
     base_currency: str = Field(default="USD", index=True)
-    rates: Dict[str, float] = Field(sa_column=Column(JSON), description="USD->X map")
\ No newline at end of file
+    payload_hash: str | None = Field(default=None, index=True, max_length=64, description="currency_rate_payloads.hash")
+    provenance: str = Field(
+        default="real",
+        sa_column_kwargs={"server_default": "real"},
+        description="real | forward_filled | derived",
+    )
+    # Filled from the referenced payload by the repo reads; stored inline only on rows
+    # written before payloads were deduplicated (see migrate_snapshot_payloads.py)
+    rates: Dict[str, float] | None = Field(default=None, sa_column=Column(JSON), description="USD->X map")
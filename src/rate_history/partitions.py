@@ -0,0 +1,188 @@
+# src/rate_history/partitions.py
+
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from .models import CurrencyRateSnapshot
+
+logger = logging.getLogger(__name__)
+
+# currency_rate_snapshots is LIST-partitioned by frequency, and each frequency
+# is RANGE-partitioned by effective_at:
+#   currency_rate_snapshots
+#     currency_rate_snapshots_hourly           FOR VALUES IN ('hourly')
+#       currency_rate_snapshots_hourly_p2025_10  one per month, dropped once expired
+#     currency_rate_snapshots_daily            FOR VALUES IN ('daily')
+#       currency_rate_snapshots_daily_p2025      one per year, kept forever
+SNAPSHOTS_TABLE = CurrencyRateSnapshot.__tablename__
+PARTITION_PERIODS = {"hourly": "month", "daily": "year"}
+# How many periods past the current one always have a partition ready
+PERIODS_AHEAD = {"hourly": 2, "daily": 1}
+DAILY_PARTITIONS_START = datetime(1999, 1, 1, tzinfo=timezone.utc)
+# Serializes partition changes between API workers starting up and the hourly job
+PARTITION_LOCK_NAME = f"{SNAPSHOTS_TABLE}_partitions"
+
+_LEAF_NAME = re.compile(rf"^{SNAPSHOTS_TABLE}_(hourly|daily)_p(\d{{4}})(?:_(\d{{2}}))?$")
+
+
+def frequency_partition_name(frequency: str) -> str:
+    return f"{SNAPSHOTS_TABLE}_{frequency}"
+
+
+def _period_start(frequency: str, moment: datetime) -> datetime:
+    moment = moment.astimezone(timezone.utc)
+    if PARTITION_PERIODS[frequency] == "month":
+        return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+    return datetime(moment.year, 1, 1, tzinfo=timezone.utc)
+
+
+def _next_period(frequency: str, start: datetime) -> datetime:
+    if PARTITION_PERIODS[frequency] == "month":
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return start.replace(year=start.year + 1)
+
+
+def leaf_partition_name(frequency: str, start: datetime) -> str:
+    suffix = f"p{start:%Y_%m}" if PARTITION_PERIODS[frequency] == "month" else f"p{start:%Y}"
+    return f"{frequency_partition_name(frequency)}_{suffix}"
+
+
+def _leaf_bounds(name: str) -> Tuple[str, datetime, datetime] | None:
+    """Frequency and [start, end) range of a leaf partition, parsed from its name."""
+    match = _LEAF_NAME.match(name)
+    if not match:
+        return None
+    frequency, year, month = match.group(1), int(match.group(2)), int(match.group(3) or 1)
+    start = datetime(year, month, 1, tzinfo=timezone.utc)
+    return frequency, start, _next_period(frequency, start)
+
+
+def is_partitioned(connection: Connection) -> bool:
+    """Whether the snapshots table is the partitioned layout (False before the migration, or off Postgres)."""
+    if connection.dialect.name != "postgresql":
+        return False
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": SNAPSHOTS_TABLE}
+    ).scalar()
+    return relkind == "p"
+
+
+def _existing_partitions(connection: Connection) -> List[str]:
+    """Names of every partition below the snapshots table, at any level."""
+    return list(connection.execute(text("""
+        WITH RECURSIVE tree AS (
+            SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(:table)
+            UNION ALL
+            SELECT i.inhrelid FROM pg_inherits i JOIN tree t ON i.inhparent = t.inhrelid
+        )
+        SELECT c.relname FROM tree JOIN pg_class c ON c.oid = tree.inhrelid
+    """), {"table": SNAPSHOTS_TABLE}).scalars())
+
+
+def _lock_partitions(connection: Connection) -> None:
+    """Takes the partition lock until the end of the current transaction."""
+    connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": PARTITION_LOCK_NAME})
+
+
+def ensure_partitions(connection: Connection, *, now: datetime | None = None, hourly_start: datetime | None = None) -> List[str]:
+    """
+    Creates the missing partitions: both frequency partitions, hourly months from
+    `hourly_start` (default: the current month) and daily years since 1999, each up to
+    PERIODS_AHEAD periods into the future. Returns the names of the new partitions.
+    Runs under a transaction-scoped advisory lock, so concurrent callers never race
+    between the existence check and the CREATE; commit to release it.
+    """
+    now = now or datetime.now(timezone.utc)
+    _lock_partitions(connection)
+    existing = set(_existing_partitions(connection))
+    created = []
+
+    for frequency in PARTITION_PERIODS:
+        parent = frequency_partition_name(frequency)
+        if parent not in existing:
+            connection.execute(text(
+                f"CREATE TABLE {parent} PARTITION OF {SNAPSHOTS_TABLE} "
+                f"FOR VALUES IN ('{frequency}') PARTITION BY RANGE (effective_at)"
+            ))
+            created.append(parent)
+
+        first = DAILY_PARTITIONS_START if frequency == "daily" else (hourly_start or now)
+        start = _period_start(frequency, first)
+        last = _period_start(frequency, now)
+        for _ in range(PERIODS_AHEAD[frequency]):
+            last = _next_period(frequency, last)
+
+        while start <= last:
+            name = leaf_partition_name(frequency, start)
+            end = _next_period(frequency, start)
+            if name not in existing:
+                connection.execute(text(
+                    f"CREATE TABLE {name} PARTITION OF {parent} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                ))
+                created.append(name)
+            start = end
+
+    if created:
+        logger.info(f"Created snapshot partitions: {', '.join(created)}")
+    return created
+
+
+def drop_expired_partitions(
+    connection: Connection,
+    *,
+    frequency: str,
+    cutoff: datetime,
+    before_drop: Callable[[datetime, datetime], None] | None = None
+) -> List[str]:
+    """
+    Detaches and drops the leaf partitions of `frequency` whose whole range is
+    before `cutoff`. Replaces row-by-row DELETEs: no dead tuples, no vacuum work.
+    `before_drop(start, end)` runs first for each partition (e.g. to archive it);
+    if it raises, that partition is kept for the next run.
+    Returns the names of the dropped partitions.
+    """
+    dropped = []
+    for name in sorted(_existing_partitions(connection)):
+        bounds = _leaf_bounds(name)
+        if not bounds or bounds[0] != frequency or bounds[2] > cutoff:
+            continue
+        if before_drop is not None:
+            try:
+                before_drop(bounds[1], bounds[2])
+            except Exception as e:
+                logger.error(f"Keeping partition {name}: preparing it for drop failed: {e}")
+                continue
+        connection.execute(text(f"ALTER TABLE {frequency_partition_name(frequency)} DETACH PARTITION {name}"))
+        connection.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+
+    if dropped:
+        logger.info(f"Dropped expired {frequency} partitions: {', '.join(dropped)}")
+    return dropped
+
+
+def maintain_partitions(
+    connection: Connection,
+    *,
+    retention: timedelta,
+    now: datetime | None = None,
+    before_drop: Callable[[datetime, datetime], None] | None = None
+) -> bool:
+    """
+    Hourly-job housekeeping for the partitioned table: creates partitions ahead
+    and drops hourly months that are entirely older than `retention`
+    (see drop_expired_partitions for `before_drop`).
+    Returns False (and does nothing) when the table is not partitioned.
+    """
+    if not is_partitioned(connection):
+        return False
+    now = now or datetime.now(timezone.utc)
+    ensure_partitions(connection, now=now, hourly_start=now - retention)
+    drop_expired_partitions(connection, frequency="hourly", cutoff=now - retention, before_drop=before_drop)
+    return True
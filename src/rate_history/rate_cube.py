@@ -0,0 +1,271 @@
+# src/rate_history/rate_cube.py
+
+import fcntl
+import json
+import logging
+import os
+import struct
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from src.core.config import settings
+from .models import CurrencyRateSnapshot
+
+logger = logging.getLogger(__name__)
+
+# File layout: a HEADER_SIZE-byte header, then one row of `columns` little-endian
+# float64 rates per day since the start date. NaN marks a missing day or currency.
+# float64 holds the rates exactly as Postgres returns them, so both sources give the same bodies.
+# Currency codes are kept in `<path>.codes.json`, in column order.
+CUBE_MAGIC = b"RATECUBE"
+CUBE_VERSION = 2  # version 1 files held float32 rates
+_HEADER = struct.Struct("<8sHHiq")  # magic, version, reserved, columns, start day (days since 1970-01-01)
+HEADER_SIZE = 64
+CUBE_DTYPE = np.dtype("<f8")
+# Row 0 of every cube: the first day of the daily history
+CUBE_START_DATE = date(1999, 1, 1)
+# Columns are allocated in blocks, so new currencies rarely force a rewrite
+COLUMN_BLOCK = 64
+
+EPOCH = date(1970, 1, 1)
+DailyRates = Tuple[date, Dict[str, float]]
+
+
+def _codes_path(path: str) -> str:
+    return f"{path}.codes.json"
+
+
+def _read_codes(path: str) -> List[str]:
+    try:
+        with open(_codes_path(path), encoding="utf-8") as codes_file:
+            return json.load(codes_file)["codes"]
+    except FileNotFoundError:
+        return []
+
+
+def _write_codes(path: str, codes: List[str]) -> None:
+    temp_path = f"{_codes_path(path)}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as codes_file:
+        json.dump({"codes": codes}, codes_file)
+    os.replace(temp_path, _codes_path(path))
+
+
+def _read_header(handle) -> Tuple[int, date]:
+    magic, version, _, columns, start_day = _HEADER.unpack(handle.read(_HEADER.size))
+    if magic != CUBE_MAGIC or version != CUBE_VERSION:
+        raise ValueError(f"Not a version {CUBE_VERSION} rate cube file.")
+    return columns, EPOCH + timedelta(days=start_day)
+
+
+def _column_capacity(code_count: int) -> int:
+    return max(COLUMN_BLOCK, -(-code_count // COLUMN_BLOCK) * COLUMN_BLOCK)
+
+
+def _fill_row(row: np.ndarray, rates: Dict[str, float], column_of: Dict[str, int]) -> None:
+    row[[column_of[code] for code in rates]] = list(rates.values())
+
+
+def _write_cube_file(path: str, matrix: np.ndarray, codes: List[str]) -> None:
+    """Writes a complete cube next to `path` and swaps it in, so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.tmp"
+    header = _HEADER.pack(CUBE_MAGIC, CUBE_VERSION, 0, matrix.shape[1], (CUBE_START_DATE - EPOCH).days)
+    with open(temp_path, "wb") as cube_file:
+        cube_file.write(header.ljust(HEADER_SIZE, b"\0"))
+        cube_file.write(np.ascontiguousarray(matrix, dtype=CUBE_DTYPE).tobytes())
+    # Codes first: column positions never change, so a reader of the old file only sees extra codes
+    _write_codes(path, codes)
+    os.replace(temp_path, path)
+
+
+def write_rate_cube(path: str, rows: Iterable[DailyRates]) -> int:
+    """
+    Builds the cube from daily USD rates and swaps it in atomically. Rows may come in
+    any order; a day given twice keeps its last rates.
+    Currencies already in the cube keep their column. Returns the number of days written.
+    """
+    codes = _read_codes(path)
+    column_of = {code: column for column, code in enumerate(codes)}
+    matrix = np.full(((date.today() - CUBE_START_DATE).days + 2, _column_capacity(len(codes))), np.nan, dtype=CUBE_DTYPE)
+    last_index, written = -1, 0
+
+    for day, rates in rows:
+        index = (day - CUBE_START_DATE).days
+        if index < 0:
+            continue
+        for code in rates:
+            if code not in column_of:
+                column_of[code] = len(codes)
+                codes.append(code)
+        if len(codes) > matrix.shape[1] or index >= matrix.shape[0]:
+            grown = np.full((max(matrix.shape[0], index + 1), _column_capacity(len(codes))), np.nan, dtype=CUBE_DTYPE)
+            grown[:matrix.shape[0], :matrix.shape[1]] = matrix
+            matrix = grown
+        matrix[index] = np.nan
+        _fill_row(matrix[index], rates, column_of)
+        last_index = max(last_index, index)
+        written += 1
+
+    _write_cube_file(path, matrix[:last_index + 1], codes)
+    logger.info(f"Wrote rate cube {path} with {written} days and {len(codes)} currencies.")
+    return written
+
+
+def append_to_rate_cube(path: str, rows: Iterable[DailyRates]) -> int:
+    """
+    Writes daily rates into the cube in place: days after the last row are appended
+    (skipped days in between become NaN rows) and earlier days are overwritten.
+    Builds the cube from `rows` if it does not exist. Returns the number of days written.
+    """
+    rows = sorted(rows, key=lambda row: row[0])
+    if not rows:
+        return 0
+    if not os.path.exists(path):
+        return write_rate_cube(path, rows)
+
+    with open(path, "r+b") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        columns, start = _read_header(handle)
+        row_bytes = columns * CUBE_DTYPE.itemsize
+        day_count = (os.fstat(handle.fileno()).st_size - HEADER_SIZE) // row_bytes
+
+        known_codes = _read_codes(path)
+        codes = list(dict.fromkeys(known_codes + [code for _, rates in rows for code in rates]))
+        if len(codes) > columns:
+            # No spare column left: rewrite the whole cube with a wider row
+            handle.seek(HEADER_SIZE)
+            existing = np.frombuffer(handle.read(day_count * row_bytes), dtype=CUBE_DTYPE).reshape(day_count, columns)
+            existing_rows = [
+                (start + timedelta(days=index), {code: rate for code, rate in zip(known_codes, existing[index].tolist()) if rate == rate})
+                for index in range(day_count)
+            ]
+            return write_rate_cube(path, existing_rows + rows)
+        if len(codes) > len(known_codes):
+            _write_codes(path, codes)
+
+        column_of = {code: column for column, code in enumerate(codes)}
+        written = 0
+        for day, rates in rows:
+            index = (day - start).days
+            if index < 0:
+                logger.warning(f"Skipping {day} for the rate cube: it starts at {start}.")
+                continue
+            if index > day_count:
+                gap = np.full((index - day_count, columns), np.nan, dtype=CUBE_DTYPE)
+                os.pwrite(handle.fileno(), gap.tobytes(), HEADER_SIZE + day_count * row_bytes)
+            row = np.full(columns, np.nan, dtype=CUBE_DTYPE)
+            _fill_row(row, rates, column_of)
+            os.pwrite(handle.fileno(), row.tobytes(), HEADER_SIZE + index * row_bytes)
+            day_count = max(day_count, index + 1)
+            written += 1
+
+    logger.info(f"Wrote {written} days into rate cube {path}.")
+    return written
+
+
+@dataclass
+class CubeWindow:
+    """Consecutive days of the cube. `rates` is a view into the mapped file, not a copy."""
+    start: date
+    codes: List[str]
+    rates: np.ndarray
+
+    def __len__(self) -> int:
+        return self.rates.shape[0]
+
+    def timestamps(self) -> np.ndarray:
+        """Epoch seconds of every row (UTC midnight)."""
+        first_day = (self.start - EPOCH).days
+        return (first_day + np.arange(len(self), dtype=np.int64)) * 86400
+
+    def has_rates(self) -> np.ndarray:
+        """Rows that hold any rate (days without a snapshot are all NaN)."""
+        return ~np.all(np.isnan(self.rates), axis=1)
+
+    def column(self, code: str) -> np.ndarray | None:
+        """One currency's daily rates as a view."""
+        return self.rates[:, self.codes.index(code)] if code in self.codes else None
+
+    def snapshots(self, rows: np.ndarray) -> List[CurrencyRateSnapshot]:
+        """The given rows as daily USD snapshots, leaving out missing currencies."""
+        values = self.rates[rows].tolist()
+        snapshots = []
+        for row, row_values in zip(rows.tolist(), values):
+            snapshots.append(CurrencyRateSnapshot(
+                frequency="daily",
+                base_currency="USD",
+                effective_at=datetime.combine(self.start + timedelta(days=row), dt_time(), tzinfo=timezone.utc),
+                rates={code: value for code, value in zip(self.codes, row_values) if value == value},
+            ))
+        return snapshots
+
+
+class RateCube:
+    """
+    Read-only access to the cube file through a shared memory map: every worker
+    process maps the same page cache, and slices are views rather than copies.
+    The mapping is re-opened whenever the file is appended to or rebuilt.
+    """
+
+    def __init__(self, path: str | None):
+        self.path = path
+        self._file_key = None
+        self._state: Tuple[np.ndarray, List[str], date] | None = None
+        self._lock = threading.Lock()
+
+    def _current(self) -> Tuple[np.ndarray, List[str], date] | None:
+        if not self.path:
+            return None
+        try:
+            stat = os.stat(self.path)
+            codes_mtime = os.stat(_codes_path(self.path)).st_mtime_ns
+        except FileNotFoundError:
+            self._state, self._file_key = None, None
+            return None
+
+        file_key = (stat.st_ino, stat.st_size, codes_mtime)
+        if file_key != self._file_key:
+            with self._lock:
+                if file_key != self._file_key:
+                    self._state = self._open(stat.st_size)
+                    self._file_key = file_key
+        return self._state
+
+    def _open(self, size: int) -> Tuple[np.ndarray, List[str], date] | None:
+        try:
+            with open(self.path, "rb") as handle:
+                columns, start = _read_header(handle)
+        except (OSError, ValueError, struct.error) as e:
+            logger.error(f"Could not open rate cube {self.path}: {e}")
+            return None
+        days = (size - HEADER_SIZE) // (columns * CUBE_DTYPE.itemsize)
+        if days <= 0:
+            return None
+        matrix = np.memmap(self.path, dtype=CUBE_DTYPE, mode="r", offset=HEADER_SIZE, shape=(days, columns))
+        codes = _read_codes(self.path)[:columns]
+        logger.info(f"Mapped rate cube {self.path}: {days} days from {start}, {len(codes)} currencies.")
+        return matrix, codes, start
+
+    def last_date(self) -> date | None:
+        state = self._current()
+        if state is None:
+            return None
+        matrix, _, start = state
+        return start + timedelta(days=matrix.shape[0] - 1)
+
+    def window(self, first: date, last: date) -> CubeWindow | None:
+        """The days from `first` to `last` (inclusive, clipped to the cube), or None without a cube."""
+        state = self._current()
+        if state is None:
+            return None
+        matrix, codes, start = state
+        begin = min(max((first - start).days, 0), matrix.shape[0])
+        end = min(max((last - start).days + 1, begin), matrix.shape[0])
+        return CubeWindow(start=start + timedelta(days=begin), codes=codes, rates=matrix[begin:end, :len(codes)])
+
+
+rate_cube = RateCube(settings.RATE_CUBE_PATH)
@@ -1,85 +1,249 @@
 # src/rate_history/repo.py
 
-from datetime import datetime
-from typing import List, Dict
+import csv
+import hashlib
+import io
+import json
+from datetime import date, datetime
+from typing import List, Dict, Iterable
 from sqlmodel import Session, select
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import any_, bindparam, func, null, text, true
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 
-from .models import CurrencyRateSnapshot
+from .archive import hourly_archive
+from .models import CurrencyRateSnapshot, RatePayload
+from src.core.tracing import traced
 
+# Rows per multi-row INSERT statement in upsert_snapshots
+DEFAULT_UPSERT_CHUNK_SIZE = 500
+SNAPSHOT_COLUMNS = ("frequency", "effective_at", "base_currency", "rates", "provenance")
+# Columns written to currency_rate_snapshots; the rates themselves go to currency_rate_payloads
+STORED_COLUMNS = ("frequency", "effective_at", "base_currency", "provenance", "payload_hash")
+# Snapshot writers hold this advisory lock shared, the payload garbage collector exclusively
+PAYLOAD_LOCK_NAME = "currency_rate_payloads"
+
+
+def rates_hash(rates: Dict[str, float]) -> str:
+    """Content address of a rates map: sha256 of its canonical (sorted, compact) JSON."""
+    canonical = json.dumps(rates, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _snapshot_select():
+    """
+    Snapshot columns with `rates` taken from the referenced payload (or the inline
+    column on rows written before payload deduplication).
+    """
+    return (
+        select(
+            CurrencyRateSnapshot.id,
+            CurrencyRateSnapshot.frequency,
+            CurrencyRateSnapshot.effective_at,
+            CurrencyRateSnapshot.base_currency,
+            CurrencyRateSnapshot.payload_hash,
+            CurrencyRateSnapshot.provenance,
+            func.coalesce(RatePayload.rates, CurrencyRateSnapshot.rates).label("rates"),
+        )
+        .select_from(CurrencyRateSnapshot)
+        .outerjoin(RatePayload, RatePayload.hash == CurrencyRateSnapshot.payload_hash)
+    )
+
+
+def _to_snapshot(row) -> CurrencyRateSnapshot | None:
+    return CurrencyRateSnapshot.model_validate(dict(row._mapping)) if row is not None else None
+
+@traced()
 def upsert_snapshot(
     session: Session,
     *,
     frequency: str,
     effective_at: datetime,
     base_currency: str,
-    rates: Dict[str, float]
+    rates: Dict[str, float],
+    provenance: str = "real"
 ) -> CurrencyRateSnapshot:
     """
     Atomically inserts a new snapshot or updates an existing one for the same
     frequency, timestamp, and base currency using PostgreSQL's ON CONFLICT.
+    `provenance` records where the rates came from: "real" (fetched for this bucket),
+    "forward_filled" (copied from an earlier bucket) or "derived" (from other snapshots).
     """
-    # 1. Values to insert or update
-    values_to_insert = {
+    return upsert_snapshots(session, [{
         "frequency": frequency,
         "effective_at": effective_at,
         "base_currency": base_currency,
-        "rates": rates
-    }
+        "rates": rates,
+        "provenance": provenance
+    }])[0]
 
-    # 2. Build the "INSERT ... ON CONFLICT" statement
-    stmt = pg_insert(CurrencyRateSnapshot).values(values_to_insert)
-    
-    # 3. Define what to do on conflict (update the 'rates' column)
-    # The conflict target is the unique constraint 'uq_crs' we defined in the model.
-    stmt = stmt.on_conflict_do_update(
-        constraint="uq_crs",
-        set_={"rates": stmt.excluded.rates}
-    )
 
-    # 4. Execute and commit
-    session.execute(stmt)
+def _snapshot_values(snapshots: Iterable[Dict | CurrencyRateSnapshot]) -> List[Dict]:
+    """
+    Normalizes snapshots to column dicts. A single INSERT ... ON CONFLICT cannot touch
+    the same row twice, so duplicates of the same bucket are collapsed (last one wins).
+    """
+    values_by_key: Dict[tuple, Dict] = {}
+    for snapshot in snapshots:
+        if isinstance(snapshot, CurrencyRateSnapshot):
+            snapshot = snapshot.model_dump(include=set(SNAPSHOT_COLUMNS))
+        values = {column: snapshot.get(column) for column in SNAPSHOT_COLUMNS}
+        values["provenance"] = values["provenance"] or "real"
+        values["payload_hash"] = rates_hash(values["rates"])
+        values_by_key[(values["frequency"], values["effective_at"], values["base_currency"])] = values
+    return list(values_by_key.values())
+
+
+def _store_payloads(session: Session, values: List[Dict], chunk_size: int = DEFAULT_UPSERT_CHUNK_SIZE) -> None:
+    """
+    Inserts the distinct rate maps among `values` that are not stored yet. Takes the
+    payload lock shared until the commit, so delete_orphan_payloads cannot remove a
+    payload that ON CONFLICT DO NOTHING found before the snapshot referencing it lands.
+    """
+    session.execute(text("SELECT pg_advisory_xact_lock_shared(hashtext(:name))"), {"name": PAYLOAD_LOCK_NAME})
+    payloads = [
+        {"hash": payload_hash, "rates": rates}
+        for payload_hash, rates in {value["payload_hash"]: value["rates"] for value in values}.items()
+    ]
+    for i in range(0, len(payloads), chunk_size):
+        stmt = pg_insert(RatePayload.__table__).values(payloads[i:i + chunk_size])
+        session.execute(stmt.on_conflict_do_nothing(index_elements=["hash"]))
+
+
+@traced()
+def upsert_snapshots(
+    session: Session,
+    snapshots: Iterable[Dict | CurrencyRateSnapshot],
+    *,
+    chunk_size: int = DEFAULT_UPSERT_CHUNK_SIZE
+) -> List[CurrencyRateSnapshot]:
+    """
+    Inserts or updates many snapshots with multi-row INSERT ... ON CONFLICT statements,
+    `chunk_size` rows per statement, and commits once at the end.
+    Each distinct rates map is stored once in currency_rate_payloads and the snapshot
+    rows reference it by hash; forward-filled and derived rows cost no payload bytes.
+    The written rows come back through RETURNING, so there is no re-select.
+    """
+    table = CurrencyRateSnapshot.__table__
+    values = _snapshot_values(snapshots)
+    rates_by_hash = {value["payload_hash"]: value["rates"] for value in values}
+    written: List[CurrencyRateSnapshot] = []
+
+    _store_payloads(session, values, chunk_size)
+    for i in range(0, len(values), chunk_size):
+        chunk = [{column: value[column] for column in STORED_COLUMNS} for value in values[i:i + chunk_size]]
+        stmt = pg_insert(table).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_crs",
+            set_={
+                "payload_hash": stmt.excluded.payload_hash,
+                "provenance": stmt.excluded.provenance,
+                "rates": null(),
+            }
+        ).returning(*table.c)
+        result = session.execute(stmt)
+        written.extend(
+            CurrencyRateSnapshot.model_validate({**row._mapping, "rates": rates_by_hash[row.payload_hash]})
+            for row in result
+        )
+
     session.commit()
-    
-    # 5. Return the newly inserted/updated object
-    return session.exec(
-        select(CurrencyRateSnapshot).where(
-            CurrencyRateSnapshot.frequency == frequency,
-            CurrencyRateSnapshot.effective_at == effective_at,
-            CurrencyRateSnapshot.base_currency == base_currency
+    return written
+
+
+@traced()
+def copy_upsert_snapshots(
+    session: Session,
+    snapshots: Iterable[Dict | CurrencyRateSnapshot]
+) -> int:
+    """
+    Bulk path for very large loads: streams the snapshots into a temporary staging
+    table with COPY and merges them with a single INSERT ... SELECT ... ON CONFLICT.
+    Returns the number of rows inserted or updated.
+    """
+    values = _snapshot_values(snapshots)
+    _store_payloads(session, values)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for value in values:
+        writer.writerow([
+            value["frequency"],
+            value["effective_at"].isoformat(),
+            value["base_currency"],
+            value["provenance"],
+            value["payload_hash"],
+        ])
+    buffer.seek(0)
+
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.execute("""
+            CREATE TEMP TABLE currency_rate_snapshots_staging (
+                frequency VARCHAR NOT NULL,
+                effective_at TIMESTAMPTZ NOT NULL,
+                base_currency VARCHAR NOT NULL,
+                provenance VARCHAR NOT NULL,
+                payload_hash VARCHAR(64) NOT NULL
+            ) ON COMMIT DROP
+        """)
+        cursor.copy_expert(
+            "COPY currency_rate_snapshots_staging (frequency, effective_at, base_currency, provenance, payload_hash) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
         )
-    ).one()
+        cursor.execute("""
+            INSERT INTO currency_rate_snapshots (frequency, effective_at, base_currency, provenance, payload_hash)
+            SELECT frequency, effective_at, base_currency, provenance, payload_hash FROM currency_rate_snapshots_staging
+            ON CONFLICT ON CONSTRAINT uq_crs DO UPDATE
+            SET provenance = EXCLUDED.provenance, payload_hash = EXCLUDED.payload_hash, rates = NULL
+        """)
+        row_count = cursor.rowcount
+    finally:
+        cursor.close()
+
+    session.commit()
+    return row_count
 
 
+@traced()
 def get_range(
     session: Session,
     *,
     frequency: str,
     start: datetime,
     end: datetime,
-    base_currency: str = "USD"
+    base_currency: str | None = "USD",
+    include_archive: bool = True
 ) -> List[CurrencyRateSnapshot]:
     """
-    Fetches a range of snapshots for a given frequency and time window.
+    Fetches a range of snapshots for a given frequency and time window, for one
+    base currency or (base_currency=None) for every base.
+    Hourly ranges of one base reaching past the retention window are completed
+    from the monthly archive files (unless include_archive is False).
     """
     stmt = (
-        select(CurrencyRateSnapshot)
+        _snapshot_select()
         .where(
             CurrencyRateSnapshot.frequency == frequency,
-            CurrencyRateSnapshot.base_currency == base_currency,
             CurrencyRateSnapshot.effective_at >= start,
             CurrencyRateSnapshot.effective_at <= end,
         )
-        .order_by(CurrencyRateSnapshot.effective_at)
+        .order_by(CurrencyRateSnapshot.effective_at, CurrencyRateSnapshot.base_currency)
     )
-    return list(session.exec(stmt).all())
+    if base_currency is not None:
+        stmt = stmt.where(CurrencyRateSnapshot.base_currency == base_currency)
+    rows = [_to_snapshot(row) for row in session.exec(stmt).all()]
+    if include_archive and base_currency is not None and frequency == "hourly" and hourly_archive.enabled:
+        rows = hourly_archive.merge_range(rows, start, end, base_currency)
+    return rows
 
+@traced()
 def get_latest(session: Session, *, frequency: str, base_currency: str = "USD") -> CurrencyRateSnapshot | None:
     """
     Fetches the single most recent snapshot for a given frequency.
     """
     stmt = (
-        select(CurrencyRateSnapshot)
+        _snapshot_select()
         .where(
             CurrencyRateSnapshot.frequency == frequency,
             CurrencyRateSnapshot.base_currency == base_currency,
@@ -87,28 +251,115 @@ def get_latest(session: Session, *, frequency: str, base_currency: str = "USD")
         .order_by(CurrencyRateSnapshot.effective_at.desc())
         .limit(1)
     )
-    return session.exec(stmt).first()
+    return _to_snapshot(session.exec(stmt).first())
 
+@traced()
 def get_daily_snapshot_for_date(
     session: Session, 
     target_date: datetime, 
     base_currency: str = "USD"
 ) -> CurrencyRateSnapshot | None:
     """
-    Fetches the daily snapshot for the exact target_date.
+    Fetches the most recent daily snapshot on or before target_date
+    (a `<= target_date ORDER BY effective_at DESC LIMIT 1` probe of
+    ix_crs_frequency_base_effective_at_desc).
     """
     stmt = (
-        select(CurrencyRateSnapshot)
+        _snapshot_select()
+        .where(
+            CurrencyRateSnapshot.frequency == "daily",
+            CurrencyRateSnapshot.base_currency == base_currency,
+            CurrencyRateSnapshot.effective_at <= target_date,
+        )
+        .order_by(CurrencyRateSnapshot.effective_at.desc())
+        .limit(1)
+    )
+    return _to_snapshot(session.exec(stmt).first())
+
+@traced()
+def get_daily_snapshots_for_dates(
+    session: Session,
+    target_dates: List[datetime],
+    base_currency: str = "USD"
+) -> Dict[date, CurrencyRateSnapshot]:
+    """
+    Fetches the daily snapshots of several exact dates in one query, keyed by calendar date.
+    The dates are sent as a single array parameter (`effective_at = ANY(:dates)`),
+    so the statement is the same however many dates are requested.
+    """
+    if not target_dates:
+        return {}
+    effective_at_type = CurrencyRateSnapshot.__table__.c.effective_at.type
+    dates_param = bindparam("target_dates", list(target_dates), type_=ARRAY(effective_at_type))
+    stmt = (
+        _snapshot_select()
+        .where(
+            CurrencyRateSnapshot.frequency == "daily",
+            CurrencyRateSnapshot.base_currency == base_currency,
+            CurrencyRateSnapshot.effective_at == any_(dates_param),
+        )
+    )
+    snapshots = [_to_snapshot(row) for row in session.exec(stmt).all()]
+    return {snapshot.effective_at.date(): snapshot for snapshot in snapshots}
+
+@traced()
+def get_daily_snapshots_on_or_before(
+    session: Session,
+    target_dates: List[datetime],
+    base_currency: str = "USD"
+) -> Dict[datetime, CurrencyRateSnapshot]:
+    """
+    Fetches the most recent daily snapshot on or before each of several dates in one
+    query, keyed by target date (dates without one are left out): the dates are
+    unnested from a single array parameter and each gets the same index probe as
+    get_daily_snapshot_for_date through a LATERAL join.
+    """
+    if not target_dates:
+        return {}
+    effective_at_type = CurrencyRateSnapshot.__table__.c.effective_at.type
+    dates_param = bindparam("target_dates", list(target_dates), type_=ARRAY(effective_at_type))
+    targets = func.unnest(dates_param).table_valued("target_date").render_derived(name="targets")
+    latest = (
+        _snapshot_select()
         .where(
             CurrencyRateSnapshot.frequency == "daily",
             CurrencyRateSnapshot.base_currency == base_currency,
-            CurrencyRateSnapshot.effective_at == target_date,
+            CurrencyRateSnapshot.effective_at <= targets.c.target_date,
         )
         .order_by(CurrencyRateSnapshot.effective_at.desc())
         .limit(1)
+        .lateral("latest")
     )
-    return session.exec(stmt).first()
+    stmt = select(targets.c.target_date, *latest.c).select_from(targets).join(latest, true())
+    snapshots = {}
+    for row in session.exec(stmt).all():
+        values = dict(row._mapping)
+        target_date = values.pop("target_date")
+        snapshots[target_date] = CurrencyRateSnapshot.model_validate(values)
+    return snapshots
 
+@traced()
+def get_snapshot_dates(
+    session: Session,
+    *,
+    frequency: str,
+    base_currency: str = "USD"
+) -> List[datetime]:
+    """
+    Fetches the bucket times of all snapshots of a frequency, oldest first
+    (an index-only scan; no rate payloads are read).
+    """
+    stmt = (
+        select(CurrencyRateSnapshot.effective_at)
+        .where(
+            CurrencyRateSnapshot.frequency == frequency,
+            CurrencyRateSnapshot.base_currency == base_currency,
+        )
+        .order_by(CurrencyRateSnapshot.effective_at)
+    )
+    return list(session.exec(stmt).all())
+
+@traced()
 def get_latest_hourly_for_date(
     session: Session, 
     target_date: datetime, 
@@ -118,7 +369,7 @@ def get_latest_hourly_for_date(
     end_of_day = target_date.replace(hour=23, minute=59, second=59, microsecond=999999)
     
     stmt = (
-        select(CurrencyRateSnapshot)
+        _snapshot_select()
         .where(
             CurrencyRateSnapshot.frequency == "hourly",
             CurrencyRateSnapshot.base_currency == base_currency,
@@ -128,4 +379,86 @@ def get_latest_hourly_for_date(
         .order_by(CurrencyRateSnapshot.effective_at.desc())
         .limit(1)
     )
-    return session.exec(stmt).first()
\ No newline at end of file
+    return _to_snapshot(session.exec(stmt).first())
+
+@traced()
+def get_missing_buckets(
+    session: Session,
+    *,
+    frequency: str,
+    start: datetime,
+    end: datetime,
+    base_currency: str = "USD"
+) -> List[datetime]:
+    """
+    Returns every hourly/daily bucket between start and end (inclusive) that has
+    no snapshot. The expected buckets are generated in Postgres with generate_series
+    and anti-joined against the unique (frequency, effective_at, base_currency) index,
+    so only the missing timestamps leave the database.
+    The series runs over UTC wall-clock timestamps: on timestamptz, a "1 day" step
+    follows the session time zone and would shift off midnight UTC across DST changes.
+    """
+    step = "1 hour" if frequency == "hourly" else "1 day"
+    stmt = text("""
+        SELECT series.utc_bucket AT TIME ZONE 'UTC' AS bucket
+        FROM generate_series(
+            CAST(:start AS timestamptz) AT TIME ZONE 'UTC',
+            CAST(:end AS timestamptz) AT TIME ZONE 'UTC',
+            CAST(:step AS interval)
+        ) AS series(utc_bucket)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM currency_rate_snapshots s
+            WHERE s.frequency = :frequency
+              AND s.base_currency = :base_currency
+              AND s.effective_at = series.utc_bucket AT TIME ZONE 'UTC'
+        )
+        ORDER BY series.utc_bucket
+    """)
+    result = session.execute(stmt, {
+        "start": start,
+        "end": end,
+        "step": step,
+        "frequency": frequency,
+        "base_currency": base_currency,
+    })
+    return [row[0] for row in result]
+
+
+@traced()
+def get_latest_before(
+    session: Session,
+    *,
+    frequency: str,
+    before: datetime,
+    base_currency: str = "USD"
+) -> CurrencyRateSnapshot | None:
+    """
+    Fetches the most recent snapshot strictly before the given timestamp.
+    """
+    stmt = (
+        _snapshot_select()
+        .where(
+            CurrencyRateSnapshot.frequency == frequency,
+            CurrencyRateSnapshot.base_currency == base_currency,
+            CurrencyRateSnapshot.effective_at < before,
+        )
+        .order_by(CurrencyRateSnapshot.effective_at.desc())
+        .limit(1)
+    )
+    return _to_snapshot(session.exec(stmt).first())
+
+
+@traced()
+def delete_orphan_payloads(session: Session) -> int:
+    """
+    Deletes payloads no snapshot references any more (their rows expired).
+    Waits for the snapshot writers in flight (see _store_payloads).
+    Returns the number of payloads deleted.
+    """
+    session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": PAYLOAD_LOCK_NAME})
+    result = session.execute(text("""
+        DELETE FROM currency_rate_payloads p
+        WHERE NOT EXISTS (SELECT 1 FROM currency_rate_snapshots s WHERE s.payload_hash = p.hash)
+    """))
+    session.commit()
+    return result.rowcount
@@ -1,16 +1,17 @@
 # src/rate_history/router.py
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Security
 from sqlmodel import Session
 
 import logging
 
-from .schemas import HistoricalSnapshotResponse, HistoricalRatesResponse, AdminStatusResponse
+from .schemas import HistoricalSnapshotResponse, HistoricalRatesResponse, MultiDateRatesResponse, AdminStatusResponse
 from src.core.schemas import ErrorDetail
+from src.core.compression import PrecompressedResponse
 from src.core.database import get_session
-from src.core.security import verify_api_key
-from .service import HistoricalDataService
-from .jobs import run_hourly_job, run_daily_job 
+from src.core.security import api_key_header
+from .service import HistoricalDataService, history_body_key
+from .jobs import run_hourly_job, run_daily_job, run_gap_repair_job
 
 from src.core.redis_client import get_redis_client
 import redis 
@@ -18,7 +19,7 @@ import redis
 router = APIRouter(
     prefix="/history",
     tags=["History"],
-    dependencies=[Depends(verify_api_key)] 
+    dependencies=[Security(api_key_header)] 
 )
 
 logger = logging.getLogger(__name__)
@@ -32,6 +33,7 @@ def get_historical_service(session: Session = Depends(get_session)) -> Historica
         "", 
         response_model=HistoricalSnapshotResponse,
         responses={
+            400: {"model": ErrorDetail, "description": "Unsupported range, or unsupported or inactive base currency"},
             401: {"model": ErrorDetail, "description": "Invalid or missing API Key"},
         }  
 )
@@ -44,7 +46,9 @@ def get_historical_snapshots(
     Provides a list of raw historical snapshots (all rates vs. base) for a given range.
     The client is responsible for calculating the cross-rates.
     """
-    return service.get_historical_data(range_str=range_, base_currency=base)
+    base = base.upper()
+    body = service.get_historical_body(range_str=range_, base_currency=base)
+    return PrecompressedResponse(body, cache_key=history_body_key(range_, base))
 
 
 @router.get(
@@ -67,6 +71,29 @@ def get_rate_on_date(
     return service.get_rate_for_date( date_str=date )
 
 
+@router.get(
+        "/rates-on-dates",
+        response_model=MultiDateRatesResponse,
+        responses={
+            400: {"model": ErrorDetail, "description": "Invalid date format or too many dates."},
+            401: {"model": ErrorDetail, "description": "Invalid or missing API Key"},
+            422: {"model": ErrorDetail, "description": "Validation Error (e.g., 'dates' query parameter is missing)"}
+        }
+)
+def get_rates_on_dates(
+    dates: str = Query(..., description="Comma-separated dates in YYYY-MM-DD format, e.g. 2025-01-31,2025-03-15"),
+    symbols: str | None = Query(None, description="Optional comma-separated currencies to return, e.g. EUR,TRY"),
+    service: HistoricalDataService = Depends(get_historical_service),
+):
+    """
+    Returns the USD-based rates for several historical dates in one response.
+    Dates without data are returned with `rates: null`.
+    """
+    date_strs = [date_str.strip() for date_str in dates.split(",") if date_str.strip()]
+    symbol_list = [symbol.strip().upper() for symbol in symbols.split(",") if symbol.strip()] if symbols else None
+    return service.get_rates_for_dates(date_strs, symbol_list)
+
+
 @router.post(
         "/admin/clear-cache", 
         summary="Clear a specific cache key in Redis",
@@ -77,8 +104,7 @@ def get_rate_on_date(
 )
 def clear_specific_cache(
     cache_key: str = Query(..., description="The exact cache key to delete"),
-    redis_client: redis.Redis = Depends(get_redis_client),
-    _ = Depends(verify_api_key) 
+    redis_client: redis.Redis = Depends(get_redis_client)
 ):
     """
     Deletes a specific key from the Redis cache. 
@@ -123,4 +149,21 @@ async def trigger_hourly():
 async def trigger_daily():
     """Manually triggers the job to consolidate the daily rate from hourly data."""
     await run_daily_job()
-    return {"status": "Daily job triggered successfully."}
\ No newline at end of file
+    return {"status": "Daily job triggered successfully."}
+
+
+@router.post(
+        "/jobs/trigger-gap-repair",
+        summary="Manually Trigger Gap Repair Job",
+        response_model=AdminStatusResponse,
+        responses={
+            401: {"model": ErrorDetail, "description": "Invalid or missing API Key"},
+        }
+)
+async def trigger_gap_repair():
+    """Finds missing hourly/daily snapshots, fills them and reports coverage."""
+    reports = await run_gap_repair_job()
+    return {
+        "status": "Gap repair job finished.",
+        "message": "; ".join(report.summary() for report in reports),
+    }
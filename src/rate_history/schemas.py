@@ -15,6 +15,15 @@ HistoricalSnapshotResponse = List[HistoricalSnapshot]
 
 class HistoricalRatesResponse(BaseModel):
     rates: Dict[str, float]
+    effective_at: datetime | None = Field(None, description="Bucket time of the snapshot the rates come from")
+
+class DatedRates(BaseModel):
+    date: str = Field(..., description="The requested date (YYYY-MM-DD)")
+    rates: Dict[str, float] | None = Field(..., description="USD-based rates on (or before) that date, or null if there is no data")
+    effective_at: datetime | None = Field(None, description="Bucket time of the snapshot the rates come from")
+
+class MultiDateRatesResponse(BaseModel):
+    results: List[DatedRates] = Field(..., description="One entry per requested date, in request order")
 
 class AdminStatusResponse(BaseModel):
     """
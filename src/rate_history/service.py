@@ -4,18 +4,61 @@ import json
 import logging
 from datetime import datetime, timedelta, timezone
 from datetime import date as date_obj
-from typing import List
+from typing import Dict, Iterable, List
+import numpy as np
 from fastapi import HTTPException
+from pydantic import TypeAdapter
+from redis import RedisError
 
 from sqlmodel import Session
 from . import repo
+from .aggregation import DAY_SECONDS, HOUR_SECONDS, MONTH, last_in_bucket, last_per_bucket
+from .date_index import daily_date_index
+from .rate_cube import rate_cube
+from src.core.compression import precompressed_bodies
+from src.core.metrics import record_cache
+from src.core.local_cache import local_cache
 from src.core.redis_client import get_redis_client
+from src.currency import repo as currency_repo
+from src.currency.rate_state import get_rate_state
 from .models import CurrencyRateSnapshot
-from .schemas import HistoricalRatesResponse
+from .schemas import DatedRates, HistoricalRatesResponse, HistoricalSnapshotResponse, MultiDateRatesResponse
 
 
 logger = logging.getLogger(__name__)
 
+HOURLY_RANGES = ("1d", "1w")
+DAILY_RANGES = ("1m", "6m", "1y", "5y")
+# range -> (snapshot frequency, days of data, bucket width keeping the last point per bucket, or None for every point)
+HISTORY_RANGES = {
+    "1d": ("hourly", 1, None),
+    "1w": ("hourly", 7, 8 * HOUR_SECONDS),
+    "1m": ("daily", 30, None),
+    "6m": ("daily", 182, 3 * DAY_SECONDS),
+    "1y": ("daily", 365, 7 * DAY_SECONDS),
+    "5y": ("daily", 365 * 5, MONTH),
+}
+HISTORY_BODY_KEY_PREFIX = "history_body"
+# Cached bodies live until shortly after the next hourly/daily bucket is written
+HISTORY_CACHE_GRACE_SECONDS = 10 * 60
+# Upper bound of dates per multi-date rate lookup
+MAX_DATES_PER_LOOKUP = 100
+
+_history_adapter = TypeAdapter(HistoricalSnapshotResponse)
+
+
+def history_body_key(range_str: str, base_currency: str) -> str:
+    return f"{HISTORY_BODY_KEY_PREFIX}:{base_currency}:{range_str}"
+
+
+def _history_ttl_seconds(range_str: str) -> int:
+    now = datetime.now(timezone.utc)
+    if range_str in HOURLY_RANGES:
+        next_bucket = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    else:
+        next_bucket = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return int((next_bucket - now).total_seconds()) + HISTORY_CACHE_GRACE_SECONDS
+
 class HistoricalDataService:
     def __init__(self, session: Session):
         self.session = session
@@ -28,6 +71,7 @@ class HistoricalDataService:
         
         if self.redis:
             cached_data = self.redis.get(cache_key)
+            record_cache("raw_snapshots", bool(cached_data))
             if cached_data:
                 logger.info(f"RAW CACHE HIT for key: {cache_key}")
                 snapshot_dicts = json.loads(cached_data)
@@ -50,76 +94,98 @@ class HistoricalDataService:
 
         return db_rows
     
-    def _aggregate_monthly(self, daily_data: List[CurrencyRateSnapshot]) -> List[CurrencyRateSnapshot]:
-        """Aggregates daily data to monthly by taking the last day of each month."""
-        monthly_points = {}
-        for snapshot in daily_data:
-            month_identifier = snapshot.effective_at.strftime('%Y-%m')
-            monthly_points[month_identifier] = snapshot
-        
-        return sorted(list(monthly_points.values()), key=lambda x: x.effective_at)
-
-    def _aggregate_8hourly(self, hourly_data: List[CurrencyRateSnapshot]) -> List[CurrencyRateSnapshot]:
-        """Aggregates hourly data by taking the last record of each 8-hour period."""
-        eight_hourly_points = {}
-        for snapshot in hourly_data:
-            day = snapshot.effective_at.strftime('%Y-%m-%d')
-            time_slot = snapshot.effective_at.hour // 8 
-            slot_identifier = f"{day}-{time_slot}"
-            eight_hourly_points[slot_identifier] = snapshot
-            
-        return sorted(list(eight_hourly_points.values()), key=lambda x: x.effective_at)
-    
-    def _aggregate_every_n_days(self, daily_data: List[CurrencyRateSnapshot], n: int) -> List[CurrencyRateSnapshot]:
-        """Aggregates daily data by taking the last day of each N-day period."""
-        if n <= 1:
-            return daily_data
-            
-        aggregated_points = {}
-        epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
-        for snapshot in daily_data:
-            days_since_epoch = (snapshot.effective_at - epoch).days
-            period_identifier = days_since_epoch // n
-            aggregated_points[period_identifier] = snapshot
-        
-        return sorted(list(aggregated_points.values()), key=lambda x: x.effective_at)
-
-
     def get_historical_data(self, range_str: str, base_currency: str = "USD") -> List[CurrencyRateSnapshot]:
+        frequency, days, bucket_width = HISTORY_RANGES.get(range_str, HISTORY_RANGES["1m"])
         end_date = datetime.now(timezone.utc)
-        
-        if range_str == "1d":
-            days = 1
-            frequency = "hourly"
-            start_date = end_date - timedelta(days=1)
-            raw_snapshots = repo.get_range(self.session, frequency=frequency, start=start_date, end=end_date, base_currency=base_currency)
+        start_date = end_date - timedelta(days=days)
+
+        if frequency == "daily" and base_currency == "USD":
+            cube_snapshots = self._get_daily_history_from_cube(start_date, end_date, bucket_width)
+            if cube_snapshots is not None:
+                return cube_snapshots
+
+        raw_snapshots = repo.get_range(self.session, frequency=frequency, start=start_date, end=end_date, base_currency=base_currency)
+
+        if bucket_width is None:
             return raw_snapshots
+        return last_per_bucket(raw_snapshots, bucket_width)
+
+    def _get_daily_history_from_cube(self, start: datetime, end: datetime, bucket_width) -> List[CurrencyRateSnapshot] | None:
+        """
+        Daily history sliced from the memory-mapped rate cube, or None when there is no
+        cube (or it went away since the check) or it lags behind the newest daily snapshot
+        (the caller then reads Postgres).
+        """
+        cube_last_date = rate_cube.last_date()
+        if cube_last_date is None:
+            return None
+        latest_date = daily_date_index.latest(self.session)
+        if latest_date is None or cube_last_date < latest_date:
+            return None
+
+        # Daily buckets are at midnight, so the first one in range is the first midnight >= start
+        first_day = (start - timedelta(microseconds=1)).date() + timedelta(days=1)
+        window = rate_cube.window(first_day, end.date())
+        if window is None:
+            return None
+        rows = np.flatnonzero(window.has_rates())
+        if bucket_width is not None:
+            rows = rows[last_in_bucket(window.timestamps()[rows], bucket_width)]
+        return window.snapshots(rows)
+
+    def _build_history_body(self, range_str: str, base_currency: str) -> bytes:
+        snapshots = self.get_historical_data(range_str=range_str, base_currency=base_currency)
+        body = _history_adapter.dump_json(_history_adapter.validate_python(snapshots, from_attributes=True))
+
+        key, ttl_seconds = history_body_key(range_str, base_currency), _history_ttl_seconds(range_str)
+        precompressed_bodies.add(key, body)
+        try:
+            if self.redis:
+                self.redis.set(key, body, ex=ttl_seconds)
+                return body
+        except RedisError as e:
+            logger.error(f"Could not cache {key} in Redis: {e}")
+        local_cache.set(key, body.decode(), ex=ttl_seconds)
+        return body
+
+    def validate_history_request(self, range_str: str, base_currency: str) -> None:
+        """Rejects unknown ranges and inactive base currencies, so they never get a cache key."""
+        if range_str not in HISTORY_RANGES:
+            raise HTTPException(status_code=400, detail=f"Unsupported range: {range_str}. Use one of {', '.join(HISTORY_RANGES)}.")
+        state = get_rate_state()
+        active_codes = state.codes if state else currency_repo.get_all_active_currency_codes(self.session)
+        if base_currency not in active_codes:
+            raise HTTPException(status_code=400, detail=f"Unsupported or inactive base currency: {base_currency}")
+
+    def get_historical_body(self, range_str: str, base_currency: str = "USD") -> bytes:
+        """
+        Returns the serialized `/history` response for a range, from the Redis body cache
+        (the process-local cache while Redis is unavailable) when it has been built
+        already for the current bucket. Raises a 400 for an unknown range or base.
+        """
+        self.validate_history_request(range_str, base_currency)
+        key = history_body_key(range_str, base_currency)
+        try:
+            cached_body = (self.redis or local_cache).get(key)
+        except RedisError as e:
+            logger.error(f"Could not read {key} from Redis: {e}")
+            cached_body = local_cache.get(key)
+        record_cache(HISTORY_BODY_KEY_PREFIX, bool(cached_body))
+        if cached_body:
+            logger.info(f"HISTORY CACHE HIT for range {range_str} ({base_currency})")
+            return cached_body.encode()
+
+        logger.info(f"HISTORY CACHE MISS for range {range_str} ({base_currency}). Building from DB.")
+        return self._build_history_body(range_str, base_currency)
+
+    def warm_history_caches(self, ranges: Iterable[str], base_currency: str = "USD") -> None:
+        """Rebuilds the cached `/history` bodies of the given ranges."""
+        if not self.redis:
+            return
+        for range_str in ranges:
+            self._build_history_body(range_str, base_currency)
+        logger.info(f"HISTORY CACHE WARM: Rebuilt bodies for ranges {', '.join(ranges)} ({base_currency}).")
 
-        elif range_str == "1w":
-            days = 7
-            frequency = "hourly"
-            start_date = end_date - timedelta(days=7)
-            raw_snapshots = repo.get_range(self.session, frequency=frequency, start=start_date, end=end_date, base_currency=base_currency)
-            return self._aggregate_8hourly(raw_snapshots)
-
-        else: # 1m, 6m, 1y, 5y
-            frequency = "daily"
-            days = {"1m": 30, "6m": 182, "1y": 365, "5y": 365*5}.get(range_str, 30)
-            start_date = end_date - timedelta(days=days)
-            raw_snapshots = repo.get_range(self.session, frequency=frequency, start=start_date, end=end_date, base_currency=base_currency)
-            
-            if range_str == "1m":
-                return raw_snapshots
-            elif range_str == "6m":
-                return self._aggregate_every_n_days(raw_snapshots, n=3)
-            elif range_str == "1y":
-                return self._aggregate_every_n_days(raw_snapshots, n=7)
-            elif range_str == "5y":
-                return self._aggregate_monthly(raw_snapshots)
-        
-        return raw_snapshots
-        
-    
     def get_rate_for_date(self, date_str: str) -> HistoricalRatesResponse:
         """
         Fetches and returns the raw USD-based rates for a specific date.
@@ -130,16 +196,87 @@ class HistoricalDataService:
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
 
         # Find the daily snapshot for the requested date (or the closest one before it)
-        snapshot = repo.get_daily_snapshot_for_date(self.session, target_date, "USD")
+        snapshot = self._get_daily_snapshot_as_of(target_date)
 
-        # If there is no daily data and the requested date is today, search for the latest hourly data
-        if not snapshot and target_date.date() == date_obj.today():
+        # If there is no daily data for the requested date and it is today, search for the latest hourly data
+        if not self._is_for_date(snapshot, target_date) and target_date.date() == date_obj.today():
             print(f"No daily snapshot for {date_str}, searching for latest hourly snapshot...")
-            snapshot = repo.get_latest_hourly_for_date(self.session, target_date, "USD")
+            snapshot = repo.get_latest_hourly_for_date(self.session, target_date, "USD") or snapshot
 
 
         if not snapshot:
             raise HTTPException(status_code=404, detail=f"No historical rate data found on or before {date_str}.")
                     
-        return HistoricalRatesResponse(rates=snapshot.rates)
-    
+        return HistoricalRatesResponse(rates=snapshot.rates, effective_at=snapshot.effective_at)
+
+    @staticmethod
+    def _is_for_date(snapshot: CurrencyRateSnapshot | None, target_date: datetime) -> bool:
+        return snapshot is not None and snapshot.effective_at.date() == target_date.date()
+
+    def _get_daily_snapshot_as_of(self, target_date: datetime) -> CurrencyRateSnapshot | None:
+        """
+        Returns the latest daily snapshot on or before target_date. The in-memory date
+        index resolves the exact bucket when it can; otherwise Postgres is asked.
+        """
+        effective_at = daily_date_index.resolve(self.session, target_date)
+        if effective_at is not None:
+            snapshot = repo.get_daily_snapshots_for_dates(self.session, [effective_at], "USD").get(effective_at.date())
+            if snapshot:
+                return snapshot
+            daily_date_index.invalidate()
+        return repo.get_daily_snapshot_for_date(self.session, target_date, "USD")
+
+    def get_rates_for_dates(self, date_strs: List[str], symbols: List[str] | None = None) -> MultiDateRatesResponse:
+        """
+        Fetches the raw USD-based rates on or before several dates. Dates the in-memory
+        date index can resolve are fetched with a single daily-snapshot query; the rest
+        are resolved together in one more query. Today falls back to its latest hourly data.
+        With `symbols`, only those currencies are returned.
+        """
+        date_strs = list(dict.fromkeys(date_strs))
+        if not date_strs:
+            raise HTTPException(status_code=400, detail="At least one date is required.")
+        if len(date_strs) > MAX_DATES_PER_LOOKUP:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_DATES_PER_LOOKUP} dates can be requested at once.")
+
+        target_dates: Dict[str, datetime] = {}
+        for date_str in date_strs:
+            try:
+                target_dates[date_str] = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid date format: {date_str}. Use YYYY-MM-DD.")
+
+        resolved = {
+            date_str: daily_date_index.resolve(self.session, target_date)
+            for date_str, target_date in target_dates.items()
+        }
+        indexed_snapshots = repo.get_daily_snapshots_for_dates(
+            self.session, list({effective_at for effective_at in resolved.values() if effective_at}), "USD"
+        )
+        snapshots = {
+            date_str: indexed_snapshots.get(effective_at.date()) if effective_at else None
+            for date_str, effective_at in resolved.items()
+        }
+        leftovers = [target_dates[date_str] for date_str, snapshot in snapshots.items() if snapshot is None]
+        if leftovers:
+            resolved_leftovers = repo.get_daily_snapshots_on_or_before(self.session, leftovers, "USD")
+            for date_str, snapshot in snapshots.items():
+                if snapshot is None:
+                    snapshots[date_str] = resolved_leftovers.get(target_dates[date_str])
+
+        today = datetime.now(timezone.utc).date()
+        results = []
+        for date_str, target_date in target_dates.items():
+            snapshot = snapshots[date_str]
+
+            # Today has no daily snapshot yet; use the latest hourly data of the day instead
+            if not self._is_for_date(snapshot, target_date) and target_date.date() == today:
+                snapshot = repo.get_latest_hourly_for_date(self.session, target_date, "USD") or snapshot
+
+            rates = None
+            if snapshot:
+                rates = snapshot.rates if not symbols else {
+                    symbol: snapshot.rates[symbol] for symbol in symbols if symbol in snapshot.rates
+                }
+            results.append(DatedRates(date=date_str, rates=rates, effective_at=snapshot.effective_at if snapshot else None))
+        return MultiDateRatesResponse(results=results)
@@ -1,12 +1,12 @@
 # src/savings/router.py
 
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Security
 from sqlmodel import Session, select
 from typing import List
 from uuid import UUID
 
 from src.core.database import get_session
-from src.core.security import verify_api_key
+from src.core.security import api_key_header
 from src.core.schemas import ErrorDetail
 from .schemas import SavingsEntryCreate, SavingsEntryRead, SavingsEntryUpdate
 from .service import SavingsService 
@@ -14,7 +14,7 @@ from .service import SavingsService
 router = APIRouter(
     prefix="/savings", 
     tags=["Savings"],
-    dependencies=[Depends(verify_api_key)]
+    dependencies=[Security(api_key_header)]
 )
 
 def get_savings_service(session: Session = Depends(get_session)) -> SavingsService:
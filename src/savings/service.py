@@ -10,6 +10,8 @@ import json
 from . import repo
 
 from src.core.config import settings
+from src.core.metrics import time_upstream
+from src.core.tracing import http_transport
 from .models import SavingsEntry
 from .schemas import SavingsEntryCreate, SavingsEntryRead, SavingsEntryUpdate
 
@@ -26,9 +28,10 @@ class SavingsService:
         url = f"{settings.REVENUECAT_API_URL}/subscribers/{user_id}"
         headers = {"Authorization": f"Bearer {REVENUECAT_API_KEY}"}
         
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(transport=http_transport()) as client:
             try:
-                response = await client.get(url, headers=headers)
+                with time_upstream("revenuecat"):
+                    response = await client.get(url, headers=headers)
                 if response.status_code == 404:
                     return False
                 response.raise_for_status()
@@ -65,9 +68,10 @@ class SavingsService:
         url = f"{settings.REVENUECAT_API_URL}/subscribers/{current_user_id}"
         headers = {"Authorization": f"Bearer {REVENUECAT_API_KEY}"}
         
-        async with httpx.AsyncClient() as client:
+        async with httpx.AsyncClient(transport=http_transport()) as client:
             try:
-                response = await client.get(url, headers=headers)
+                with time_upstream("revenuecat"):
+                    response = await client.get(url, headers=headers)
                 response.raise_for_status()
                 data = response.json().get("subscriber", {})
                 
@@ -0,0 +1,130 @@
+# tests/core/test_compression.py
+
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.core import compression
+from src.core.compression import (
+    CompressionMiddleware,
+    PrecompressedBodies,
+    PrecompressedResponse,
+    StreamCompressor,
+    negotiate_encoding,
+)
+
+brotli = pytest.importorskip("brotli")
+
+BODY = json.dumps({"from": "USD", "rates": [{"to": f"C{i:03d}", "rate": i / 7} for i in range(100)]})
+
+
+@pytest.fixture
+def store():
+    return PrecompressedBodies()
+
+
+@pytest.fixture
+def client(store):
+    app = FastAPI()
+    bodies = {"body": BODY}
+
+    @app.get("/rates")
+    def read_rates():
+        return PrecompressedResponse(bodies["body"], cache_key="rates_body:USD", min_size=500, store=store)
+
+    app.add_middleware(CompressionMiddleware, min_size=500)
+    return TestClient(app), bodies
+
+# --- Tests ---
+
+def test_precompressed_variants_are_built_once_per_body_version(client, store, mocker):
+    """
+    Tests that each coding is compressed once per body version and served from the
+    stored bytes afterwards, and that a changed body gets new variants.
+    """
+    # Arrange
+    test_client, bodies = client
+    compress_spy = mocker.spy(compression, "compress")
+
+    # Act
+    for _ in range(3):
+        gzipped = test_client.get("/rates", headers={"Accept-Encoding": "gzip"})
+        brotlied = test_client.get("/rates", headers={"Accept-Encoding": "br, gzip"})
+
+    # Assert
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert brotlied.headers["Content-Encoding"] == "br"
+    assert gzipped.text == brotlied.text == BODY
+    assert [call.args[1] for call in compress_spy.call_args_list] == ["gzip", "br"]
+
+    # Act: a new rates bucket
+    bodies["body"] = BODY.replace("USD", "EUR")
+    changed = test_client.get("/rates", headers={"Accept-Encoding": "gzip"})
+
+    # Assert
+    assert changed.json()["from"] == "EUR"
+    assert compress_spy.call_count == 3
+
+
+def test_warmed_bodies_are_served_without_compressing_on_request(client, store, mocker):
+    """
+    Tests that `add` builds every coding up front, so requests only send stored bytes,
+    and that bodies below the size threshold are not stored.
+    """
+    # Arrange
+    test_client, _ = client
+    store.add("rates_body:USD", BODY, min_size=500)
+    store.add("rates_body:TRY", "{}", min_size=500)
+    compress_spy = mocker.spy(compression, "compress")
+
+    # Act
+    gzipped = test_client.get("/rates", headers={"Accept-Encoding": "gzip"})
+    brotlied = test_client.get("/rates", headers={"Accept-Encoding": "br"})
+
+    # Assert
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert brotlied.headers["Content-Encoding"] == "br"
+    compress_spy.assert_not_called()
+    assert store.cached("rates_body:TRY", b"{}", "gzip") is None
+
+def test_precompressed_response_sends_identity_to_clients_without_compression(client):
+    """
+    Tests that clients that accept no supported coding get the plain body, and that
+    the middleware does not compress it again.
+    """
+    test_client, _ = client
+
+    response = test_client.get("/rates", headers={"Accept-Encoding": "identity"})
+
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.text == BODY
+
+
+def test_negotiation_prefers_brotli_only_when_installed(mocker):
+    """
+    Tests that brotli is chosen when accepted and installed, with gzip as the fallback.
+    """
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("gzip, br;q=0") == "gzip"
+
+    mocker.patch.object(compression, "BROTLI_AVAILABLE", False)
+    assert negotiate_encoding("gzip, deflate, br") == "gzip"
+    assert negotiate_encoding("br") is None
+
+
+@pytest.mark.parametrize("encoding, decompress", [("gzip", gzip.decompress), ("br", brotli.decompress)])
+def test_stream_compressor_flushes_every_chunk(encoding, decompress):
+    """
+    Tests that every streamed chunk is flushed to the client as it comes and that the
+    chunks decode to the original body.
+    """
+    compressor = StreamCompressor(encoding)
+
+    chunks = [compressor.compress(b"event: a\n\n", final=False), compressor.compress(b"event: b\n\n", final=True)]
+
+    assert all(chunks)
+    assert decompress(b"".join(chunks)) == b"event: a\n\nevent: b\n\n"
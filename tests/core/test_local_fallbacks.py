@@ -0,0 +1,85 @@
+# tests/core/test_local_fallbacks.py
+
+import pytest
+from fastapi import HTTPException
+
+from src.core import rate_limiter
+from src.core.local_cache import LocalCache
+from src.core.rate_limiter import LocalTokenBuckets, manual_rate_limiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+# --- Tests ---
+
+def test_local_cache_expires_keys_like_redis():
+    """
+    Tests GET/SET EX/TTL semantics: values expire after `ex` seconds and TTL
+    reports -2 once the key is gone.
+    """
+    clock = FakeClock()
+    cache = LocalCache(clock=clock)
+
+    cache.set("latest_usd_rates", '{"USD": 1.0}', ex=60)
+    assert cache.get("latest_usd_rates") == '{"USD": 1.0}'
+    assert cache.ttl("latest_usd_rates") == 60
+
+    clock.now = 61
+    assert cache.get("latest_usd_rates") is None
+    assert cache.ttl("latest_usd_rates") == -2
+
+
+def test_local_cache_evicts_least_recently_used():
+    """
+    Tests that the cache stays within max_entries by dropping the least recently used key.
+    """
+    cache = LocalCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+
+
+def test_token_buckets_limit_bursts_and_refill():
+    """
+    Tests that a client gets `capacity` requests in a burst, is refused after that,
+    and gets tokens back at the refill rate.
+    """
+    clock = FakeClock()
+    buckets = LocalTokenBuckets(capacity=3, refill_per_second=0.5, clock=clock)
+
+    assert [buckets.allow("device-1") for _ in range(4)] == [True, True, True, False]
+    assert buckets.allow("device-2") is True
+
+    clock.now = 2.0
+    assert buckets.allow("device-1") is True
+    assert buckets.allow("device-1") is False
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_uses_local_buckets_without_redis(mocker):
+    """
+    Tests that the limiter keeps enforcing limits with process-local buckets while
+    Redis is unavailable instead of letting every request through.
+    """
+    # Arrange
+    mocker.patch("src.core.rate_limiter.get_redis_client", return_value=None)
+    mocker.patch.object(rate_limiter, "local_limiter", LocalTokenBuckets(capacity=2, refill_per_second=0))
+    request = mocker.Mock(headers={"x-device-id": "device-1"})
+
+    # Act
+    await manual_rate_limiter(request)
+    await manual_rate_limiter(request)
+
+    # Assert
+    with pytest.raises(HTTPException) as exc_info:
+        await manual_rate_limiter(request)
+    assert exc_info.value.status_code == 429
@@ -0,0 +1,83 @@
+# tests/core/test_metrics.py
+
+from sqlalchemy import create_engine, text
+
+from src.core.metrics import (
+    Counter,
+    Histogram,
+    MetricsRegistry,
+    install_query_timer,
+    start_request_db_timer,
+    time_upstream,
+    upstream_request_duration,
+)
+
+# --- Tests ---
+
+def test_histogram_renders_cumulative_buckets():
+    """
+    Tests that observations land in the right buckets and are rendered cumulatively
+    in the Prometheus text format, with sum and count per label set.
+    """
+    # Arrange
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0)))
+    counter = registry.register(Counter("requests_total", "Requests.", ("route", "status")))
+
+    # Act
+    histogram.observe(0.05, "/rates")
+    histogram.observe(0.5, "/rates")
+    histogram.observe(3.0, "/rates")
+    counter.inc("/rates", "200")
+    counter.inc("/rates", "200")
+    output = registry.render()
+
+    # Assert
+    assert 'latency_seconds_bucket{route="/rates",le="0.1"} 1' in output
+    assert 'latency_seconds_bucket{route="/rates",le="1"} 2' in output
+    assert 'latency_seconds_bucket{route="/rates",le="+Inf"} 3' in output
+    assert 'latency_seconds_sum{route="/rates"} 3.55' in output
+    assert 'latency_seconds_count{route="/rates"} 3' in output
+    assert 'requests_total{route="/rates",status="200"} 2' in output
+    assert "# TYPE latency_seconds histogram" in output
+
+
+def test_time_upstream_labels_failures_as_errors():
+    """
+    Tests that upstream calls are timed with a success or error outcome.
+    """
+    # Arrange
+    errors_before = upstream_request_duration.count("test_api", "error")
+
+    # Act
+    with time_upstream("test_api"):
+        pass
+    try:
+        with time_upstream("test_api"):
+            raise TimeoutError()
+    except TimeoutError:
+        pass
+
+    # Assert
+    assert upstream_request_duration.count("test_api", "success") >= 1
+    assert upstream_request_duration.count("test_api", "error") == errors_before + 1
+
+
+def test_query_timer_accumulates_db_time_per_request():
+    """
+    Tests that statements run on an instrumented engine add to the DB timer
+    of the current request.
+    """
+    # Arrange
+    engine = create_engine("sqlite://")
+    install_query_timer(engine)
+    timer = start_request_db_timer()
+
+    # Act
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+
+    # Assert
+    assert timer.queries == 2
+    assert timer.seconds > 0
@@ -0,0 +1,149 @@
+# tests/core/test_middleware.py
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.core import metrics
+from src.core.compression import CompressionMiddleware, accepts_encoding
+from src.core.middleware import AccessLog, AccessLogEntry, RequestIdMiddleware, RequestMetricsMiddleware, get_request_id
+from src.core.security import ApiKeyMiddleware
+
+API_KEY = "test-key"
+LARGE_ITEMS = [{"code": f"C{i:03d}", "name": "Currency"} for i in range(200)]
+
+
+def build_app(access_log: AccessLog) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/v1/items/{item_id}")
+    def read_item(item_id: int):
+        return {"item_id": item_id, "request_id": get_request_id()}
+
+    @app.get("/v1/large")
+    def read_large():
+        return LARGE_ITEMS
+
+    @app.get("/v1/stream")
+    def read_stream():
+        return StreamingResponse(iter(["event: a\n\n", "event: b\n\n"]), media_type="text/event-stream")
+
+    @app.get("/public")
+    def read_public():
+        return {"ok": True}
+
+    app.add_middleware(ApiKeyMiddleware, api_key=API_KEY, protected_prefixes=("/v1",))
+    app.add_middleware(CompressionMiddleware, min_size=500)
+    app.add_middleware(RequestMetricsMiddleware, access_log=access_log)
+    app.add_middleware(RequestIdMiddleware)
+    return app
+
+
+@pytest.fixture
+def access_log(mocker):
+    access_log = AccessLog(sample_rate=0.0, slow_seconds=60.0)
+    mocker.patch.object(access_log, "submit")
+    return access_log
+
+
+@pytest.fixture
+def client(access_log):
+    return TestClient(build_app(access_log))
+
+# --- Tests ---
+
+def test_api_key_is_checked_before_routing(client):
+    """
+    Tests that protected paths answer 401 without a valid key while public paths stay open.
+    """
+    assert client.get("/v1/items/1").status_code == 401
+    assert client.get("/v1/items/1", headers={"X-API-KEY": "wrong"}).json() == {"detail": "Invalid or missing API Key"}
+    assert client.get("/v1/items/1", headers={"X-API-KEY": API_KEY}).status_code == 200
+    assert client.get("/public").status_code == 200
+
+
+def test_request_id_is_kept_or_generated_and_echoed(client):
+    """
+    Tests that a plausible caller request ID is used for the request and echoed,
+    and that a missing or malformed one is replaced by a generated ID.
+    """
+    # Act
+    given = client.get("/v1/items/1", headers={"X-API-KEY": API_KEY, "X-Request-ID": "abc-123"})
+    forged = client.get("/v1/items/1", headers={"X-API-KEY": API_KEY, "X-Request-ID": "bad id\nINFO fake"})
+
+    # Assert
+    assert given.headers["X-Request-ID"] == "abc-123"
+    assert given.json()["request_id"] == "abc-123"
+    assert forged.headers["X-Request-ID"] != "bad id\nINFO fake"
+    assert len(forged.headers["X-Request-ID"]) == 32
+
+
+def test_metrics_use_route_templates_and_access_log_is_sampled(client, access_log):
+    """
+    Tests that requests are counted by route template and that sampled-out requests
+    skip the access log while server errors are always logged.
+    """
+    # Arrange
+    before = metrics.http_requests_total.value("GET", "/v1/items/{item_id}", "200")
+
+    # Act
+    response = client.get("/v1/items/7", headers={"X-API-KEY": API_KEY})
+
+    # Assert
+    assert metrics.http_requests_total.value("GET", "/v1/items/{item_id}", "200") == before + 1
+    assert response.headers["Server-Timing"].startswith("app;dur=")
+    access_log.submit.assert_not_called()
+    assert access_log.wants(500, 0.01) is True
+    assert access_log.wants(200, 61.0) is True
+
+
+def test_access_log_writes_lines_off_the_request_path(mocker):
+    """
+    Tests that submitted entries are written by the background writer and flushed on stop.
+    """
+    # Arrange
+    mock_logger = mocker.patch("src.core.middleware.access_logger")
+    access_log = AccessLog(sample_rate=1.0, slow_seconds=1.0)
+
+    # Act
+    access_log.submit(AccessLogEntry("GET", "/rates", 200, 0.012, 0.003, 1, "abc"))
+    access_log.stop()
+
+    # Assert
+    line = mock_logger.info.call_args.args[0]
+    assert line.startswith("GET /rates - Status: 200")
+    assert "Request ID: abc" in line
+
+
+def test_large_json_is_gzipped_and_small_or_streamed_bodies_are_not(client):
+    """
+    Tests that bodies over the threshold are gzipped for clients that accept it,
+    while small bodies and event streams go out uncompressed.
+    """
+    # Arrange
+    headers = {"X-API-KEY": API_KEY, "Accept-Encoding": "gzip"}
+
+    # Act
+    large = client.get("/v1/large", headers=headers)
+    small = client.get("/v1/items/1", headers=headers)
+    stream = client.get("/v1/stream", headers=headers)
+
+    # Assert
+    assert large.headers["Content-Encoding"] == "gzip"
+    assert large.headers["Vary"] == "Accept-Encoding"
+    assert large.json() == LARGE_ITEMS
+    assert int(large.headers["Content-Length"]) < len(large.content)  # the client decompressed it
+    assert "Content-Encoding" not in small.headers
+    assert "Content-Encoding" not in stream.headers
+    assert stream.text == "event: a\n\nevent: b\n\n"
+
+
+def test_accepts_encoding_honours_q_values():
+    """
+    Tests Accept-Encoding parsing: listed codings are accepted unless their q is 0.
+    """
+    assert accepts_encoding("gzip, deflate, br", "gzip") is True
+    assert accepts_encoding("br;q=1.0, gzip;q=0", "gzip") is False
+    assert accepts_encoding("*", "gzip") is True
+    assert accepts_encoding("identity", "gzip") is False
@@ -0,0 +1,108 @@
+# tests/core/test_profiling.py
+
+import os
+import threading
+import time
+
+import pytest
+
+from src.core import profiling
+from src.core.profiling import ProfileStore, ProfilingMiddleware, StackSampler
+
+
+def _busy_wait(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+
+async def _app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 204, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _scope(headers):
+    return {"type": "http", "method": "GET", "path": "/rates", "headers": headers}
+
+
+async def _noop_send(message):
+    pass
+
+# --- Tests ---
+
+@pytest.mark.asyncio
+async def test_middleware_profiles_only_requests_with_a_valid_key():
+    """
+    Tests that the profile header needs the admin key, that unselected requests
+    pass through untouched, and that the store keeps only the last N profiles.
+    """
+    # Arrange
+    store = ProfileStore(max_profiles=2)
+    middleware = ProfilingMiddleware(_app, admin_key="secret", sample_rate=0.0, interval=0.001, store=store)
+    selected = [(b"x-profile", b"1"), (b"x-profile-key", b"secret")]
+
+    # Act
+    await middleware(_scope([]), None, _noop_send)
+    await middleware(_scope([(b"x-profile", b"1"), (b"x-profile-key", b"wrong")]), None, _noop_send)
+    for _ in range(3):
+        await middleware(_scope(selected), None, _noop_send)
+
+    # Assert
+    profiles = store.list()
+    assert [profile.id for profile in profiles] == [3, 2]
+    assert profiles[0].status_code == 204
+    assert profiles[0].path == "/rates"
+
+
+def test_sampler_records_worker_threads_running_project_code(mocker):
+    """
+    Tests that worker threads are sampled while they run project code and that
+    the report attributes the time to the busy function.
+    """
+    # Arrange
+    mocker.patch.object(profiling, "PROJECT_ROOT", os.path.dirname(os.path.abspath(__file__)))
+    worker = threading.Thread(target=_busy_wait, args=(0.2,), name="worker")
+    sampler = StackSampler(loop_thread_id=-1, interval=0.002)
+
+    # Act
+    worker.start()
+    sampler.start()
+    worker.join()
+    sampler.stop()
+
+    # Assert
+    assert sampler.samples > 0
+    worker_stacks = [stack for stack in sampler.stacks if stack[0] == "[thread worker]"]
+    assert worker_stacks
+    assert all(any(frame.startswith("_busy_wait") for frame in stack) for stack in worker_stacks)
+
+
+@pytest.mark.asyncio
+async def test_middleware_lets_event_streams_go_and_caps_samples():
+    """
+    Tests that an event stream frees the profiling slot as soon as its response starts
+    (and is not stored), and that a sampler stops after its sample limit.
+    """
+    # Arrange
+    store = ProfileStore(max_profiles=5)
+    selected = [(b"x-profile", b"1"), (b"x-profile-key", b"secret")]
+    slot_free_during_stream = []
+
+    async def stream_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]})
+        slot_free_during_stream.append(not middleware._busy.locked())
+        await send({"type": "http.response.body", "body": b"event: a\n\n"})
+
+    middleware = ProfilingMiddleware(stream_app, admin_key="secret", sample_rate=0.0, interval=0.001, store=store)
+    sampler = StackSampler(loop_thread_id=-1, interval=0.001, max_samples=3)
+
+    # Act
+    await middleware(_scope(selected), None, _noop_send)
+    sampler.start()
+    sampler._thread.join(timeout=1)
+
+    # Assert
+    assert slot_free_during_stream == [True]
+    assert store.list() == []
+    assert not middleware._busy.locked()
+    assert sampler.samples == 3
@@ -0,0 +1,82 @@
+# tests/core/test_redis_client.py
+
+import redis
+
+from src.core import redis_client
+from src.core.redis_client import DEGRADED, HEALTHY, RedisManager
+
+
+def fresh_manager(mocker, client):
+    """A manager outside the process singleton, creating `client` and never starting real threads."""
+    manager = object.__new__(RedisManager)
+    manager._reset()
+    mocker.patch.object(manager, "_create_client", return_value=client)
+    mock_thread = mocker.patch("src.core.redis_client.threading.Thread")
+    return manager, mock_thread
+
+# --- Tests ---
+
+def test_unreachable_redis_degrades_once_and_fails_fast(mocker):
+    """
+    Tests that a failed first connection switches to degraded mode with a single
+    background reconnect, and that later calls return None without connecting again.
+    """
+    # Arrange
+    client = mocker.Mock()
+    client.info.side_effect = redis.ConnectionError("Connection refused")
+    manager, mock_thread = fresh_manager(mocker, client)
+
+    # Act
+    first = manager.get_client()
+    later = [manager.get_client() for _ in range(5)]
+
+    # Assert
+    assert first is None and later == [None] * 5
+    assert manager.state == DEGRADED
+    assert client.info.call_count == 1
+    mock_thread.assert_called_once()
+    assert manager.status()["mode"] == "local"
+
+
+def test_reconnect_loop_backs_off_and_recovers(mocker):
+    """
+    Tests that reconnect attempts wait exponentially longer (with jitter) until
+    Redis answers, after which the client is served again.
+    """
+    # Arrange
+    client = mocker.Mock()
+    client.info.side_effect = [redis.ConnectionError("down"), redis.ConnectionError("down"), redis.ConnectionError("down"), {}]
+    manager, _ = fresh_manager(mocker, client)
+    manager.get_client()
+    mocker.patch("src.core.redis_client.random.uniform", return_value=1.0)
+    mock_sleep = mocker.patch("src.core.redis_client.time.sleep")
+
+    # Act
+    manager._reconnect_loop()
+
+    # Assert
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [1.0, 2.0, 4.0]
+    assert manager.state == HEALTHY
+    assert manager.get_client() is client
+    assert manager.status()["mode"] == "redis"
+
+
+def test_command_connection_errors_are_reported(mocker):
+    """
+    Tests that a connection error raised by a command of a healthy client puts the
+    manager into degraded mode, while ordinary command errors do not.
+    """
+    # Arrange
+    mock_manager = mocker.patch.object(redis_client, "redis_manager")
+    client_class = redis_client._with_failure_reporting(redis.Redis, redis.client.Pipeline)
+    client = client_class()
+    mocker.patch.object(redis.Redis, "execute_command", side_effect=[redis.ConnectionError("reset"), redis.ResponseError("WRONGTYPE")])
+
+    # Act / Assert
+    for error in (redis.ConnectionError, redis.ResponseError):
+        try:
+            client.get("latest_usd_rates")
+        except error:
+            pass
+
+    mock_manager.report_failure.assert_called_once()
@@ -0,0 +1,77 @@
+# tests/core/test_scheduler.py
+
+import pytest
+from datetime import datetime, timezone
+
+from src.core.scheduler import CronExpression, JobScheduler, ScheduledJob
+
+NOW = datetime(2025, 10, 17, 15, 30, 0, tzinfo=timezone.utc)  # a Friday
+
+# --- Tests ---
+
+@pytest.mark.parametrize("expression, expected", [
+    ("0 * * * *", datetime(2025, 10, 17, 16, 0, tzinfo=timezone.utc)),
+    ("5 0 * * *", datetime(2025, 10, 18, 0, 5, tzinfo=timezone.utc)),
+    ("*/20 15 * * *", datetime(2025, 10, 17, 15, 40, tzinfo=timezone.utc)),
+    ("0 9 * * 1", datetime(2025, 10, 20, 9, 0, tzinfo=timezone.utc)),
+    ("0 0 1 1 *", datetime(2026, 1, 1, 0, 0, tzinfo=timezone.utc)),
+])
+def test_cron_next_after(expression, expected):
+    assert CronExpression(expression).next_after(NOW) == expected
+
+
+def test_cron_previous_before():
+    assert CronExpression("5 0 * * *").previous_before(NOW) == datetime(2025, 10, 17, 0, 5, tzinfo=timezone.utc)
+    assert CronExpression("0 * * * *").previous_before(NOW) == datetime(2025, 10, 17, 15, 0, tzinfo=timezone.utc)
+
+
+def test_cron_rejects_invalid_expression():
+    with pytest.raises(ValueError):
+        CronExpression("61 * * * *")
+
+
+@pytest.mark.asyncio
+async def test_execute_skips_when_another_replica_holds_the_lock(mocker):
+    """
+    Tests that a job is not run when the Redis lock for its fire time is taken,
+    and that it runs (and records metrics) when this replica wins the lock.
+    """
+    # Arrange
+    mock_redis = mocker.Mock()
+    mocker.patch("src.core.scheduler.get_redis_client", return_value=mock_redis)
+    job_func = mocker.AsyncMock()
+    job = ScheduledJob(name="hourly", cron=CronExpression("0 * * * *"), func=job_func)
+    scheduler = JobScheduler([job])
+
+    # Act
+    mock_redis.set.return_value = None
+    ran_without_lock = await scheduler.execute(job, NOW)
+    mock_redis.set.return_value = True
+    ran_with_lock = await scheduler.execute(job, NOW)
+
+    # Assert
+    assert ran_without_lock is False
+    assert ran_with_lock is True
+    job_func.assert_awaited_once()
+    assert job.metrics.skipped == 1
+    assert job.metrics.runs == 1
+    assert job.metrics.last_status == "success"
+
+
+def test_missed_run_is_detected_from_last_run(mocker):
+    """
+    Tests that a job whose last recorded run is older than its most recent
+    fire time is scheduled for catch-up.
+    """
+    # Arrange
+    mocker.patch("src.core.scheduler.datetime", wraps=datetime, now=mocker.Mock(return_value=NOW))
+    mock_redis = mocker.Mock()
+    mock_redis.get.return_value = str(datetime(2025, 10, 16, 0, 5, tzinfo=timezone.utc).timestamp())
+    mocker.patch("src.core.scheduler.get_redis_client", return_value=mock_redis)
+    job = ScheduledJob(name="daily", cron=CronExpression("5 0 * * *"), func=mocker.AsyncMock())
+
+    # Act
+    missed = JobScheduler([job])._missed_fire_time(job)
+
+    # Assert
+    assert missed == datetime(2025, 10, 17, 0, 5, tzinfo=timezone.utc)
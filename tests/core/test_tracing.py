@@ -0,0 +1,91 @@
+# tests/core/test_tracing.py
+
+import httpx
+import pytest
+
+pytest.importorskip("opentelemetry.sdk")
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from src.core import tracing
+from src.core.config import settings
+
+TRACEPARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+@pytest.fixture
+def exporter(mocker):
+    """Turns tracing on and collects finished spans in memory."""
+    span_exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(span_exporter))
+    mocker.patch.object(settings, "TRACING_ENABLED", True)
+    mocker.patch("src.core.tracing.trace.get_tracer", side_effect=provider.get_tracer)
+    return span_exporter
+
+# --- Tests ---
+
+@pytest.mark.asyncio
+async def test_http_spans_nest_under_traced_function_and_propagate(exporter):
+    """
+    Tests that an httpx call made inside a traced function gets a child client span,
+    sends a traceparent header and keeps the API key query string out of the span.
+    """
+    # Arrange
+    seen_headers = {}
+
+    def handler(request):
+        seen_headers.update(request.headers)
+        return httpx.Response(200, json={})
+
+    @tracing.traced()
+    async def fetch_rates():
+        async with httpx.AsyncClient(transport=tracing.http_transport(httpx.MockTransport(handler))) as client:
+            await client.get("https://openexchangerates.org/api/latest.json?app_id=SECRET")
+
+    # Act
+    await fetch_rates()
+
+    # Assert
+    http_span, function_span = exporter.get_finished_spans()
+    assert function_span.name.endswith("fetch_rates")
+    assert http_span.parent.span_id == function_span.context.span_id
+    assert http_span.attributes["url.full"] == "https://openexchangerates.org/api/latest.json"
+    assert http_span.attributes["http.response.status_code"] == 200
+    assert seen_headers["traceparent"].split("-")[1] == format(http_span.context.trace_id, "032x")
+
+
+def test_redis_commands_and_job_context(exporter, mocker, monkeypatch):
+    """
+    Tests that every Redis command runs in a client span and that a job run joins
+    the trace passed in through TRACEPARENT.
+    """
+    # Arrange
+    mocker.patch("redis.Redis.execute_command", return_value="OK")
+    client = tracing.TracedRedis()
+    monkeypatch.setenv("TRACEPARENT", TRACEPARENT)
+
+    # Act
+    with tracing.start_span("job hourly", context=tracing.context_from_environment()):
+        client.set("latest_usd_rates", "{}")
+
+    # Assert
+    redis_span, job_span = exporter.get_finished_spans()
+    assert redis_span.name == "redis SET"
+    assert redis_span.attributes["db.system"] == "redis"
+    assert redis_span.parent.span_id == job_span.context.span_id
+    assert format(job_span.context.trace_id, "032x") == TRACEPARENT.split("-")[1]
+
+
+def test_hooks_are_no_ops_when_tracing_is_off():
+    """
+    Tests that with tracing off the decorator returns the function itself and
+    httpx clients keep their own transport.
+    """
+    def get_latest():
+        return 1
+
+    assert tracing.traced()(get_latest) is get_latest
+    assert tracing.http_transport() is None
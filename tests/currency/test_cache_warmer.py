@@ -0,0 +1,143 @@
+# tests/currency/test_cache_warmer.py
+
+import json
+import pytest
+from datetime import datetime, timezone
+
+from src.currency import rate_state
+from src.currency.cache_warmer import get_cached_rates_body, warm_rate_caches
+from src.currency.rate_state import build_rate_state, get_rate_state
+
+AS_OF = datetime(2025, 10, 17, 15, 0, 0, tzinfo=timezone.utc)
+USD_RATES = {"USD": 1.0, "EUR": 0.9, "TRY": 36.0, "XAU": 0.0004}
+
+@pytest.fixture(autouse=True)
+def reset_rate_state(mocker):
+    mocker.patch.object(rate_state, "_current_state", None)
+
+# --- Tests ---
+
+def test_build_rate_state_cross_rate_matrix():
+    """
+    Tests that the matrix holds cross rates for active currencies only,
+    in catalogue order and without the base itself.
+    """
+    state = build_rate_state(USD_RATES, ["TRY", "EUR", "USD", "GBP"], AS_OF)
+
+    assert state.codes == ("TRY", "EUR", "USD")  # GBP has no rate
+    assert list(state.cross_rates("EUR")) == ["TRY", "USD"]
+    assert state.cross_rates("EUR")["TRY"] == pytest.approx(40.0)
+    assert state.cross_rates("XAU") is None
+    assert state.version == int(AS_OF.timestamp())
+
+
+def test_warm_rate_caches_writes_rates_and_bodies_with_one_ttl(mocker):
+    """
+    Tests that warming installs the in-process state and writes the latest rates
+    plus one pre-serialized /rates body per active base, all with the same TTL.
+    """
+    # Arrange
+    mock_redis = mocker.Mock()
+    pipeline = mock_redis.pipeline.return_value
+    mocker.patch("src.currency.cache_warmer.get_redis_client", return_value=mock_redis)
+    mocker.patch("src.currency.rate_updates.get_redis_client", return_value=mock_redis)
+
+    # Act
+    warm_rate_caches(USD_RATES, ["USD", "EUR"], AS_OF, ttl_seconds=600)
+
+    # Assert
+    assert get_rate_state().codes == ("USD", "EUR")
+    written = {c.args[0]: c.args[1] for c in pipeline.set.call_args_list}
+    assert set(written) == {"latest_usd_rates", "rates_body:USD", "rates_body:EUR"}
+    assert json.loads(written["rates_body:USD"]) == {"from": "USD", "rates": [{"to": "EUR", "rate": 0.9}]}
+    assert {c.kwargs["ex"] for c in pipeline.set.call_args_list} == {600}
+    pipeline.execute.assert_called_once()
+    mock_redis.publish.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_all_rates_from_usd_serves_fresh_state_before_redis(mocker):
+    """
+    Tests that the pushed in-process state is served without a Redis read or a call
+    to the external API while it is fresh, for the latest rates and the /rates bodies.
+    """
+    # Arrange
+    mocker.patch("src.currency.rate_state.datetime", wraps=datetime, now=mocker.Mock(return_value=AS_OF))
+    rate_state.set_rate_state(build_rate_state(USD_RATES, ["USD", "EUR"], AS_OF))
+    mock_redis = mocker.Mock()
+    mocker.patch("src.currency.service.get_redis_client", return_value=mock_redis)
+    mocker.patch("src.currency.cache_warmer.get_redis_client", return_value=mock_redis)
+    mock_httpx_get = mocker.patch("httpx.AsyncClient.get")
+
+    # Act
+    from src.currency.service import _get_all_rates_from_usd
+    result = await _get_all_rates_from_usd()
+    body = get_cached_rates_body("USD")
+
+    # Assert
+    assert result == USD_RATES
+    assert json.loads(body) == {"from": "USD", "rates": [{"to": "EUR", "rate": 0.9}]}
+    assert get_cached_rates_body("USD") is body  # serialized once per state
+    mock_redis.get.assert_not_called()
+    mock_httpx_get.assert_not_called()
+
+
+def test_published_update_is_applied_once_and_in_order(mocker):
+    """
+    Tests the pub/sub round trip: a published payload rebuilds the same state in
+    a worker, stale versions and repeats are ignored, and a re-run of the same
+    bucket with new rates is applied.
+    """
+    # Arrange
+    from src.currency.rate_updates import apply_rates_update, publish_rates_update
+    mock_redis = mocker.Mock()
+    mocker.patch("src.currency.rate_updates.get_redis_client", return_value=mock_redis)
+    newer = build_rate_state(USD_RATES, ["USD", "EUR", "TRY"], AS_OF, {"USD": 2, "TRY": 2, "XAU": 4})
+    older = build_rate_state(USD_RATES, ["USD"], AS_OF.replace(hour=14))
+
+    publish_rates_update(newer)
+    channel, message = mock_redis.publish.call_args.args
+    publish_rates_update(older)
+    _, stale_message = mock_redis.publish.call_args.args
+
+    # Act & Assert
+    assert channel == "rates_updated"
+    assert apply_rates_update(message) is True
+    assert get_rate_state().matrix == newer.matrix
+    assert get_rate_state().decimal_places == {"USD": 2, "TRY": 2}
+    assert apply_rates_update(message) is False
+    assert apply_rates_update(stale_message) is False
+    assert get_rate_state().version == newer.version
+
+    # Act & Assert: the hourly job re-runs the same bucket
+    publish_rates_update(build_rate_state({**USD_RATES, "TRY": 36.5}, ["USD", "EUR", "TRY"], AS_OF))
+    _, rerun_message = mock_redis.publish.call_args.args
+    assert apply_rates_update(rerun_message) is True
+    assert get_rate_state().usd_rates["TRY"] == 36.5
+
+
+def test_subscriber_dispatches_messages_by_channel(mocker):
+    """
+    Tests that the subscriber listens on every registered channel and hands each
+    message to that channel's handler.
+    """
+    # Arrange
+    from src.currency.rate_updates import RATES_UPDATED_CHANNEL, RateUpdateSubscriber
+    subscriber = RateUpdateSubscriber()
+    mocker.patch.dict(subscriber._handlers, {RATES_UPDATED_CHANNEL: mocker.Mock()})
+    on_dates = mocker.Mock(side_effect=lambda _: subscriber._stop_event.set())
+    subscriber.add_handler("snapshot_dates_updated", on_dates)
+    pubsub = mocker.Mock()
+    pubsub.listen.return_value = iter([
+        {"type": "message", "channel": RATES_UPDATED_CHANNEL, "data": "{}"},
+        {"type": "message", "channel": "snapshot_dates_updated", "data": "daily"},
+    ])
+    mocker.patch("src.currency.rate_updates.get_redis_client", return_value=mocker.Mock(pubsub=mocker.Mock(return_value=pubsub)))
+
+    # Act
+    subscriber._run()
+
+    # Assert
+    pubsub.subscribe.assert_called_once_with(RATES_UPDATED_CHANNEL, "snapshot_dates_updated")
+    subscriber._handlers[RATES_UPDATED_CHANNEL].assert_called_once_with("{}")
+    on_dates.assert_called_once_with("daily")
@@ -89,4 +89,147 @@ async def test_get_all_rates_from_usd_cache_hit(mocker):
     # 2. Verify that Redis' get method is called
     mock_redis_client.get.assert_called_once_with("latest_usd_rates")
     # 3. Verify that the external API is never called
-    mock_httpx_get.assert_not_called()
\ No newline at end of file
+    mock_httpx_get.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_get_conversion_rates_for_bases_loads_rates_once(mocker):
+    # Arrange
+    mock_usd_rates = {"USD": 1.0, "EUR": 0.9, "TRY": 36.0}
+    mock_get_all = mocker.patch(
+        "src.currency.service._get_all_rates_from_usd",
+        return_value=mock_usd_rates
+    )
+
+    # Act
+    from src.currency.service import get_conversion_rates_for_bases
+    result = await get_conversion_rates_for_bases(["usd", "EUR"], ["USD", "EUR", "TRY"])
+
+    # Assert
+    mock_get_all.assert_awaited_once()
+    assert list(result) == ["USD", "EUR"]
+    assert result["USD"] == {"EUR": 0.9, "TRY": 36.0}
+    assert result["EUR"]["TRY"] == pytest.approx(40.0)
+    assert "EUR" not in result["EUR"]
+
+
+def test_convert_amount_rounds_to_target_decimal_places():
+    # Arrange
+    from datetime import datetime, timezone
+    from src.currency.rate_state import build_rate_state
+    from src.currency.service import convert_amount
+    state = build_rate_state(
+        {"USD": 1.0, "JPY": 151.237, "KWD": 0.30712, "EUR": 0.9},
+        ["USD", "JPY", "KWD", "EUR"],
+        datetime(2025, 10, 17, 15, tzinfo=timezone.utc),
+        {"USD": 2, "JPY": 0, "KWD": 3},
+    )
+
+    # Act
+    result = convert_amount(state, 10.5, "usd", ["jpy", "KWD", "EUR", "XYZ"])
+
+    # Assert
+    assert result == [
+        ("JPY", 151.237, 1588.0),
+        ("KWD", 0.30712, 3.225),
+        ("EUR", 0.9, 9.45),  # no decimal places known -> 2
+    ]
+    with pytest.raises(CurrencyAPIError) as exc_info:
+        convert_amount(state, 1, "XYZ")
+    assert exc_info.value.code == 400
+
+
+def test_get_catalogue_body_is_built_once_per_language(mocker):
+    """
+    Tests that the localized /currencies list is read from the database on a miss,
+    cached per language and served from the cache afterwards.
+    """
+    # Arrange
+    from src.core.local_cache import LocalCache
+    from src.currency.schemas import CurrencyRead
+    from src.currency.service import get_catalogue_body
+
+    cache = LocalCache()
+    mocker.patch("src.currency.service.get_redis_client", return_value=cache)
+    currency = CurrencyRead(code="TRY", name="Türk Lirası", symbol="₺", active=True, flag_url=None,
+                            decimal_places=2, quick_rates=True, quick_rates_order=1)
+    mock_repo = mocker.patch("src.currency.service.repo.get_active_currencies_with_localization", return_value=[currency])
+
+    # Act
+    first = get_catalogue_body(mocker.Mock(), "tr")
+    second = get_catalogue_body(mocker.Mock(), "tr")
+
+    # Assert
+    assert first == second
+    assert '"name":"Türk Lirası"' in first
+    assert cache.get("catalogue_body:tr") == first
+    mock_repo.assert_called_once()
+
+
+def test_conversions_refuse_rates_older_than_the_max_age(mocker):
+    """
+    Tests that the in-memory conversions answer 503 once the rate state has outlived
+    RATE_STATE_MAX_AGE (the updates stalled) instead of serving stale rates.
+    """
+    # Arrange
+    from datetime import datetime, timezone
+    from fastapi import HTTPException
+    from src.currency import rate_state
+    from src.currency.rate_state import RATE_STATE_MAX_AGE, build_rate_state
+    from src.currency.router import _require_rate_state
+
+    as_of = datetime(2025, 10, 17, 15, tzinfo=timezone.utc)
+    now = mocker.patch("src.currency.rate_state.datetime", wraps=datetime)
+    mocker.patch.object(rate_state, "_current_state", build_rate_state({"USD": 1.0, "EUR": 0.9}, ["USD", "EUR"], as_of))
+
+    # Act & Assert
+    now.now.return_value = as_of + RATE_STATE_MAX_AGE / 2
+    assert _require_rate_state().as_of == as_of
+
+    now.now.return_value = as_of + RATE_STATE_MAX_AGE
+    with pytest.raises(HTTPException) as exc_info:
+        _require_rate_state()
+    assert exc_info.value.status_code == 503
+
+
+def test_convert_endpoints_reject_infinite_and_huge_amounts(mocker):
+    """
+    Tests that /convert and /convert/batch answer 422 for an infinite or too large
+    amount, and 400 (not 500) when a converted amount is too large to round.
+    """
+    # Arrange
+    from datetime import datetime, timezone
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from src.core.rate_limiter import manual_rate_limiter
+    from fastapi.exceptions import RequestValidationError
+    from src.currency import rate_state
+    from src.currency.exceptions import validation_exception_handler
+    from src.currency.rate_state import build_rate_state
+    from src.currency.router import router
+
+    app = FastAPI()
+    app.add_exception_handler(RequestValidationError, validation_exception_handler)
+    app.include_router(router)
+    app.dependency_overrides[manual_rate_limiter] = lambda: None
+    client = TestClient(app)
+    as_of = datetime.now(timezone.utc)
+    mocker.patch.object(rate_state, "_current_state", build_rate_state({"USD": 1.0, "XBT": 1e20}, ["USD", "XBT"], as_of))
+
+    # Act
+    infinite = client.get("/convert", params={"from": "USD", "amount": "inf"})
+    huge = client.get("/convert", params={"from": "USD", "amount": "1e30"})
+    batch_infinite = client.post(
+        "/convert/batch", content='{"conversions": [{"from": "USD", "amount": Infinity}]}',
+        headers={"Content-Type": "application/json"},
+    )
+    batch_incomplete = client.post(
+        "/convert/batch", content='{"conversions": [{"amount": NaN}]}', headers={"Content-Type": "application/json"},
+    )
+    batch_huge = client.post("/convert/batch", json={"conversions": [{"from": "USD", "amount": 1e30}]})
+    overflowing = client.get("/convert", params={"from": "USD", "to": "XBT", "amount": "1e12"})
+
+    # Assert
+    assert [infinite.status_code, huge.status_code] == [422, 422]
+    assert [batch_infinite.status_code, batch_incomplete.status_code, batch_huge.status_code] == [422, 422, 422]
+    assert overflowing.status_code == 400
+    assert client.get("/convert", params={"from": "USD", "to": "XBT", "amount": "1"}).status_code == 200
@@ -0,0 +1,177 @@
+# tests/currency/test_providers.py
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.currency.exceptions import CurrencyAPIError
+from src.currency.providers import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    FileRateProvider,
+    FrankfurterProvider,
+    RateProvider,
+    RateProviderChain,
+    merge_rates,
+)
+
+
+class FakeProvider(RateProvider):
+    """Answers with `rates` after `delay` seconds, or raises when `rates` is None."""
+
+    def __init__(self, name, rates, delay=0.0):
+        self.name = name
+        self.rates = rates
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = False
+
+    async def fetch(self):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.rates is None:
+            raise CurrencyAPIError(code=502, message=f"{self.name} is down")
+        return self.rates
+
+
+def chain(*providers, hedge_delay=0.05, failure_threshold=2):
+    return RateProviderChain(providers, hedge_delay=hedge_delay, failure_threshold=failure_threshold, reset_timeout=30)
+
+# --- Tests ---
+
+def test_circuit_breaker_opens_fails_fast_and_recovers_through_one_trial():
+    """
+    Tests that the circuit opens after the failure threshold, refuses calls until
+    the reset timeout, then lets exactly one trial through and closes on its success.
+    """
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: now[0])
+
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.allow_request() is False
+
+    now[0] = 31.0
+    assert breaker.allow_request() is True
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request() is False
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_merge_rates_prefers_priority_order_and_keeps_last_known_rates():
+    """
+    Tests that each currency comes from the highest-priority result that has it,
+    and that currencies no fresh result has keep their fallback rate.
+    """
+    merged = merge_rates(
+        [{"USD": 1.0, "EUR": 0.86}, {"USD": 1.0, "EUR": 0.87, "TRY": 41.9}],
+        fallback={"EUR": 0.8, "TRY": 40.0, "XAU": 0.0003},
+    )
+
+    assert merged == {"USD": 1.0, "EUR": 0.86, "TRY": 41.9, "XAU": 0.0003}
+
+
+@pytest.mark.asyncio
+async def test_chain_hedges_slow_primary_and_cancels_it():
+    """
+    Tests that a primary still silent after the hedge delay gets a parallel request
+    to the backup, whose answer wins, and that the slow call is cancelled.
+    """
+    # Arrange
+    primary = FakeProvider("oxr", {"USD": 1.0, "TRY": 42.0}, delay=5)
+    backup = FakeProvider("frankfurter", {"USD": 1.0, "TRY": 41.9})
+
+    # Act
+    rates = await chain(primary, backup).fetch_latest()
+
+    # Assert
+    assert rates == {"USD": 1.0, "TRY": 41.9}
+    assert primary.cancelled
+
+
+@pytest.mark.asyncio
+async def test_chain_fails_over_immediately_and_skips_open_circuits():
+    """
+    Tests that a failing provider hands over to the next one without waiting for
+    the hedge delay, and that once its circuit is open it is not called at all.
+    """
+    # Arrange
+    primary = FakeProvider("oxr", None)
+    backup = FakeProvider("file", {"USD": 1.0})
+    providers = chain(primary, backup, hedge_delay=10)
+
+    # Act
+    for _ in range(3):
+        rates = await asyncio.wait_for(providers.fetch_latest(), timeout=1)
+
+    # Assert
+    assert rates == {"USD": 1.0}
+    assert primary.calls == 2
+    assert backup.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_chain_raises_when_every_provider_fails():
+    """
+    Tests that the error names every provider's failure.
+    """
+    providers = chain(FakeProvider("oxr", None), FakeProvider("frankfurter", None))
+
+    with pytest.raises(CurrencyAPIError) as exc_info:
+        await providers.fetch_latest()
+
+    assert exc_info.value.code == 502
+    assert "oxr is down" in exc_info.value.message
+    assert "frankfurter is down" in exc_info.value.message
+
+
+@pytest.mark.asyncio
+async def test_complete_only_skips_partial_providers():
+    """
+    Tests that with complete_only the partial backup is never asked, so a failing
+    full-coverage provider surfaces as an error instead of a patched-up rate map.
+    """
+    # Arrange
+    backup = FakeProvider("frankfurter", {"USD": 1.0, "EUR": 0.86})
+    backup.complete = False
+    providers = chain(FakeProvider("oxr", None), backup)
+
+    # Act / Assert
+    with pytest.raises(CurrencyAPIError):
+        await providers.fetch_latest(fallback={"TRY": 40.0}, complete_only=True)
+    assert backup.calls == 0
+    assert await providers.fetch_latest(fallback={"TRY": 40.0}) == {"USD": 1.0, "EUR": 0.86, "TRY": 40.0}
+
+@pytest.mark.asyncio
+async def test_frankfurter_and_file_providers_return_usd_based_rates(tmp_path):
+    """
+    Tests that Frankfurter is asked for USD-based rates and gets USD added back,
+    and that the file stand-in reads a `rates` document.
+    """
+    # Arrange
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.params["from"] == "USD"
+        return httpx.Response(200, json={"amount": 1.0, "base": "USD", "rates": {"EUR": 0.86}})
+
+    rates_file = tmp_path / "rates.json"
+    rates_file.write_text(json.dumps({"rates": {"USD": 1.0, "TRY": 41.9}}))
+
+    # Act
+    frankfurter = await FrankfurterProvider("https://frankfurter.test/latest", timeout=1, transport=httpx.MockTransport(handler)).fetch()
+    from_file = await FileRateProvider(str(rates_file)).fetch()
+
+    # Assert
+    assert frankfurter == {"EUR": 0.86, "USD": 1.0}
+    assert from_file == {"USD": 1.0, "TRY": 41.9}
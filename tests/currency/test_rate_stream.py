@@ -0,0 +1,88 @@
+# tests/currency/test_rate_stream.py
+
+import asyncio
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from src.currency import rate_state
+from src.currency.rate_state import build_rate_state
+from src.currency.stream import RateStreamHub, stream_rate_updates
+
+AS_OF = datetime(2025, 10, 17, 15, 0, 0, tzinfo=timezone.utc)
+CODES = ["USD", "EUR", "TRY", "GBP"]
+
+@pytest.fixture(autouse=True)
+def reset_rate_state(mocker):
+    mocker.patch.object(rate_state, "_current_state", None)
+    mocker.patch.object(rate_state, "_listeners", [])
+
+
+def parse_event(raw: str) -> dict:
+    fields = dict(line.split(": ", 1) for line in raw.strip().splitlines())
+    return {"event": fields["event"], "data": json.loads(fields["data"])}
+
+# --- Tests ---
+
+@pytest.mark.asyncio
+async def test_stream_sends_snapshot_then_only_changed_pairs():
+    """
+    Tests that a client first receives all requested pairs, and after an update
+    only the pairs that changed (restricted to its symbols).
+    """
+    # Arrange
+    hub = RateStreamHub()
+    rate_state.set_rate_state(build_rate_state({"USD": 1.0, "EUR": 0.9, "TRY": 36.0, "GBP": 0.8}, CODES, AS_OF))
+    stream = stream_rate_updates("USD", ["EUR", "TRY"], hub=hub, keepalive_seconds=5)
+
+    # Act
+    snapshot = parse_event(await anext(stream))
+    task = asyncio.ensure_future(anext(stream))
+    await asyncio.sleep(0)  # let the stream start waiting for the next update
+    hub.publish(build_rate_state({"USD": 1.0, "EUR": 0.9, "TRY": 37.0, "GBP": 0.7}, CODES, AS_OF + timedelta(hours=1)))
+    update = parse_event(await task)
+    await stream.aclose()
+
+    # Assert
+    assert snapshot["event"] == "snapshot"
+    assert snapshot["data"]["rates"] == [{"to": "EUR", "rate": 0.9}, {"to": "TRY", "rate": 36.0}]
+    assert update["event"] == "rates"
+    assert update["data"]["rates"] == [{"to": "TRY", "rate": 37.0}]  # GBP changed too, but was not requested
+    assert hub.listeners == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_catches_up_with_update_installed_between_events():
+    """
+    Tests that a state installed while the stream was suspended at `yield` (so the
+    hub's wake-up went to no one) is sent right away instead of being missed.
+    """
+    # Arrange
+    hub = RateStreamHub()
+    rate_state.set_rate_state(build_rate_state({"USD": 1.0, "EUR": 0.9, "TRY": 36.0}, CODES, AS_OF))
+    stream = stream_rate_updates("USD", None, hub=hub, keepalive_seconds=5)
+    await anext(stream)
+
+    # Act
+    newer = build_rate_state({"USD": 1.0, "EUR": 0.9, "TRY": 37.0}, CODES, AS_OF + timedelta(hours=1))
+    rate_state.set_rate_state(newer)
+    hub.publish(newer)
+    update = parse_event(await asyncio.wait_for(anext(stream), timeout=1))
+    await stream.aclose()
+
+    # Assert
+    assert update["event"] == "rates"
+    assert update["data"]["rates"] == [{"to": "TRY", "rate": 37.0}]
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_keepalive_when_idle():
+    """
+    Tests that an idle stream emits an SSE comment after the keep-alive interval.
+    """
+    rate_state.set_rate_state(build_rate_state({"USD": 1.0, "EUR": 0.9}, CODES, AS_OF))
+    stream = stream_rate_updates("USD", None, hub=RateStreamHub(), keepalive_seconds=0.01)
+
+    await anext(stream)
+    assert await anext(stream) == ": keep-alive\n\n"
+    await stream.aclose()
@@ -0,0 +1,129 @@
+# tests/currency/test_shared_state.py
+
+import uuid
+import pytest
+import numpy as np
+from datetime import datetime, timezone
+from multiprocessing import shared_memory
+
+from src.currency import rate_state
+from src.currency.rate_state import build_rate_state, get_rate_state
+from src.currency.shared_state import SLOT_COUNT, SharedRateState
+
+AS_OF = datetime(2025, 10, 17, 15, 0, 0, tzinfo=timezone.utc)
+USD_RATES = {"USD": 1.0, "EUR": 0.9, "TRY": 36.0}
+CODES = ["USD", "EUR", "TRY"]
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_state(mocker):
+    mocker.patch.object(rate_state, "_current_state", None)
+    mocker.patch.object(rate_state, "_listeners", [])
+
+
+@pytest.fixture
+def segment_name(tmp_path):
+    name = f"rates_test_{uuid.uuid4().hex[:8]}"
+    yield name
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+        segment.unlink()
+        segment.close()
+    except FileNotFoundError:
+        pass
+
+
+def make_shared(name, tmp_path):
+    return SharedRateState(name, size=256 * 1024, poll_seconds=3600, lock_dir=str(tmp_path))
+
+# --- Tests ---
+
+def test_owner_writes_installed_states_and_readers_get_views(segment_name, tmp_path):
+    """
+    Tests that the first worker becomes the owner and writes every installed state,
+    and that a second worker reads the same rates and catalogue as views into the segment.
+    """
+    # Arrange
+    owner = make_shared(segment_name, tmp_path)
+    reader = make_shared(segment_name, tmp_path)
+    assert owner.start(on_promoted=lambda: None) is True
+    expected = build_rate_state(USD_RATES, CODES, AS_OF, {"USD": 2, "EUR": 2, "TRY": 2})
+
+    # Act
+    rate_state.set_rate_state(expected)
+    state = reader.read_state()
+
+    # Assert
+    assert state.version == expected.version and state.as_of == AS_OF
+    assert state.codes == expected.codes
+    assert state.decimal_places == expected.decimal_places
+    assert dict(state.usd_rates) == USD_RATES
+    assert dict(state.cross_rates("EUR")) == pytest.approx(expected.cross_rates("EUR"))
+    assert "EUR" not in state.cross_rates("EUR")
+    assert state.cross_rates("GBP") is None
+    assert np.shares_memory(state.matrix._matrix, np.frombuffer(reader._segment.buf, dtype=np.uint8))
+
+
+def test_second_worker_follows_instead_of_owning(segment_name, tmp_path, mocker):
+    """
+    Tests that only one worker holds the owner role; the other installs the owner's
+    latest state on start and takes over once the owner's lock is released.
+    """
+    # Arrange
+    owner = make_shared(segment_name, tmp_path)
+    owner.start(on_promoted=lambda: None)
+    owner.write(build_rate_state(USD_RATES, CODES, AS_OF))
+    rate_state._listeners.clear()  # the owner lives in another process
+    reader = make_shared(segment_name, tmp_path)
+    mocker.patch("src.currency.shared_state.threading.Thread")
+    on_promoted = mocker.Mock()
+
+    # Act
+    is_owner = reader.start(on_promoted=on_promoted)
+
+    # Assert
+    assert is_owner is False
+    assert get_rate_state().cross_rates("USD")["TRY"] == 36.0
+    assert reader.install_latest() is False  # nothing new
+
+    # Act: the owner exits
+    owner._lock_file.close()
+    reader._stop_event.wait = mocker.Mock(side_effect=[False, True])
+    reader._watch()
+
+    # Assert
+    assert reader.is_owner is True
+    on_promoted.assert_called_once()
+
+
+def test_reader_keeps_last_complete_state_during_and_after_writes(segment_name, tmp_path):
+    """
+    Tests the seqlock: while a write is in progress the previous state is still served,
+    and a read whose slot was reused by the writer in the meantime is rejected.
+    """
+    # Arrange
+    owner = make_shared(segment_name, tmp_path)
+    owner.start(on_promoted=lambda: None)
+    owner.write(build_rate_state(USD_RATES, CODES, AS_OF))
+    reader = make_shared(segment_name, tmp_path)
+
+    # Act: a write into the next slot has started
+    owner._sequence[0] += 1
+    during_write = reader.read_state()
+    owner._sequence[0] -= 1
+
+    # Assert
+    assert during_write.usd_rates["TRY"] == 36.0
+
+    # Act: the writer laps the slot between the two reads of the sequence counter
+    original_read_slot = reader._read_slot
+
+    def read_slot_while_writer_laps(slot):
+        state = original_read_slot(slot)
+        owner._sequence[0] += 2 * SLOT_COUNT
+        return state
+
+    reader._read_slot = read_slot_while_writer_laps
+
+    # Assert
+    assert reader.read_state() is None
@@ -0,0 +1,125 @@
+# tests/rate_history/test_aggregation.py
+
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.rate_history.aggregation import (
+    DAY_SECONDS,
+    HOUR_SECONDS,
+    MONTH,
+    RateFrame,
+    aggregate,
+    last_per_bucket,
+)
+from src.rate_history.models import CurrencyRateSnapshot
+from src.rate_history.service import HistoricalDataService
+
+START = datetime(2025, 1, 30, 0, 0, tzinfo=timezone.utc)
+
+
+def make_snapshots(frequency: str, count: int, step: timedelta):
+    return [
+        CurrencyRateSnapshot(effective_at=START + step * index, frequency=frequency, rates={"USD": 1.0, "TRY": 30.0 + index})
+        for index in range(count)
+    ]
+
+# --- Tests ---
+
+@pytest.mark.parametrize("width, bucket_of", [
+    (8 * HOUR_SECONDS, lambda dt: (dt.date(), dt.hour // 8)),
+    (3 * DAY_SECONDS, lambda dt: (dt - datetime(1970, 1, 1, tzinfo=timezone.utc)).days // 3),
+    (MONTH, lambda dt: dt.strftime("%Y-%m")),
+])
+def test_last_per_bucket_matches_per_snapshot_bucketing(width, bucket_of):
+    """
+    Tests that the vectorized bucketing keeps the same last-in-bucket rows as
+    bucketing each snapshot by its date/hour in Python.
+    """
+    # Arrange
+    snapshots = make_snapshots("hourly", 24 * 70, timedelta(hours=1))
+    expected = {}
+    for snapshot in snapshots:
+        expected[bucket_of(snapshot.effective_at)] = snapshot
+
+    # Act
+    result = last_per_bucket(snapshots, width)
+
+    # Assert
+    assert result == list(expected.values())
+    assert all(a.effective_at < b.effective_at for a, b in zip(result, result[1:]))
+
+
+def test_last_per_bucket_sorts_unordered_input():
+    """
+    Tests that out-of-order snapshots still yield the latest row of each bucket in time order.
+    """
+    # Arrange
+    snapshots = make_snapshots("daily", 6, timedelta(days=1))
+    shuffled = [snapshots[index] for index in (4, 0, 5, 2, 1, 3)]
+
+    # Act
+    result = last_per_bucket(shuffled, 2 * DAY_SECONDS)
+
+    # Assert
+    assert [snapshot.effective_at for snapshot in result] == [START + timedelta(days=day) for day in (1, 3, 5)]
+
+
+def test_aggregate_mean_and_ohlc_ignore_missing_currencies():
+    """
+    Tests mean and OHLC per bucket, where a currency missing from a snapshot is
+    skipped instead of poisoning the bucket.
+    """
+    # Arrange
+    snapshots = [
+        CurrencyRateSnapshot(effective_at=START, frequency="hourly", rates={"TRY": 30.0, "EUR": 0.9}),
+        CurrencyRateSnapshot(effective_at=START + timedelta(hours=1), frequency="hourly", rates={"TRY": 34.0}),
+        CurrencyRateSnapshot(effective_at=START + timedelta(hours=2), frequency="hourly", rates={"TRY": 32.0, "EUR": 0.95}),
+        CurrencyRateSnapshot(effective_at=START + timedelta(hours=8), frequency="hourly", rates={"TRY": 31.0}),
+    ]
+    frame = RateFrame.from_snapshots(snapshots)
+
+    # Act
+    mean = aggregate(frame, 8 * HOUR_SECONDS, how="mean").records()
+    ohlc = aggregate(frame, 8 * HOUR_SECONDS, how="ohlc").records()
+
+    # Assert
+    assert [record["effective_at"] for record in mean] == [START + timedelta(hours=2), START + timedelta(hours=8)]
+    assert mean[0]["rates"] == {"TRY": 32.0, "EUR": pytest.approx(0.925)}
+    assert mean[1]["rates"] == {"TRY": 31.0}
+    assert ohlc[0]["open"] == {"TRY": 30.0, "EUR": 0.9}
+    assert ohlc[0]["high"] == {"TRY": 34.0, "EUR": 0.95}
+    assert ohlc[0]["low"] == {"TRY": 30.0, "EUR": 0.9}
+    assert ohlc[0]["close"] == {"TRY": 32.0, "EUR": 0.95}
+    assert math.isnan(aggregate(frame, 8 * HOUR_SECONDS, how="last").fields["rate"][1][1])
+
+
+def test_aggregate_rejects_unknown_function():
+    """
+    Tests that an unsupported aggregation name raises a ValueError.
+    """
+    # Arrange
+    frame = RateFrame.from_snapshots(make_snapshots("daily", 3, timedelta(days=1)))
+
+    # Act & Assert
+    with pytest.raises(ValueError):
+        aggregate(frame, DAY_SECONDS, how="median")
+
+
+def test_get_historical_data_buckets_by_range(mocker):
+    """
+    Tests that the 5y range fetches five years of daily data and keeps the last day of each month.
+    """
+    # Arrange
+    mocker.patch("src.rate_history.service.get_redis_client", return_value=None)
+    daily = make_snapshots("daily", 40, timedelta(days=1))
+    mock_get_range = mocker.patch("src.rate_history.service.repo.get_range", return_value=daily)
+    service = HistoricalDataService(session=mocker.Mock())
+
+    # Act
+    result = service.get_historical_data("5y")
+
+    # Assert
+    assert mock_get_range.call_args.kwargs["frequency"] == "daily"
+    assert [snapshot.effective_at.day for snapshot in result] == [31, 28, 10]
@@ -0,0 +1,139 @@
+# tests/rate_history/test_archive.py
+
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session
+
+from src.rate_history import jobs, repo
+from src.rate_history.archive import HourlyArchive
+from src.rate_history.models import CurrencyRateSnapshot
+from src.rate_history.partitions import drop_expired_partitions
+
+START = datetime(2025, 9, 30, 22, tzinfo=timezone.utc)
+
+
+def hourly(hours_after_start, rates, base_currency="USD"):
+    return CurrencyRateSnapshot(
+        frequency="hourly",
+        effective_at=START + timedelta(hours=hours_after_start),
+        base_currency=base_currency,
+        rates=rates,
+    )
+
+# --- Tests ---
+
+def test_archive_splits_by_month_and_reads_back_range(tmp_path):
+    """
+    Tests that snapshots are written to one file per month and that a range read
+    across the month boundary returns them in order with their exact rates.
+    """
+    # Arrange
+    archive = HourlyArchive(str(tmp_path))
+    snapshots = [hourly(hour, {"TRY": 41.0 + hour / 1000, "EUR": 0.86}) for hour in range(4)]
+    snapshots.append(hourly(3, {"TRY": 1.0}, base_currency="EUR"))
+
+    # Act
+    written = archive.write(snapshots)
+    read = archive.read_range(START, START + timedelta(hours=3), "USD")
+
+    # Assert
+    assert written == 5
+    assert sorted(os.listdir(tmp_path)) == ["hourly-2025-09.npz", "hourly-2025-10.npz"]
+    assert [snapshot.effective_at for snapshot in read] == [START + timedelta(hours=hour) for hour in range(4)]
+    assert read[3].rates == {"TRY": 41.003, "EUR": 0.86}
+
+
+def test_archive_write_merges_with_existing_month(tmp_path):
+    """
+    Tests that writing a month again keeps the rows already archived and replaces
+    the ones for the same hour, and that currencies absent from a row stay absent.
+    """
+    # Arrange
+    archive = HourlyArchive(str(tmp_path))
+    archive.write([hourly(2, {"TRY": 41.0}), hourly(3, {"TRY": 41.1})])
+
+    # Act
+    archive.write([hourly(3, {"TRY": 42.0, "EUR": 0.9}), hourly(4, {"EUR": 0.91})])
+    read = archive.read_range(START, START + timedelta(days=1), "USD")
+
+    # Assert
+    assert [(snapshot.effective_at.hour, snapshot.rates) for snapshot in read] == [
+        (0, {"TRY": 41.0}),
+        (1, {"TRY": 42.0, "EUR": 0.9}),
+        (2, {"EUR": 0.91}),
+    ]
+
+
+def test_get_range_fills_hourly_range_from_archive(mocker, tmp_path):
+    """
+    Tests that an hourly range reaching past the hot window gets the archived rows
+    before the database rows, with the database winning for the same hour.
+    """
+    # Arrange
+    archive = HourlyArchive(str(tmp_path))
+    archive.write([hourly(hour, {"TRY": 40.0}) for hour in range(3)])
+    mocker.patch.object(repo, "hourly_archive", archive)
+    mock_session = mocker.Mock(spec=Session)
+    mock_session.exec.return_value.all.return_value = [
+        mocker.Mock(_mapping=snapshot.model_dump()) for snapshot in (hourly(2, {"TRY": 41.0}), hourly(3, {"TRY": 41.5}))
+    ]
+
+    # Act
+    rows = repo.get_range(mock_session, frequency="hourly", start=START, end=START + timedelta(hours=3))
+
+    # Assert
+    assert [(snapshot.effective_at, snapshot.rates["TRY"]) for snapshot in rows] == [
+        (START, 40.0),
+        (START + timedelta(hours=1), 40.0),
+        (START + timedelta(hours=2), 41.0),
+        (START + timedelta(hours=3), 41.5),
+    ]
+
+
+def test_failed_archive_keeps_partition(mocker):
+    """
+    Tests that a partition whose archiving fails is neither detached nor dropped.
+    """
+    # Arrange
+    mocker.patch("src.rate_history.partitions._existing_partitions", return_value=[
+        "currency_rate_snapshots_hourly_p2025_09",
+    ])
+    connection = mocker.Mock()
+    before_drop = mocker.Mock(side_effect=OSError("disk full"))
+
+    # Act
+    dropped = drop_expired_partitions(
+        connection, frequency="hourly", cutoff=datetime(2025, 11, 1, tzinfo=timezone.utc), before_drop=before_drop
+    )
+
+    # Assert
+    assert dropped == []
+    before_drop.assert_called_once_with(
+        datetime(2025, 9, 1, tzinfo=timezone.utc), datetime(2025, 10, 1, tzinfo=timezone.utc)
+    )
+    connection.execute.assert_not_called()
+
+
+def test_archive_hourly_copies_every_base(mocker, tmp_path):
+    """
+    Tests that expiring hourly rows are archived for every base currency, not only
+    USD, since the retention DELETE and the partition drop remove every base.
+    """
+    # Arrange
+    archive = HourlyArchive(str(tmp_path))
+    mocker.patch.object(jobs, "hourly_archive", archive)
+    mocker.patch.object(repo, "hourly_archive", archive)
+    mock_session = mocker.Mock(spec=Session)
+    mock_session.exec.return_value.all.return_value = [
+        mocker.Mock(_mapping=snapshot.model_dump())
+        for snapshot in (hourly(0, {"TRY": 41.0}), hourly(0, {"TRY": 47.0}, base_currency="EUR"))
+    ]
+
+    # Act
+    jobs._archive_hourly(mock_session, START, START + timedelta(hours=1))
+
+    # Assert
+    assert "base_currency" not in str(mock_session.exec.call_args.args[0].whereclause)
+    assert archive.read_range(START, START, "EUR")[0].rates == {"TRY": 47.0}
+    assert archive.read_range(START, START, "USD")[0].rates == {"TRY": 41.0}
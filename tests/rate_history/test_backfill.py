@@ -0,0 +1,130 @@
+# tests/rate_history/test_backfill.py
+
+import json
+import pytest
+import httpx
+from datetime import date
+
+from src.rate_history.backfill import (
+    ApiKeyBudget,
+    ApiKeyPool,
+    BackfillCheckpoint,
+    BackfillEngine,
+    iter_days,
+)
+
+# --- Fake OpenExchangeRates server ---
+
+def fake_oxr_transport(calls, rejected_keys=()):
+    """
+    A local stand-in for the OXR /historical endpoint.
+    Every call is recorded as (date, app_id); keys in `rejected_keys` get a 429.
+    """
+    def handler(request: httpx.Request) -> httpx.Response:
+        date_str = request.url.path.rsplit("/", 1)[-1].removesuffix(".json")
+        app_id = request.url.params["app_id"]
+        calls.append((date_str, app_id))
+        if app_id in rejected_keys:
+            return httpx.Response(429, json={"error": True, "status": 429, "message": "too_many_requests"})
+        return httpx.Response(200, json={"base": "USD", "rates": {"USD": 1.0, "TRY": float(date_str[-2:])}})
+
+    return httpx.MockTransport(handler)
+
+
+def make_pool(*keys, max_requests=100):
+    return ApiKeyPool([ApiKeyBudget(key=key, max_requests=max_requests) for key in keys])
+
+# --- Tests ---
+
+@pytest.mark.asyncio
+async def test_backfill_fetches_all_days_in_batches_and_rotates_keys():
+    """
+    Tests that every missing day is fetched once, requests are spread across
+    the keys and rows reach the sink in multi-row batches.
+    """
+    # Arrange
+    calls, batches = [], []
+    days = list(iter_days(date(2024, 1, 1), date(2024, 1, 10)))
+    engine = BackfillEngine(
+        key_pool=make_pool("key-a", "key-b"),
+        sink=batches.append,
+        concurrency=3,
+        batch_size=4,
+        transport=fake_oxr_transport(calls),
+    )
+
+    # Act
+    stats = await engine.run(days)
+
+    # Assert
+    assert stats.written == 10
+    assert sorted(d for d, _ in calls) == [d.isoformat() for d in days]
+    assert {key for _, key in calls} == {"key-a", "key-b"}
+    assert all(len(batch) <= 4 for batch in batches)
+    written = {row["effective_at"].date(): row["rates"]["TRY"] for batch in batches for row in batch}
+    assert written[date(2024, 1, 7)] == 7.0
+
+
+@pytest.mark.asyncio
+async def test_backfill_rotates_out_rejected_key():
+    """
+    Tests that a key answered with 429 is taken out of rotation and its
+    request is retried with another key.
+    """
+    # Arrange
+    calls, batches = [], []
+    engine = BackfillEngine(
+        key_pool=make_pool("bad-key", "good-key"),
+        sink=batches.append,
+        concurrency=2,
+        transport=fake_oxr_transport(calls, rejected_keys={"bad-key"}),
+    )
+
+    # Act
+    stats = await engine.run(iter_days(date(2024, 1, 1), date(2024, 1, 5)))
+
+    # Assert
+    assert stats.written == 5
+    assert stats.failed == 0
+    assert [key for _, key in calls].count("bad-key") == 1
+
+
+@pytest.mark.asyncio
+async def test_backfill_stops_at_budget_and_resumes_from_checkpoint(tmp_path):
+    """
+    Tests that a run stops once every key budget is used up, and that a second
+    run with the same checkpoint only fetches the remaining days.
+    """
+    # Arrange
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    days = list(iter_days(date(2024, 1, 1), date(2024, 1, 6)))
+    first_calls, second_calls = [], []
+
+    first_run = BackfillEngine(
+        key_pool=make_pool("key-a", max_requests=4),
+        sink=lambda rows: None,
+        concurrency=1,
+        batch_size=2,
+        checkpoint=BackfillCheckpoint(checkpoint_path).load(),
+        transport=fake_oxr_transport(first_calls),
+    )
+
+    # Act
+    first_stats = await first_run.run(days)
+    with open(checkpoint_path) as f:
+        checkpoint_after_first_run = json.load(f)
+
+    second_run = BackfillEngine(
+        key_pool=make_pool("key-a", max_requests=4),
+        sink=lambda rows: None,
+        checkpoint=BackfillCheckpoint(checkpoint_path).load(),
+        transport=fake_oxr_transport(second_calls),
+    )
+    second_stats = await second_run.run(days)
+
+    # Assert
+    assert first_stats.stopped_by_budget is True
+    assert first_stats.written == 4
+    assert checkpoint_after_first_run == {"completed": [["2024-01-01", "2024-01-04"]]}
+    assert sorted(d for d, _ in second_calls) == ["2024-01-05", "2024-01-06"]
+    assert second_stats.stopped_by_budget is False
@@ -0,0 +1,48 @@
+# tests/rate_history/test_date_index.py
+
+from datetime import date, datetime, timezone
+
+from src.rate_history.date_index import SnapshotDateIndex
+
+SNAPSHOT_DATES = [
+    datetime(2025, 10, 8, tzinfo=timezone.utc),
+    datetime(2025, 10, 9, tzinfo=timezone.utc),
+    datetime(2025, 10, 10, tzinfo=timezone.utc),  # Friday
+    datetime(2025, 10, 13, tzinfo=timezone.utc),  # Monday
+]
+
+# --- Tests ---
+
+def test_resolve_returns_latest_date_on_or_before_target(mocker):
+    """
+    Tests that the index bisects to the nearest earlier snapshot date and is
+    loaded from the repo only once.
+    """
+    # Arrange
+    mock_get_dates = mocker.patch("src.rate_history.date_index.repo.get_snapshot_dates", return_value=SNAPSHOT_DATES)
+    index = SnapshotDateIndex()
+    session = mocker.Mock()
+
+    # Act & Assert
+    assert index.resolve(session, datetime(2025, 10, 12, tzinfo=timezone.utc)) == SNAPSHOT_DATES[2]
+    assert index.resolve(session, datetime(2025, 10, 13, 18, tzinfo=timezone.utc)) == SNAPSHOT_DATES[3]
+    assert index.resolve(session, datetime(2025, 10, 9, tzinfo=timezone.utc)) == SNAPSHOT_DATES[1]
+    mock_get_dates.assert_called_once()
+
+
+def test_resolve_defers_to_database_outside_the_indexed_range(mocker):
+    """
+    Tests that dates after the newest (possibly stale) or before the first indexed
+    date are not answered by the index, until a newer date is added.
+    """
+    # Arrange
+    mocker.patch("src.rate_history.date_index.repo.get_snapshot_dates", return_value=SNAPSHOT_DATES)
+    index = SnapshotDateIndex()
+    session = mocker.Mock()
+
+    # Act & Assert
+    assert index.resolve(session, datetime(2025, 10, 15, tzinfo=timezone.utc)) is None
+    assert index.resolve(session, datetime(2025, 1, 1, tzinfo=timezone.utc)) is None
+
+    index.add(date(2025, 10, 14))
+    assert index.resolve(session, datetime(2025, 10, 14, tzinfo=timezone.utc)) == datetime(2025, 10, 14, tzinfo=timezone.utc)
@@ -0,0 +1,113 @@
+# tests/rate_history/test_partitions.py
+
+from datetime import datetime, timedelta, timezone
+
+from src.rate_history import partitions
+from src.rate_history.partitions import drop_expired_partitions, ensure_partitions, maintain_partitions
+
+NOW = datetime(2025, 11, 20, 15, 0, tzinfo=timezone.utc)
+
+
+def executed_sql(connection):
+    return [str(call.args[0]) for call in connection.execute.call_args_list]
+
+# --- Tests ---
+
+def test_ensure_partitions_creates_missing_ranges_ahead(mocker):
+    """
+    Tests that missing frequency and leaf partitions are created (hourly months from
+    the retention start to two months ahead, daily years since 1999 to next year)
+    and that existing ones are left alone, all under the partition lock.
+    """
+    # Arrange
+    existing = [
+        "currency_rate_snapshots_hourly",
+        "currency_rate_snapshots_hourly_p2025_10",
+        "currency_rate_snapshots_daily",
+    ] + [f"currency_rate_snapshots_daily_p{year}" for year in range(1999, 2025)]
+    mocker.patch("src.rate_history.partitions._existing_partitions", return_value=existing)
+    connection = mocker.Mock()
+
+    # Act
+    created = ensure_partitions(connection, now=NOW, hourly_start=NOW - timedelta(days=30))
+
+    # Assert
+    assert created == [
+        "currency_rate_snapshots_hourly_p2025_11",
+        "currency_rate_snapshots_hourly_p2025_12",
+        "currency_rate_snapshots_hourly_p2026_01",
+        "currency_rate_snapshots_daily_p2025",
+        "currency_rate_snapshots_daily_p2026",
+    ]
+    statements = executed_sql(connection)
+    assert statements[0] == "SELECT pg_advisory_xact_lock(hashtext(:name))"
+    assert statements[1] == (
+        "CREATE TABLE currency_rate_snapshots_hourly_p2025_11 PARTITION OF currency_rate_snapshots_hourly "
+        "FOR VALUES FROM ('2025-11-01T00:00:00+00:00') TO ('2025-12-01T00:00:00+00:00')"
+    )
+    assert statements[-1].endswith("FOR VALUES FROM ('2026-01-01T00:00:00+00:00') TO ('2027-01-01T00:00:00+00:00')")
+
+
+def test_ensure_partitions_creates_frequency_partitions_on_new_table(mocker):
+    """
+    Tests that a freshly created partitioned table gets its LIST partitions by frequency.
+    """
+    # Arrange
+    mocker.patch("src.rate_history.partitions._existing_partitions", return_value=[])
+    connection = mocker.Mock()
+
+    # Act
+    created = ensure_partitions(connection, now=NOW)
+
+    # Assert
+    statements = executed_sql(connection)
+    assert statements[1] == (
+        "CREATE TABLE currency_rate_snapshots_hourly PARTITION OF currency_rate_snapshots "
+        "FOR VALUES IN ('hourly') PARTITION BY RANGE (effective_at)"
+    )
+    assert "currency_rate_snapshots_daily" in created
+    assert "currency_rate_snapshots_daily_p1999" in created
+
+
+def test_drop_expired_partitions_only_drops_fully_expired_hourly_months(mocker):
+    """
+    Tests that retention detaches and drops hourly months that end before the cutoff,
+    keeping the month the cutoff falls into and never touching daily partitions.
+    """
+    # Arrange
+    mocker.patch("src.rate_history.partitions._existing_partitions", return_value=[
+        "currency_rate_snapshots_hourly",
+        "currency_rate_snapshots_hourly_p2025_09",
+        "currency_rate_snapshots_hourly_p2025_10",
+        "currency_rate_snapshots_hourly_p2025_11",
+        "currency_rate_snapshots_daily_p2024",
+    ])
+    connection = mocker.Mock()
+
+    # Act
+    dropped = drop_expired_partitions(connection, frequency="hourly", cutoff=NOW - timedelta(days=30))
+
+    # Assert
+    assert dropped == ["currency_rate_snapshots_hourly_p2025_09"]
+    assert executed_sql(connection) == [
+        "ALTER TABLE currency_rate_snapshots_hourly DETACH PARTITION currency_rate_snapshots_hourly_p2025_09",
+        "DROP TABLE currency_rate_snapshots_hourly_p2025_09",
+    ]
+
+
+def test_maintain_partitions_skips_unpartitioned_table(mocker):
+    """
+    Tests that housekeeping is a no-op (and reports it) before the migration.
+    """
+    # Arrange
+    connection = mocker.Mock()
+    connection.dialect.name = "postgresql"
+    connection.execute.return_value.scalar.return_value = "r"
+    mock_ensure = mocker.patch.object(partitions, "ensure_partitions")
+
+    # Act
+    result = maintain_partitions(connection, retention=timedelta(days=30), now=NOW)
+
+    # Assert
+    assert result is False
+    mock_ensure.assert_not_called()
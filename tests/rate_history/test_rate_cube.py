@@ -0,0 +1,176 @@
+# tests/rate_history/test_rate_cube.py
+
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from src.rate_history.rate_cube import RateCube, append_to_rate_cube, write_rate_cube
+from src.rate_history.service import HistoricalDataService
+
+DAILY_RATES = [
+    (date(2025, 1, 1), {"USD": 1.0, "TRY": 35.1, "EUR": 0.96}),
+    (date(2025, 1, 2), {"USD": 1.0, "TRY": 35.2, "EUR": 0.97}),
+    # 2025-01-03 is missing
+    (date(2025, 1, 4), {"USD": 1.0, "TRY": 35.4}),
+]
+
+# --- Tests ---
+
+def test_written_cube_is_mapped_read_only_with_gaps_as_nan(tmp_path):
+    """
+    Tests that a built cube maps back to the same rates, with missing days and
+    currencies as NaN, and that a window is a view of the mapped file.
+    """
+    # Arrange
+    path = str(tmp_path / "rates.cube")
+    write_rate_cube(path, DAILY_RATES)
+    cube = RateCube(path)
+
+    # Act
+    window = cube.window(date(2025, 1, 1), date(2025, 1, 10))
+
+    # Assert
+    assert cube.last_date() == date(2025, 1, 4)
+    assert window.start == date(2025, 1, 1)
+    assert window.codes == ["USD", "TRY", "EUR"]
+    assert isinstance(window.rates, np.memmap) and not window.rates.flags.writeable
+    assert window.has_rates().tolist() == [True, True, False, True]
+    assert window.column("TRY")[1] == 35.2
+    assert np.isnan(window.column("EUR")[3])
+
+    snapshots = window.snapshots(np.array([0, 3]))
+    assert snapshots[0].effective_at == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert snapshots[0].rates == {"USD": 1.0, "TRY": 35.1, "EUR": 0.96}
+    assert snapshots[1].rates == {"USD": 1.0, "TRY": 35.4}
+
+
+def test_append_extends_and_patches_in_place(tmp_path):
+    """
+    Tests that appending fills skipped days with NaN rows, overwrites an earlier
+    day, registers a new currency, and that an open reader picks it all up.
+    """
+    # Arrange
+    path = str(tmp_path / "rates.cube")
+    write_rate_cube(path, DAILY_RATES)
+    cube = RateCube(path)
+    assert cube.last_date() == date(2025, 1, 4)
+
+    # Act
+    append_to_rate_cube(path, [
+        (date(2025, 1, 7), {"USD": 1.0, "TRY": 35.7, "GBP": 0.8}),
+        (date(2025, 1, 3), {"USD": 1.0, "TRY": 35.3}),
+    ])
+
+    # Assert
+    window = cube.window(date(2025, 1, 1), date(2025, 1, 7))
+    assert cube.last_date() == date(2025, 1, 7)
+    assert window.codes == ["USD", "TRY", "EUR", "GBP"]
+    assert window.has_rates().tolist() == [True, True, True, True, False, False, True]
+    assert window.column("TRY")[2] == 35.3
+    assert window.column("GBP")[6] == 0.8
+
+
+def test_append_rewrites_cube_when_columns_run_out(tmp_path, mocker):
+    """
+    Tests that a currency beyond the allocated columns triggers a rewrite that
+    keeps every existing day and column position.
+    """
+    # Arrange
+    mocker.patch("src.rate_history.rate_cube.COLUMN_BLOCK", 3)
+    path = str(tmp_path / "rates.cube")
+    write_rate_cube(path, DAILY_RATES)
+
+    # Act
+    append_to_rate_cube(path, [(date(2025, 1, 5), {"USD": 1.0, "JPY": 157.2})])
+
+    # Assert
+    window = RateCube(path).window(date(2025, 1, 1), date(2025, 1, 5))
+    assert window.codes == ["USD", "TRY", "EUR", "JPY"]
+    assert window.column("EUR")[1] == 0.97
+    assert window.column("JPY")[4] == 157.2
+
+
+def test_get_historical_data_reads_daily_ranges_from_fresh_cube(tmp_path, mocker):
+    """
+    Tests that daily ranges are sliced from the cube when it is as new as the
+    newest daily snapshot, without a Postgres range query.
+    """
+    # Arrange
+    today = datetime.now(timezone.utc).date()
+    days = [(today - timedelta(days=offset), {"USD": 1.0, "TRY": 30.0 + offset}) for offset in range(40, 0, -1)]
+    path = str(tmp_path / "rates.cube")
+    write_rate_cube(path, days)
+    mocker.patch("src.rate_history.service.rate_cube", RateCube(path))
+    mocker.patch("src.rate_history.service.daily_date_index.latest", return_value=today - timedelta(days=1))
+    mocker.patch("src.rate_history.service.get_redis_client", return_value=None)
+    mock_get_range = mocker.patch("src.rate_history.service.repo.get_range")
+    service = HistoricalDataService(session=mocker.Mock())
+
+    # Act
+    result = service.get_historical_data("1m")
+
+    # Assert
+    mock_get_range.assert_not_called()
+    assert len(result) == 29
+    assert result[0].effective_at.date() == today - timedelta(days=29)
+    assert result[-1].rates == {"USD": 1.0, "TRY": 31.0}
+
+
+def test_get_historical_data_skips_stale_cube(tmp_path, mocker):
+    """
+    Tests that Postgres is used when the cube lags behind the newest daily snapshot.
+    """
+    # Arrange
+    today = datetime.now(timezone.utc).date()
+    path = str(tmp_path / "rates.cube")
+    write_rate_cube(path, [(today - timedelta(days=3), {"USD": 1.0})])
+    mocker.patch("src.rate_history.service.rate_cube", RateCube(path))
+    mocker.patch("src.rate_history.service.daily_date_index.latest", return_value=today - timedelta(days=1))
+    mocker.patch("src.rate_history.service.get_redis_client", return_value=None)
+    mock_get_range = mocker.patch("src.rate_history.service.repo.get_range", return_value=[])
+    service = HistoricalDataService(session=mocker.Mock())
+
+    # Act
+    service.get_historical_data("1y")
+
+    # Assert
+    mock_get_range.assert_called_once()
+
+
+def test_cube_rates_match_postgres_exactly(tmp_path):
+    """
+    Tests that rates with more digits than float32 holds come back unchanged, so
+    history bodies are the same whether they come from the cube or from Postgres.
+    """
+    # Arrange
+    rates = {"USD": 1.0, "TRY": 41.987654321, "BTC": 0.0000087654321}
+    path = str(tmp_path / "rates.cube")
+    write_rate_cube(path, [(date(2025, 1, 1), rates)])
+
+    # Act
+    [snapshot] = RateCube(path).window(date(2025, 1, 1), date(2025, 1, 1)).snapshots(np.array([0]))
+
+    # Assert
+    assert snapshot.rates == rates
+
+
+def test_get_historical_data_falls_back_when_cube_disappears(tmp_path, mocker):
+    """
+    Tests that Postgres is used when the cube goes away between the freshness check
+    and the read (window() returns None).
+    """
+    # Arrange
+    today = datetime.now(timezone.utc).date()
+    cube = mocker.Mock(last_date=mocker.Mock(return_value=today), window=mocker.Mock(return_value=None))
+    mocker.patch("src.rate_history.service.rate_cube", cube)
+    mocker.patch("src.rate_history.service.daily_date_index.latest", return_value=today)
+    mocker.patch("src.rate_history.service.get_redis_client", return_value=None)
+    mock_get_range = mocker.patch("src.rate_history.service.repo.get_range", return_value=[])
+    service = HistoricalDataService(session=mocker.Mock())
+
+    # Act
+    result = service.get_historical_data("1m")
+
+    # Assert
+    assert result == []
+    mock_get_range.assert_called_once()
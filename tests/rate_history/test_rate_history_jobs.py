@@ -0,0 +1,115 @@
+# tests/rate_history/test_rate_history_jobs.py
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlmodel import Session
+
+from src.rate_history import jobs
+from src.rate_history.jobs import GapReport
+from src.rate_history.models import CurrencyRateSnapshot
+
+BUCKET = datetime(2025, 10, 17, 10, 0, 0, tzinfo=timezone.utc)
+
+# --- Tests ---
+
+def test_fill_hourly_buckets_forward_fills_each_gap(mocker):
+    """
+    Tests that each run of missing hours is forward-filled from the snapshot
+    right before it, with a single lookup per contiguous run.
+    """
+    # Arrange
+    mock_get_latest_before = mocker.patch(
+        "src.rate_history.jobs.get_latest_before",
+        side_effect=[
+            CurrencyRateSnapshot(effective_at=BUCKET - timedelta(hours=1), frequency="hourly", rates={"TRY": 33.0}),
+            CurrencyRateSnapshot(effective_at=BUCKET + timedelta(hours=4), frequency="hourly", rates={"TRY": 34.0}),
+        ],
+    )
+    mock_upsert = mocker.patch("src.rate_history.jobs.upsert_snapshots")
+    missing = [BUCKET, BUCKET + timedelta(hours=1), BUCKET + timedelta(hours=5)]
+
+    # Act
+    filled = jobs._fill_hourly_buckets(mocker.Mock(spec=Session), missing)
+
+    # Assert
+    assert filled == 3
+    assert mock_get_latest_before.call_count == 2
+    mock_upsert.assert_called_once()
+    written = [(row["effective_at"], row["rates"]["TRY"]) for row in mock_upsert.call_args.args[1]]
+    assert written == [(missing[0], 33.0), (missing[1], 33.0), (missing[2], 34.0)]
+
+
+def test_gap_report_coverage():
+    """
+    Tests the coverage metrics reported by the gap repair job.
+    """
+    report = GapReport(frequency="daily", expected=200, missing=20, filled=15)
+
+    assert report.coverage_before == pytest.approx(0.90)
+    assert report.coverage_after == pytest.approx(0.975)
+    assert "20/200 buckets missing" in report.summary()
+
+
+@pytest.mark.asyncio
+async def test_daily_job_fetches_missing_day_instead_of_copying_latest(mocker):
+    """
+    Tests that the daily job fetches yesterday from the historical API when there is
+    no hourly data for it, rather than copying the latest hourly snapshot.
+    """
+    # Arrange
+    mock_session = mocker.MagicMock()
+    mock_session.__enter__.return_value = mock_session
+    mock_session.exec.return_value.first.return_value = None
+    mocker.patch("src.rate_history.jobs.get_session", side_effect=lambda: iter([mock_session]))
+    mock_fill = mocker.patch("src.rate_history.jobs._fill_daily_buckets", return_value=1)
+    mock_upsert = mocker.patch("src.rate_history.jobs.upsert_snapshot")
+
+    # Act
+    await jobs.run_daily_job()
+
+    # Assert
+    mock_fill.assert_awaited_once()
+    mock_upsert.assert_not_called()
+
+
+class EveryFewMilliseconds:
+    """Stands in for a CronExpression that fires 50 ms after any time."""
+
+    def next_after(self, dt):
+        return dt + timedelta(milliseconds=50)
+
+
+@pytest.mark.asyncio
+async def test_blocking_job_does_not_hold_up_other_scheduled_jobs(mocker):
+    """
+    Tests that while the cache warm job is inside its blocking database section,
+    another scheduled job still fires on the shared event loop.
+    """
+    # Arrange
+    import asyncio
+    import threading
+    from src.core.scheduler import JobScheduler, ScheduledJob
+
+    mocker.patch("src.core.scheduler.get_redis_client", return_value=None)
+    mocker.patch("src.rate_history.jobs.get_redis_client").return_value.ttl.return_value = 0
+    other_job_fired = threading.Event()
+    # Blocks until the other job has run: on the event loop this would never return
+    mock_warm = mocker.patch("src.rate_history.jobs.warm_caches_from_database", side_effect=lambda **_: other_job_fired.wait(5))
+
+    async def other_job():
+        other_job_fired.set()
+        scheduler.stop()
+
+    scheduler = JobScheduler([
+        ScheduledJob(name="cache-warm", cron=EveryFewMilliseconds(), func=jobs.run_cache_warm_job, catch_up=False),
+        ScheduledJob(name="other", cron=EveryFewMilliseconds(), func=other_job, catch_up=False),
+    ])
+
+    # Act
+    await asyncio.wait_for(scheduler.run_forever(), timeout=10)
+
+    # Assert
+    mock_warm.assert_called_with(refresh_redis=True)
+    assert scheduler.jobs["cache-warm"].metrics.last_status == "success"
+    assert scheduler.jobs["cache-warm"].metrics.last_duration < 5
+    assert scheduler.jobs["other"].metrics.runs == 1
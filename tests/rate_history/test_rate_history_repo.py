@@ -0,0 +1,150 @@
+# tests/rate_history/test_rate_history_repo.py
+
+from datetime import datetime, timedelta, timezone
+from sqlmodel import Session
+
+from src.rate_history import repo
+
+START = datetime(2025, 10, 1, tzinfo=timezone.utc)
+
+def capture_upserts(mocker):
+    """A mock session recording the payload and snapshot rows of each multi-row INSERT."""
+    mock_session = mocker.Mock(spec=Session)
+    sent = {"currency_rate_payloads": [], "currency_rate_snapshots": []}
+
+    def fake_execute(stmt, params=None):
+        if not hasattr(stmt, "table"):  # the payload lock
+            return None
+        params = stmt.compile().params
+        columns = [column.name for column in stmt.table.c if f"{column.name}_m0" in params]
+        chunk = [
+            {column: params[f"{column}_m{n}"] for column in columns}
+            for n in range(len(params) // len(columns))
+        ]
+        sent[stmt.table.name].append(chunk)
+        if stmt.table.name == "currency_rate_payloads":
+            return None
+        return [
+            mocker.Mock(_mapping={"id": None, "rates": None, **values}, payload_hash=values["payload_hash"])
+            for values in chunk
+        ]
+
+    mock_session.execute.side_effect = fake_execute
+    return mock_session, sent
+
+# --- Tests ---
+
+def test_upsert_snapshots_chunks_dedupes_and_commits_once(mocker):
+    """
+    Tests that the bulk upsert sends one multi-row statement per chunk, collapses
+    duplicate buckets (last one wins), commits once and returns the RETURNING rows.
+    """
+    # Arrange
+    rows = [
+        {"frequency": "daily", "effective_at": START + timedelta(days=i), "base_currency": "USD", "rates": {"TRY": float(i)}}
+        for i in range(5)
+    ]
+    rows.append({**rows[0], "rates": {"TRY": 99.0}})
+    mock_session, sent = capture_upserts(mocker)
+
+    # Act
+    written = repo.upsert_snapshots(mock_session, rows, chunk_size=2)
+
+    # Assert
+    assert [len(chunk) for chunk in sent["currency_rate_snapshots"]] == [2, 2, 1]
+    assert len(written) == 5
+    assert written[0].rates == {"TRY": 99.0}
+    mock_session.commit.assert_called_once()
+
+
+def test_upsert_snapshots_stores_identical_rate_maps_once(mocker):
+    """
+    Tests that forward-filled copies of a rate map reference the same payload,
+    which is written once, and that the snapshot rows carry no inline rates.
+    """
+    # Arrange
+    rates = {"TRY": 41.2, "EUR": 0.86}
+    rows = [
+        {"frequency": "hourly", "effective_at": START, "base_currency": "USD", "rates": rates},
+        {"frequency": "hourly", "effective_at": START + timedelta(hours=1), "base_currency": "USD",
+         "rates": dict(reversed(list(rates.items()))), "provenance": "forward_filled"},
+    ]
+    mock_session, sent = capture_upserts(mocker)
+
+    # Act
+    written = repo.upsert_snapshots(mock_session, rows)
+
+    # Assert
+    [payloads] = sent["currency_rate_payloads"]
+    [snapshots] = sent["currency_rate_snapshots"]
+    assert payloads == [{"hash": repo.rates_hash(rates), "rates": rates}]
+    assert {row["payload_hash"] for row in snapshots} == {repo.rates_hash(rates)}
+    assert all("rates" not in row for row in snapshots)
+    assert [row["provenance"] for row in snapshots] == ["real", "forward_filled"]
+    assert written[1].rates == rates
+
+
+def test_payload_gc_waits_for_snapshot_writers(mocker):
+    """
+    Tests that writers take the payload lock shared before storing payloads and that
+    the orphan payload GC takes it exclusively before deleting.
+    """
+    # Arrange
+    mock_session, _ = capture_upserts(mocker)
+    rows = [{"frequency": "hourly", "effective_at": START, "base_currency": "USD", "rates": {"TRY": 41.2}}]
+
+    # Act
+    repo.upsert_snapshots(mock_session, rows)
+    writer_first = str(mock_session.execute.call_args_list[0].args[0])
+    mock_session.execute.reset_mock(side_effect=True)
+    repo.delete_orphan_payloads(mock_session)
+    gc_statements = [str(call.args[0]) for call in mock_session.execute.call_args_list]
+
+    # Assert
+    assert "pg_advisory_xact_lock_shared" in writer_first
+    assert "pg_advisory_xact_lock(" in gc_statements[0]
+    assert "DELETE FROM currency_rate_payloads" in gc_statements[1]
+
+
+def test_daily_snapshots_on_or_before_resolves_all_dates_in_one_query(mocker):
+    """
+    Tests that several as-of lookups go out as a single LATERAL query over one array
+    parameter and come back keyed by target date.
+    """
+    # Arrange
+    from sqlalchemy.dialects import postgresql
+    sunday = START + timedelta(days=4)
+    mock_session = mocker.Mock(spec=Session)
+    mock_session.exec.return_value.all.return_value = [mocker.Mock(_mapping={
+        "target_date": sunday, "id": 1, "frequency": "daily", "effective_at": START + timedelta(days=2),
+        "base_currency": "USD", "payload_hash": None, "provenance": "real", "rates": {"TRY": 41.8},
+    })]
+
+    # Act
+    snapshots = repo.get_daily_snapshots_on_or_before(mock_session, [sunday, START - timedelta(days=1)])
+
+    # Assert
+    mock_session.exec.assert_called_once()
+    sql = str(mock_session.exec.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "unnest(" in sql and "JOIN LATERAL" in sql
+    assert snapshots[sunday].rates == {"TRY": 41.8}
+    assert len(snapshots) == 1
+
+
+def test_missing_buckets_are_generated_in_utc(mocker):
+    """
+    Tests that the expected buckets are generated over UTC wall-clock timestamps,
+    so daily steps stay on midnight UTC whatever the session time zone.
+    """
+    # Arrange
+    mock_session = mocker.Mock(spec=Session)
+    mock_session.execute.return_value = [(START,)]
+
+    # Act
+    missing = repo.get_missing_buckets(mock_session, frequency="daily", start=START, end=START + timedelta(days=60))
+
+    # Assert
+    sql = str(mock_session.execute.call_args.args[0])
+    assert "CAST(:start AS timestamptz) AT TIME ZONE 'UTC'" in sql
+    assert "s.effective_at = series.utc_bucket AT TIME ZONE 'UTC'" in sql
+    assert missing == [START]
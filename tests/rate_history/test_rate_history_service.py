@@ -29,6 +29,11 @@ DAILY_SNAPSHOT_FOR_YESTERDAY = CurrencyRateSnapshot(
     rates={"USD": 1.0, "TRY": 32.2}
 )
 
+@pytest.fixture(autouse=True)
+def cold_date_index(mocker):
+    """By default the in-memory date index cannot answer, so lookups go to the repo."""
+    return mocker.patch("src.rate_history.service.daily_date_index.resolve", return_value=None)
+
 # --- Tests ---
 
 def test_get_rate_for_date_happy_path(mocker):
@@ -94,3 +99,102 @@ def test_get_rate_for_date_not_found(mocker):
     
     assert excinfo.value.status_code == 404
 
+
+
+def test_get_rates_for_dates_single_query_with_today_fallback(mocker, cold_date_index):
+    """
+    Tests that indexed dates are fetched with one daily-snapshot query and the rest
+    with one more, today falls back to the latest hourly data, missing dates come
+    back as null and only the requested currencies are returned.
+    """
+    # Arrange
+    mocker.patch("src.rate_history.service.datetime", wraps=datetime, now=mocker.Mock(return_value=FAKE_NOW))
+    mock_repo = mocker.patch("src.rate_history.service.repo")
+    cold_date_index.side_effect = lambda session, target: target if target.date() == YESTERDAY.date() else None
+    mock_repo.get_daily_snapshots_on_or_before.return_value = {}
+    mock_repo.get_daily_snapshots_for_dates.return_value = {
+        YESTERDAY.date(): CurrencyRateSnapshot(
+            effective_at=DAILY_SNAPSHOT_FOR_YESTERDAY.effective_at,
+            frequency="daily",
+            rates={"USD": 1.0, "TRY": 32.2, "EUR": 0.9},
+        )
+    }
+    mock_repo.get_latest_hourly_for_date.return_value = HOURLY_SNAPSHOTS[-1]
+
+    service = HistoricalDataService(mocker.Mock(spec=Session))
+    dates = [YESTERDAY.strftime("%Y-%m-%d"), FAKE_NOW.strftime("%Y-%m-%d"), "2020-01-01", YESTERDAY.strftime("%Y-%m-%d")]
+
+    # Act
+    result = service.get_rates_for_dates(dates, symbols=["TRY", "EUR"])
+
+    # Assert
+    mock_repo.get_daily_snapshots_for_dates.assert_called_once()
+    assert len(mock_repo.get_daily_snapshots_for_dates.call_args.args[1]) == 1
+    mock_repo.get_daily_snapshots_on_or_before.assert_called_once()
+    assert len(mock_repo.get_daily_snapshots_on_or_before.call_args.args[1]) == 2  # today and 2020-01-01
+    mock_repo.get_daily_snapshot_for_date.assert_not_called()
+    mock_repo.get_latest_hourly_for_date.assert_called_once()
+    assert [(r.date, r.rates) for r in result.results] == [
+        ("2025-10-16", {"TRY": 32.2, "EUR": 0.9}),
+        ("2025-10-17", {"TRY": 33.2}),
+        ("2020-01-01", None),
+    ]
+
+
+def test_get_rates_for_dates_invalid_date(mocker):
+    """
+    Tests that one malformed date rejects the whole request with a 400.
+    """
+    # Arrange
+    mocker.patch("src.rate_history.service.repo")
+    service = HistoricalDataService(mocker.Mock(spec=Session))
+
+    # Act & Assert
+    with pytest.raises(HTTPException) as excinfo:
+        service.get_rates_for_dates(["2025-10-16", "16.10.2025"])
+
+    assert excinfo.value.status_code == 400
+
+
+def test_get_rate_for_date_resolves_weekend_through_date_index(mocker, cold_date_index):
+    """
+    Tests as-of semantics: a date without its own snapshot (e.g. a Sunday) resolves
+    through the date index to the latest earlier snapshot, fetched by exact date.
+    """
+    # Arrange
+    friday = datetime(2025, 10, 10, tzinfo=timezone.utc)
+    cold_date_index.return_value = friday
+    mock_repo = mocker.patch("src.rate_history.service.repo")
+    mock_repo.get_daily_snapshots_for_dates.return_value = {
+        friday.date(): CurrencyRateSnapshot(effective_at=friday, frequency="daily", rates={"USD": 1.0, "TRY": 41.8})
+    }
+    service = HistoricalDataService(mocker.Mock(spec=Session))
+
+    # Act
+    result = service.get_rate_for_date(date_str="2025-10-12")
+
+    # Assert
+    assert result.rates["TRY"] == 41.8
+    assert result.effective_at == friday
+    mock_repo.get_daily_snapshot_for_date.assert_not_called()
+
+
+
+def test_get_historical_body_rejects_unknown_range_and_base(mocker):
+    """
+    Tests that an unknown range or an inactive base answers 400 before any cache key
+    is read or written.
+    """
+    # Arrange
+    mocker.patch("src.rate_history.service.get_rate_state", return_value=None)
+    mocker.patch("src.rate_history.service.currency_repo.get_all_active_currency_codes", return_value=["USD", "EUR"])
+    mock_redis = mocker.Mock()
+    mocker.patch("src.rate_history.service.get_redis_client", return_value=mock_redis)
+    service = HistoricalDataService(mocker.Mock(spec=Session))
+
+    # Act & Assert
+    for range_str, base in [("10y", "USD"), ("1m", "XYZ")]:
+        with pytest.raises(HTTPException) as exc_info:
+            service.get_historical_body(range_str=range_str, base_currency=base)
+        assert exc_info.value.status_code == 400
+    mock_redis.get.assert_not_called()
@@ -1,5 +1,6 @@
 # tests/test_main.py
 from fastapi.testclient import TestClient
+from src.core.redis_client import redis_manager
 from src.main import app 
 
 client = TestClient(app)
@@ -10,4 +11,28 @@ def test_read_root():
 
     # Assert
     assert response.status_code == 200
-    assert response.json() == {"message": "Currency Converter API is up and running!"}
\ No newline at end of file
+    assert response.json() == {"message": "Currency Converter API is up and running!"}
+
+def test_health_reports_local_mode_while_redis_is_down(mocker):
+    # Arrange
+    mocker.patch("src.main.redis_manager.status", return_value={"mode": "local", "state": "degraded"})
+
+    # Act
+    response = client.get("/health")
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json()["status"] == "degraded"
+    assert response.json()["redis"]["mode"] == "local"
+
+
+def test_health_does_not_expose_redis_errors(mocker):
+    # Arrange
+    mocker.patch.object(redis_manager, "last_error", "ConnectionError: Error connecting to redis-internal:6379")
+
+    # Act
+    response = client.get("/health")
+
+    # Assert
+    assert "last_error" not in response.json()["redis"]
+    assert "redis-internal" not in response.text